@@ -1,11 +1,25 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, g, Response
 from flask_cors import CORS
-import joblib
 import pandas as pd
+import numpy as np
 import os
-import csv
-from datetime import datetime, timedelta
-from flask import send_from_directory
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+from base_clientes import BaseClientes
+from tabela_scores import TabelaScores
+import registro_modelos
+from registro_modelos import RecarregadorModelo, REGISTRO_DIR
+from metricas import metricas, AmostradorPerfil
+from cache_predicoes import CachePredicoes
+import pipeline_features
+import envelhecimento
+import dois_estagios
+from monitor_drift import MonitorDrift
+from historico import LIMITE_PADRAO as LIMITE_HISTORICO_PADRAO, HistoricoAnalises
+from dashboard import Dashboard
+from ativos_estaticos import AtivosEstaticos, CACHE_IMUTAVEL, CACHE_PAGINA
 
 # =========================
 # CONFIGURAÇÕES
@@ -14,30 +28,110 @@ BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 MODEL_PATH = os.path.join(BASE_DIR, "gradient_boosting_model (1).joblib")
 DATABASE_PATH = os.path.join(BASE_DIR, "base_clientes.csv")
 FRONTEND_DIR = os.path.join(BASE_DIR, "frontend")
+DASHBOARD_CSV_PATH = os.path.join(BASE_DIR, "datasetdashboard.csv")
 DASHBOARD_XLSX_PATH = os.path.join(BASE_DIR, "datasetdashboard.xlsx")
+SCORES_PATH = os.path.join(BASE_DIR, "scores_clientes.csv")
+HISTORICO_DB_PATH = os.path.join(BASE_DIR, "historico.db")
+
+# "0" desliga o scorer compilado e volta para o model.predict_proba do sklearn
+USAR_SCORER_COMPILADO = os.environ.get("CHURN_SCORER_COMPILADO", "1") != "0"
+
+# "1" liga o header X-Profile (profiler por amostragem de uma requisição);
+# mesmo ligado, só vale para chamadas autorizadas como as rotas /admin/*
+PERFIL_HABILITADO = os.environ.get("API_PERFIL", "0") == "1"
+
+# Com API_ADMIN_TOKEN definido, as rotas /admin/* exigem o header X-Admin-Token;
+# sem ele, só aceitam chamadas da própria máquina
+ADMIN_TOKEN = os.environ.get("API_ADMIN_TOKEN")
+
+# "1" liga a predição em dois estágios: o pré-filtro da versão servida
+# (modelos/<versao>.prefiltro.joblib, ver dois_estagios.py) responde longe
+# dos limites de risco e só o resto vai para o modelo completo
+DOIS_ESTAGIOS = os.environ.get("CHURN_DOIS_ESTAGIOS", "0") == "1"
+
+# "0" desliga o monitor de drift/qualidade dos payloads (GET /monitor/drift)
+MONITOR_DRIFT = os.environ.get("CHURN_MONITOR", "1") != "0"
+
+# Cache LRU de predições do /predict ("0" no tamanho desliga)
+CACHE_TAMANHO = int(os.environ.get("CHURN_CACHE_TAMANHO", 4096))
+CACHE_TTL_S = float(os.environ.get("CHURN_CACHE_TTL_S", 300))
+
+# "1" envelhece a base inteira até hoje (DAYS_SINCE_LAST / QTD_SOL_LAST_30D)
+# uma vez por dia; sem isso, rode python envelhecimento.py (ex.: cron diário)
+ENVELHECER_AUTO = os.environ.get("CHURN_ENVELHECER_AUTO", "0") == "1"
+ENVELHECER_VERIFICAR_A_CADA_S = 3600
 
 app = Flask(__name__)
 CORS(app)
 
+# Base de clientes em memória (carregada uma vez, recarregada se o CSV mudar)
+clientes = BaseClientes(DATABASE_PATH)
+
+# Histórico de análises (SQLite); os CSVs antigos entram uma vez, na primeira abertura
+historico = HistoricoAnalises(HISTORICO_DB_PATH, importar_de=[
+    os.path.join(BASE_DIR, "historico_analises.csv"),
+    os.path.join(BASE_DIR, "historico.csv"),
+])
+
+# Frontend com nomes por hash, ETag e gzip/brotli (montado uma vez; refeito se a pasta mudar)
+ativos_estaticos = AtivosEstaticos(FRONTEND_DIR)
+try:
+    ativos_estaticos.atualizar()  # comprime antes do fork dos workers (gunicorn preload)
+except OSError as e:
+    print(f"Frontend não carregado de {FRONTEND_DIR}: {e}")
+
+# Agregados da aba Dashboard (o arquivo é lido na primeira consulta e relido se mudar)
+dashboard = Dashboard([DASHBOARD_CSV_PATH, DASHBOARD_XLSX_PATH])
+
 # =========================
 # CARREGAMENTO DO MODELO
 # =========================
-if not os.path.exists(MODEL_PATH):
+# Versão ativa do registro (modelos/manifest.json); sem registro, o .joblib de sempre.
+# "servido" é trocado de uma vez na recarga a quente: cada rota lê a referência
+# uma vez no começo e usa o mesmo modelo até o fim da requisição.
+servido = None
+
+versao_registro = registro_modelos.versao_ativa(REGISTRO_DIR)
+if versao_registro:
+    try:
+        entrada = registro_modelos.ler_manifesto(REGISTRO_DIR)["versoes"][versao_registro]
+        servido = registro_modelos.carregar(
+            registro_modelos.caminho_versao(versao_registro, REGISTRO_DIR),
+            USAR_SCORER_COMPILADO, entrada.get("sha256"), REGISTRO_DIR
+        )
+        print(f"Modelo {versao_registro} carregado do registro")
+    except (KeyError, ValueError, OSError) as e:
+        print(f"Versão {versao_registro} do registro não carregou, usando {MODEL_PATH}: {e}")
+
+if servido is None and os.path.exists(MODEL_PATH):
+    servido = registro_modelos.carregar(MODEL_PATH, USAR_SCORER_COMPILADO)
+
+if servido is None:
     print(f"ERRO: Modelo não encontrado em {MODEL_PATH}")
     model = None
+    scorer = None
     FEATURES = []
+    MODEL_VERSION = None
 else:
-    artifact = joblib.load(MODEL_PATH)
-
-    if isinstance(artifact, dict):
-        model = artifact.get("model")
-        FEATURES = artifact.get("features", [])
-    else:
-        model = artifact
-        FEATURES = list(model.feature_names_in_)
-
+    # Quem efetivamente calcula predict_proba é o scorer (mesmas probabilidades, bit a bit)
+    model, scorer = servido.model, servido.scorer
+    FEATURES = servido.features
+    MODEL_VERSION = servido.versao
     print("Modelo carregado com sucesso!")
     print(f"Features carregadas: {len(FEATURES)}")
+    if servido.compilado:
+        print("Scorer compilado ativo (árvores em arrays NumPy)")
+    if DOIS_ESTAGIOS:
+        print("Dois estágios: " + ("pré-filtro ativo" if servido.prefiltro else
+                                   f"sem pré-filtro para {MODEL_VERSION} (python dois_estagios.py treinar)"))
+
+cache_predicoes = CachePredicoes(
+    CACHE_TAMANHO, CACHE_TTL_S, servido.caminho if servido else MODEL_PATH, MODEL_VERSION
+)
+
+monitor = MonitorDrift(FEATURES, servido.perfil) if servido and MONITOR_DRIFT else None
+if monitor is not None and servido.perfil is None:
+    print(f"Monitor de drift sem perfil para {MODEL_VERSION} (python monitor_drift.py perfil): só qualidade")
 
 # =========================
 # FUNÇÕES AUXILIARES
@@ -74,19 +168,246 @@ def calcular_taxa_contato(total_registros, dias_unicos):
     return 0.0
 
 
-def _to_float(v):
-    """Converte valores (inclusive com vírgula) para float com fallback seguro."""
-    try:
-        return float(str(v).replace(",", "."))
-    except:
-        return 0.0
+def _chave_cache(X_linha: np.ndarray, m):
+    """Chave do cache de predições para o vetor de features (None se o cache estiver desligado)."""
+    if not cache_predicoes.ativo:
+        return None
+    return cache_predicoes.chave(X_linha, m.versao, m.entrada_float32)
+
+
+def _entrada_modelo(X: np.ndarray, m):
+    """O scorer compilado usa a matriz direto; o sklearn recebe os nomes das features."""
+    return X if m.compilado else pd.DataFrame(X, columns=FEATURES)
+
+
+def _usa_prefiltro(m) -> bool:
+    return DOIS_ESTAGIOS and m.prefiltro is not None
+
+
+def _prever_proba(X_linha: np.ndarray, rota: str, m, completo: bool = False):
+    """Linha do predict_proba do modelo m para um vetor de features, passando pelo cache de predições.
+
+    completo=True (explain) pula o pré-filtro: a explicação é do modelo completo
+    e precisa somar exatamente o score devolvido.
+    """
+    usa_prefiltro = _usa_prefiltro(m) and not completo
+    chave = _chave_cache(X_linha, m)
+    # Com pré-filtro ativo o cache pode guardar a resposta dele: o completo não lê
+    ler_cache = chave is not None and not (completo and _usa_prefiltro(m))
+    proba = cache_predicoes.obter(chave) if ler_cache else None
+    if proba is not None:
+        metricas.contar("churn_predicoes_total", rota=rota, resultado="cache")
+        return proba
+
+    proba = None
+    if usa_prefiltro:
+        with metricas.etapa(rota, "prefiltro"):
+            p, confiante = m.prefiltro.decidir(X_linha[None, :])
+        metricas.contar("churn_dois_estagios_total", estagio="prefiltro" if confiante[0] else "completo")
+        if confiante[0]:
+            proba = np.empty(2, dtype=np.float64)
+            proba[m.idx_churn], proba[1 - m.idx_churn] = p[0], 1 - p[0]
+            metricas.contar("churn_predicoes_total", rota=rota, resultado="prefiltro")
+
+    if proba is None:
+        with metricas.etapa(rota, "modelo"):
+            proba = m.scorer.predict_proba(_entrada_modelo(X_linha[None, :], m))[0]
+        metricas.contar("churn_predicoes_total", rota=rota, resultado="modelo")
+
+    if chave is not None:
+        cache_predicoes.guardar(chave, proba)
+    return proba
+
+
+def _quer_explicacao() -> bool:
+    """?explain=true no /predict e no /predict_batch."""
+    return request.args.get("explain", "").lower() in ("1", "true", "sim")
+
+
+def _prever_lote(X: np.ndarray, dias_desde_ultimo: np.ndarray, m=None, explicar: bool = False) -> list:
+    """Aplica as regras de negócio como máscaras e chama o modelo UMA vez para o lote.
+
+    Cada item retornado tem exatamente o formato da resposta do /predict
+    (com "explicacao" nas linhas que passaram pelo modelo, se explicar=True).
+    """
+    m = m or servido
+    zeradas, inativo_1_ano, usar_modelo = pipeline_features.aplicar_regras(X, dias_desde_ultimo)
+
+    def prever_completo(X_modelo):
+        return m.scorer.predict_proba(_entrada_modelo(X_modelo, m))[:, m.idx_churn]
+
+    probas = np.zeros(X.shape[0], dtype=np.float64)
+    # Com explicação, tudo vai para o modelo completo (a explicação é dele)
+    if usar_modelo.any() and _usa_prefiltro(m) and not explicar:
+        probas[usar_modelo], escalou = dois_estagios.prever_dois_estagios(X[usar_modelo], m.prefiltro, prever_completo)
+        metricas.contar("churn_dois_estagios_total", int(escalou.sum()), estagio="completo")
+        metricas.contar("churn_dois_estagios_total", int((~escalou).sum()), estagio="prefiltro")
+    elif usar_modelo.any():
+        probas[usar_modelo] = prever_completo(X[usar_modelo])
+
+    saida = pipeline_features.resultados(zeradas, inativo_1_ano, pipeline_features.percentuais(probas))
+    if explicar:
+        linhas = np.flatnonzero(usar_modelo)
+        explicacoes = m.explicador.explicar(X[linhas]) if len(linhas) else []
+        for res in saida:
+            res["explicacao"] = None
+        for i, explicacao in zip(linhas, explicacoes):
+            saida[i]["explicacao"] = explicacao
+    return saida
+
+
+def _responder_linha(data: dict, rota: str, m, explicar: bool = False):
+    """Fluxo do /predict e do /predict_legacy para um payload: features, regras e modelo."""
+    with metricas.etapa(rota, "features"):
+        X = pipeline_features.matriz_features(data, FEATURES)
+
+    with metricas.etapa(rota, "regras"):
+        dias = pipeline_features.dias_desde_ultimo(X, FEATURES, data)
+        zeradas, inativo_1_ano, _ = pipeline_features.aplicar_regras(X, dias)
+
+    percentual = [0.0]
+    if zeradas[0]:
+        metricas.contar("churn_predicoes_total", rota=rota, resultado="regra_features_zeradas")
+    elif inativo_1_ano[0]:
+        metricas.contar("churn_predicoes_total", rota=rota, resultado="regra_366_dias")
+    else:
+        proba_all = _prever_proba(X[0], rota, m, completo=explicar)
+        percentual = pipeline_features.percentuais([proba_all[m.idx_churn]])
+
+    resultado = pipeline_features.resultados(zeradas, inativo_1_ano, percentual)[0]
+    if monitor is not None:
+        monitor.observar([data], X, [resultado])
+    resultado["versao_modelo"] = m.versao
+    if explicar:
+        resultado["explicacao"] = None
+        if resultado["usou_modelo"]:
+            with metricas.etapa(rota, "explicacao"):
+                resultado["explicacao"] = m.explicador.explicar(X)[0]
+    return jsonify(resultado)
+
+# =========================
+# TABELA DE SCORES PRÉ-CALCULADOS
+# =========================
+tabela_scores = TabelaScores(SCORES_PATH, clientes, FEATURES, _prever_lote, MODEL_VERSION)
+
+if model is not None and os.path.exists(DATABASE_PATH):
+    if not tabela_scores.carregar():
+        tabela_scores.atualizar(forcar=True)
+        tabela_scores.salvar()
+
+# =========================
+# ENVELHECIMENTO DIÁRIO DA BASE (OPCIONAL)
+# =========================
+def _envelhecer_base() -> int:
+    """Leva a base até hoje (se ainda não estiver) e repontua só o que mudou."""
+    hoje = date.today()
+    referencia = clientes.data_referencia()
+    if referencia is None or referencia >= hoje:
+        return 0
+
+    linhas = clientes.envelhecer(hoje)
+    if linhas and model is not None:
+        tabela_scores.atualizar()
+        tabela_scores.salvar()
+    return linhas
+
+
+def _laco_envelhecimento():
+    while True:
+        try:
+            _envelhecer_base()
+        except Exception as e:
+            # A base fica como estava; tenta de novo na próxima verificação
+            print(f"Erro ao envelhecer a base de clientes: {e}")
+        time.sleep(ENVELHECER_VERIFICAR_A_CADA_S)
+
+
+if ENVELHECER_AUTO and os.path.exists(DATABASE_PATH):
+    threading.Thread(target=_laco_envelhecimento, name="envelhecimento-base", daemon=True).start()
+
+# =========================
+# RECARGA A QUENTE DO MODELO
+# =========================
+
+def _carregar_validado(versao: str):
+    """Carrega a versão do registro e testa numa amostra real da base antes de servir."""
+    _, X_amostra = clientes.matriz_completa(FEATURES)
+    return registro_modelos.carregar_versao(
+        versao, FEATURES, X_amostra[:200], USAR_SCORER_COMPILADO, REGISTRO_DIR
+    )
+
+
+def _trocar_modelo(novo, pedido_local: bool = True):
+    global servido, model, scorer, MODEL_VERSION
+    servido = novo
+    model, scorer, MODEL_VERSION = novo.model, novo.scorer, novo.versao
+
+    cache_predicoes.limpar(novo.versao, novo.caminho)
+    if monitor is not None:
+        monitor.trocar_perfil(novo.perfil)
+    if os.path.exists(DATABASE_PATH):
+        # Cada worker repontua a sua tabela em memória; só quem recebeu o
+        # POST grava o CSV (os outros o encontram certo na próxima subida)
+        try:
+            tabela_scores.trocar_modelo(novo.versao, salvar=pedido_local)
+        except Exception as e:
+            # O modelo já foi trocado; a tabela fica com os scores anteriores
+            print(f"Tabela de scores não atualizada para o modelo {novo.versao}: {e}")
 
 
-def _features_zeradas(valores: dict) -> bool:
-    """Retorna True se todas as FEATURES do modelo estiverem 0 (cliente inativo por regra)."""
-    if not FEATURES:
-        return False
-    return all(_to_float(valores.get(f, 0)) == 0.0 for f in FEATURES)
+recarregador = RecarregadorModelo(
+    _carregar_validado, _trocar_modelo, lambda: servido.versao if servido else None, REGISTRO_DIR
+)
+
+# =========================
+# MÉTRICAS E PROFILING POR REQUISIÇÃO
+# =========================
+
+@app.before_request
+def _verificar_registro():
+    # Outro worker (ou o CLI do registro) pode ter mudado a versão ativa
+    if servido is not None:
+        recarregador.verificar_manifesto()
+
+
+@app.before_request
+def _iniciar_medicao():
+    g.inicio = time.perf_counter()
+    g.perfil = None
+    if PERFIL_HABILITADO and request.headers.get("X-Profile") == "1" and _admin_autorizado():
+        g.perfil = AmostradorPerfil(threading.get_ident())
+        g.perfil.start()
+
+
+@app.after_request
+def _registrar_medicao(response):
+    duracao = time.perf_counter() - g.get("inicio", time.perf_counter())
+    # Rota "modelo" (ex.: /cliente/<id_cliente>) para não criar uma série por ID
+    rota = request.url_rule.rule if request.url_rule is not None else "desconhecida"
+
+    metricas.observar("http_requisicao_duracao_segundos", duracao, rota=rota, metodo=request.method)
+    metricas.contar("http_requisicoes_total", rota=rota, metodo=request.method, status=response.status_code)
+
+    perfil = g.get("perfil")
+    if perfil is not None:
+        relatorio = perfil.stop()
+        relatorio["duracao_ms"] = round(duracao * 1000, 3)
+        print(f"Perfil {request.method} {request.path}: {relatorio['amostras']} amostras, "
+              f"{relatorio['duracao_ms']} ms")
+
+        corpo = response.get_json(silent=True) if response.is_json else None
+        if isinstance(corpo, dict):
+            corpo["perfil"] = relatorio
+            response.set_data(app.json.dumps(corpo))
+        else:
+            response.headers["X-Profile-Amostras"] = str(relatorio["amostras"])
+    return response
+
+
+@app.route("/metrics", methods=["GET"])
+def exportar_metricas():
+    """Métricas no formato texto do Prometheus (por processo/worker)."""
+    return Response(metricas.exportar(), content_type="text/plain; version=0.0.4; charset=utf-8")
 
 # =========================
 # ROTAS DE SERVIÇO
@@ -94,72 +415,183 @@ def _features_zeradas(valores: dict) -> bool:
 
 @app.route("/predict", methods=["POST"])
 def predict():
+    try:
+        m = servido
+        if m is None:
+            return jsonify({"error": "Modelo não carregado"}), 500
+
+        explicar = _quer_explicacao()
+        if explicar and m.explicador is None:
+            return jsonify({"error": "Explicação indisponível para este modelo"}), 400
+
+        with metricas.etapa("/predict", "json"):
+            data = request.get_json() or {}
+
+        # REGRAS DE NEGÓCIO: CLIENTE INATIVO (features zeradas, que é o que
+        # acontece na prática pois o banco zera tudo, ou DAYS_SINCE_LAST >= 366);
+        # senão, CHAMADA NORMAL DO MODELO (CLIENTE ATIVO)
+        return _responder_linha(data, "/predict", m, explicar)
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route("/predict_batch", methods=["POST"])
+def predict_batch():
+    """Predição em lote.
+
+    Aceita {"clientes": [ {features...}, ... ]}, {"ids": [ID_CLIENTE, ...]}
+    ou diretamente uma lista (de dicts ou de IDs). Retorna um item por
+    entrada, na mesma ordem, no mesmo formato do /predict (?explain=true
+    inclusive).
+    """
+    try:
+        m = servido
+        if m is None:
+            return jsonify({"error": "Modelo não carregado"}), 500
+
+        explicar = _quer_explicacao()
+        if explicar and m.explicador is None:
+            return jsonify({"error": "Explicação indisponível para este modelo"}), 400
+
+        data = request.get_json()
+        if isinstance(data, list):
+            entradas = data
+        elif isinstance(data, dict):
+            entradas = data.get("clientes", data.get("ids"))
+        else:
+            entradas = None
+
+        if not isinstance(entradas, list):
+            return jsonify({"error": "Envie uma lista em 'clientes' ou 'ids'"}), 400
+
+        if not entradas:
+            return jsonify({"resultados": [], "total": 0, "versao_modelo": m.versao})
+
+        por_id = not isinstance(entradas[0], dict)
+
+        if por_id:
+            ids = [str(v).strip() for v in entradas]
+            X, encontrados = clientes.matriz(ids, FEATURES)
+            if "DAYS_SINCE_LAST" in FEATURES:
+                dias = X[:, FEATURES.index("DAYS_SINCE_LAST")]
+            else:
+                dias = np.zeros(len(ids), dtype=np.float64)
+        else:
+            if not all(isinstance(e, dict) for e in entradas):
+                return jsonify({"error": "Não misture IDs e dicts no mesmo lote"}), 400
+
+            X = pipeline_features.matriz_features(entradas, FEATURES)
+            dias = pipeline_features.dias_desde_ultimo(X, FEATURES, entradas)
+            ids = [e.get("ID_CLIENTE") for e in entradas]
+            encontrados = np.ones(len(entradas), dtype=bool)
+
+        with metricas.etapa("/predict_batch", "modelo"):
+            resultados = _prever_lote(X, dias, m, explicar)
+
+        # Lotes por ID vêm da base, não do frontend: só os com features entram no monitor
+        if monitor is not None and not por_id:
+            with metricas.etapa("/predict_batch", "monitor"):
+                monitor.observar(entradas, X, resultados)
+
+        for i, res in enumerate(resultados):
+            if ids[i] is not None:
+                res["ID_CLIENTE"] = ids[i]
+            if not encontrados[i]:
+                resultados[i] = {"ID_CLIENTE": ids[i], "error": "Cliente não encontrado"}
+            elif res["usou_modelo"]:
+                metricas.contar("churn_predicoes_total", rota="/predict_batch", resultado="modelo")
+            else:
+                metricas.contar("churn_predicoes_total", rota="/predict_batch", resultado="regra")
+
+        return jsonify({"resultados": resultados, "total": len(resultados), "versao_modelo": m.versao})
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route("/score/<id_cliente>", methods=["GET"])
+def buscar_score(id_cliente):
+    """Score pré-calculado do cliente (não roda o modelo)."""
     try:
         if model is None:
             return jsonify({"error": "Modelo não carregado"}), 500
 
-        data = request.get_json() or {}
-
-        # -------------------------------------------------
-        # REGRA DE NEGÓCIO: CLIENTE INATIVO (FEATURES ZERADAS)
-        # (isso é o que você realmente tem na prática, pois você zera tudo no banco)
-        # -------------------------------------------------
-        if _features_zeradas(data):
-            return jsonify({
-                "percentual_churn": 0.0,
-                "nivel_risco": "BAIXO",
-                "motivo": "Cliente inativo (features zeradas por regra de negócio)",
-                "usou_modelo": False
-            })
-
-        # -------------------------------------------------
-        # REGRA DE NEGÓCIO: CLIENTE INATIVO (>= 366 DIAS)
-        # (mantida também, caso o front envie DAYS_SINCE_LAST real)
-        # -------------------------------------------------
-        days_since_last = int(_to_float(data.get("DAYS_SINCE_LAST", 0)))
-        if days_since_last >= 366:
-            return jsonify({
-                "percentual_churn": 0.0,
-                "nivel_risco": "BAIXO",
-                "motivo": "Cliente inativo há mais de 1 ano (regra de negócio)",
-                "usou_modelo": False
-            })
-
-        # -------------------------------------------------
-        # CHAMADA NORMAL DO MODELO (CLIENTE ATIVO)
-        # -------------------------------------------------
-        df = pd.DataFrame([data])
-        df = df.reindex(columns=FEATURES, fill_value=0)
-        df = df.applymap(_to_float)
-
-        proba_all = model.predict_proba(df)[0]
-        classes = list(model.classes_)
-
-        idx_churn = classes.index(1) if 1 in classes else 1
-        percentual = round(float(proba_all[idx_churn]) * 100, 2)
-
-        risco = (
-            "ALTO" if percentual >= 60
-            else "MODERADO" if percentual >= 30
-            else "BAIXO"
-        )
+        with metricas.etapa("/score/<id_cliente>", "busca"):
+            registro = tabela_scores.buscar(id_cliente)
+        if registro is None:
+            return jsonify({"error": "Cliente não encontrado"}), 404
+
+        return jsonify(registro)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route("/scores/top", methods=["GET"])
+def top_risco():
+    """Lista de retenção: os N clientes de maior risco (?n=50&nivel=ALTO)."""
+    try:
+        if model is None:
+            return jsonify({"error": "Modelo não carregado"}), 500
+
+        n = request.args.get("n", default=50, type=int)
+        nivel = request.args.get("nivel")
+        clientes_top = tabela_scores.top_risco(n, nivel)
 
         return jsonify({
-            "percentual_churn": percentual,
-            "nivel_risco": risco,
-            "usou_modelo": True
+            "clientes": clientes_top,
+            "total": len(clientes_top),
+            "versao_modelo": tabela_scores.versao_modelo
         })
-
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
+def _servir_estatico(arquivo, cache_control: str):
+    """Resposta com a melhor compressão aceita; 304 se o ETag do cliente ainda vale."""
+    codificacao, corpo = arquivo.escolher(request.headers.get("Accept-Encoding", ""))
+    etag = arquivo.etag if codificacao == "identity" else f"{arquivo.etag}-{codificacao}"
+
+    if request.if_none_match.contains(etag):
+        resposta = Response(status=304)
+    else:
+        resposta = Response(corpo, mimetype=arquivo.mimetype)
+        if codificacao != "identity":
+            resposta.headers["Content-Encoding"] = codificacao
+    resposta.set_etag(etag)
+    resposta.headers["Cache-Control"] = cache_control
+    resposta.headers["Vary"] = "Accept-Encoding"
+    return resposta
+
+
 @app.route("/", methods=["GET"])
-def serve_index():
+@app.route("/<pagina>.html", methods=["GET"])
+def serve_index(pagina="index"):
     try:
-        return send_from_directory(FRONTEND_DIR, "index.html")
-    except:
+        arquivo = ativos_estaticos.pagina(f"{pagina}.html")
+    except OSError:
         return jsonify({"error": "Pasta frontend não encontrada"}), 500
+    if arquivo is None:
+        return jsonify({"error": "Página não encontrada"}), 404
+    return _servir_estatico(arquivo, CACHE_PAGINA)
+
+
+@app.route("/ativos/<path:nome>", methods=["GET"])
+def servir_ativo(nome):
+    """script.js, style.css, logo.png e vendor/* com o hash do conteúdo no nome."""
+    arquivo = ativos_estaticos.ativo(nome)
+    if arquivo is None:
+        return jsonify({"error": "Arquivo não encontrado"}), 404
+    return _servir_estatico(arquivo, CACHE_IMUTAVEL)
+
+
+def _referencia_payload(dados: dict):
+    """DATA_REFERENCIA (AAAA-MM-DD) enviada pela tela; None se ausente ou inválida."""
+    try:
+        referencia = date.fromisoformat(str(dados.get(envelhecimento.COLUNA_DATA_REFERENCIA, "")).strip()[:10])
+    except ValueError:
+        return None
+    return min(referencia, date.today())
 
 
 @app.route("/salvar_historico", methods=["POST"])
@@ -168,31 +600,29 @@ def salvar_historico():
         dados = request.json or {}
         id_cliente = str(dados.get("ID_CLIENTE")).strip()
 
-        # --- TAREFA 1: ATUALIZAR A BASE_CLIENTES.CSV (SUBSTITUIÇÃO) ---
+        # --- TAREFA 1: ATUALIZAR A BASE DE CLIENTES (LOG DE ALTERAÇÕES) ---
+        # Uma linha anexada por alteração; o CSV é compactado em segundo plano
         if os.path.exists(DATABASE_PATH):
-            df_base = pd.read_csv(DATABASE_PATH, dtype=str)
-            df_base['ID_CLIENTE'] = df_base['ID_CLIENTE'].astype(str).str.strip()
-
-            if id_cliente in df_base['ID_CLIENTE'].values:
-                for feature in FEATURES:
-                    if feature in dados:
-                        df_base.loc[df_base['ID_CLIENTE'] == id_cliente, feature] = str(dados[feature])
-
-                df_base.to_csv(DATABASE_PATH, index=False)
+            valores = {f: dados[f] for f in FEATURES if f in dados}
+            # A tela devolve a data até onde os valores dela estão envelhecidos (a do
+            # /cliente, ou hoje depois do /atualizar_temporal); sem ela, mantém a da base
+            referencia = _referencia_payload(dados)
+            if "DAYS_SINCE_LAST" in valores and referencia is not None:
+                valores[envelhecimento.COLUNA_DATA_REFERENCIA] = envelhecimento.data_para_numero(referencia)
+
+            if clientes.atualizar(id_cliente, valores):
                 print(f"Base de Clientes atualizada para o ID: {id_cliente}")
+
+                # Repontua só o que mudou (normalmente apenas este cliente)
+                if model is not None:
+                    tabela_scores.atualizar()
             else:
                 print(f"ID {id_cliente} não encontrado na base_clientes para substituição.")
 
         # --- TAREFA 2: SALVAR NO HISTÓRICO (ADICIONAR LINHA) ---
-        log_path = os.path.join(BASE_DIR, "historico_analises.csv")
-        file_exists = os.path.exists(log_path)
-
-        with open(log_path, mode='a', newline='', encoding='utf-8') as f:
-            writer = csv.DictWriter(f, fieldnames=dados.keys())
-            if not file_exists:
-                writer.writeheader()
-            writer.writerow(dados)
-            print(f"Registro adicionado ao Histórico de Análises.")
+        # Esquema fixo no historico.db; chaves fora dele ficam em dados_extra
+        historico.registrar(dados)
+        print(f"Registro adicionado ao Histórico de Análises.")
 
         return jsonify({
             "status": "success",
@@ -207,20 +637,18 @@ def salvar_historico():
 @app.route("/cliente/<id_cliente>", methods=["GET"])
 def buscar_cliente(id_cliente):
     try:
-        df = pd.read_csv(DATABASE_PATH, dtype=str)
-        df.columns = df.columns.str.strip()
-        id_alvo = str(id_cliente).strip().split('.')[0]
-        df['ID_BUSCA'] = df['ID_CLIENTE'].astype(str).str.strip().str.split('.').str[0]
-        cliente = df[df['ID_BUSCA'] == id_alvo]
+        with metricas.etapa("/cliente/<id_cliente>", "busca"):
+            dados_retorno = clientes.buscar(id_cliente, FEATURES + [envelhecimento.COLUNA_DATA_REFERENCIA])
 
-        if cliente.empty:
+        if dados_retorno is None:
             return jsonify({"error": "Cliente não encontrado"}), 404
 
-        row = cliente.iloc[0]
-        dados_retorno = {}
-        for f in FEATURES:
-            val = str(row.get(f, "0")).replace(',', '.')
-            dados_retorno[f] = float(val) if val != 'nan' else 0.0
+        # Data até onde DAYS_SINCE_LAST / QTD_SOL_LAST_30D já estão envelhecidos
+        referencia = dados_retorno.pop(envelhecimento.COLUNA_DATA_REFERENCIA)
+        referencia = envelhecimento.referencias_efetivas(np.array([referencia]))[0]
+        dados_retorno[envelhecimento.COLUNA_DATA_REFERENCIA] = \
+            envelhecimento.numero_para_data(referencia).isoformat()
+
         return jsonify(dados_retorno)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -229,36 +657,33 @@ def buscar_cliente(id_cliente):
 @app.route("/atualizar_temporal/<id_cliente>", methods=["GET"])
 def atualizar_temporal(id_cliente):
     try:
-        # 1. Configuração da Data Base (conforme informado por você)
-        DATA_BASE_CSV = datetime(2025, 10, 31)
-        hoje = datetime.now()
-
-        # 2. Carregar dados
-        df = pd.read_csv(DATABASE_PATH, dtype=str)
-        df.columns = df.columns.str.strip()
-        id_alvo = str(id_cliente).strip().split('.')[0]
-        df['ID_BUSCA'] = df['ID_CLIENTE'].astype(str).str.strip().str.split('.').str[0]
-        cliente = df[df['ID_BUSCA'] == id_alvo]
-
-        if cliente.empty:
-            return jsonify({"error": "Cliente não encontrado"}), 404
+        # 1. Cada cliente guarda a data até onde já foi envelhecido
+        # (DATA_REFERENCIA; vazia = data da base, 31/10/2025)
+        hoje = date.today()
 
-        row = cliente.iloc[0]
+        # 2. Buscar cliente na base em memória
+        with metricas.etapa("/atualizar_temporal/<id_cliente>", "busca"):
+            row = clientes.buscar(id_cliente, ["DAYS_SINCE_LAST", "QTD_SOL_LAST_30D",
+                                               envelhecimento.COLUNA_DATA_REFERENCIA])
 
-        # --- LÓGICA DAYS_SINCE_LAST (SOMA) ---
-        dias_no_csv = int(float(str(row.get('DAYS_SINCE_LAST', '0')).replace(',', '.')))
-        dias_decorridos_desde_base = (hoje - DATA_BASE_CSV).days
-        novo_days_since = dias_no_csv + max(0, dias_decorridos_desde_base)
+        if row is None:
+            return jsonify({"error": "Cliente não encontrado"}), 404
 
-        # --- LÓGICA QTD_SOL_LAST_30D (ZERAGEM) ---
-        if novo_days_since > 30:
-            qtd_sol_final = 0
-        else:
-            qtd_sol_final = int(float(str(row.get('QTD_SOL_LAST_30D', '0')).replace(',', '.')))
+        # 3. Mesma regra do job da base inteira (envelhecimento.py):
+        # DAYS_SINCE_LAST soma os dias decorridos; QTD_SOL_LAST_30D zera após 30 dias
+        referencia = np.array([row[envelhecimento.COLUNA_DATA_REFERENCIA]])
+        novo_days_since, qtd_sol_final, _ = envelhecimento.envelhecer(
+            np.array([row["DAYS_SINCE_LAST"]]), np.array([row["QTD_SOL_LAST_30D"]]), referencia, hoje
+        )
 
         return jsonify({
-            "DAYS_SINCE_LAST": int(novo_days_since),
-            "QTD_SOL_LAST_30D": int(qtd_sol_final)
+            "DAYS_SINCE_LAST": int(novo_days_since[0]),
+            "QTD_SOL_LAST_30D": int(qtd_sol_final[0]),
+            "DATA_REFERENCIA": envelhecimento.numero_para_data(
+                envelhecimento.referencias_efetivas(referencia)[0]
+            ).isoformat(),
+            # Data até onde os valores acima estão envelhecidos (a tela devolve no salvar)
+            "DATA_REFERENCIA_NOVA": hoje.isoformat()
         })
 
     except Exception as e:
@@ -274,37 +699,15 @@ def atualizar_temporal(id_cliente):
 @app.route("/predict_legacy", methods=["POST"])
 def predict_legacy():
     try:
-        if model is None:
+        m = servido
+        if m is None:
             return jsonify({"error": "Modelo não carregado"}), 500
 
-        data = request.get_json() or {}
+        with metricas.etapa("/predict_legacy", "json"):
+            data = request.get_json() or {}
 
         # Aplicar a MESMA regra aqui, caso algum fluxo do front chame o legacy
-        if _features_zeradas(data):
-            return jsonify({
-                "percentual_churn": 0.0,
-                "nivel_risco": "BAIXO",
-                "motivo": "Cliente inativo (features zeradas por regra de negócio)",
-                "usou_modelo": False
-            })
-
-        days_since_last = int(_to_float(data.get("DAYS_SINCE_LAST", 0)))
-        if days_since_last >= 366:
-            return jsonify({
-                "percentual_churn": 0.0,
-                "nivel_risco": "BAIXO",
-                "motivo": "Cliente inativo há mais de 1 ano (regra de negócio)",
-                "usou_modelo": False
-            })
-
-        df = pd.DataFrame([data])
-        df = df.reindex(columns=FEATURES, fill_value=0)
-        df = df.applymap(_to_float)
-
-        proba = model.predict_proba(df)[0][1]
-        percentual = round(float(proba) * 100, 2)
-        risco = "ALTO" if percentual >= 60 else "MODERADO" if percentual >= 30 else "BAIXO"
-        return jsonify({"percentual_churn": percentual, "nivel_risco": risco, "usou_modelo": True})
+        return _responder_linha(data, "/predict_legacy", m)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -316,21 +719,13 @@ def predict_legacy():
 @app.route("/simular_contato/<id_cliente>", methods=["GET"])
 def simular_contato(id_cliente):
     try:
-        df = pd.read_csv(DATABASE_PATH, dtype=str)
-        df.columns = df.columns.str.strip()
-        id_alvo = str(id_cliente).strip().split('.')[0]
-        df['ID_BUSCA'] = df['ID_CLIENTE'].astype(str).str.strip().str.split('.').str[0]
-        cliente = df[df['ID_BUSCA'] == id_alvo]
+        with metricas.etapa("/simular_contato/<id_cliente>", "busca"):
+            row = clientes.buscar(id_cliente, ["TAXA_CONTATO_DIA"])
 
-        if cliente.empty:
+        if row is None:
             return jsonify({"error": "Cliente não encontrado"}), 404
 
-        row = cliente.iloc[0]
-
-        try:
-            valor_atual = float(str(row.get('TAXA_CONTATO_DIA', '0')).replace(',', '.'))
-        except:
-            valor_atual = 0.0
+        valor_atual = row["TAXA_CONTATO_DIA"]
 
         nova_taxa = valor_atual + 1.0
 
@@ -343,17 +738,26 @@ def simular_contato(id_cliente):
 
 @app.route("/historico", methods=["GET"])
 def listar_historico():
-    """Lista todo o histórico salvo"""
-    try:
-        arquivo_path = os.path.join(BASE_DIR, "historico.csv")
-        if not os.path.exists(arquivo_path):
-            return jsonify({"historico": []})
-
-        with open(arquivo_path, 'r', encoding='utf-8-sig') as f:
-            reader = csv.DictReader(f, delimiter=';')
-            historico = list(reader)
+    """Histórico salvo, mais recente primeiro.
 
-        return jsonify({"historico": historico})
+    Filtros: ?id_cliente=&desde=AAAA-MM-DD&ate=AAAA-MM-DD&nivel=ALTO. Sem
+    ?limite nem ?cursor vem o histórico inteiro (como sempre foi); com
+    ?limite=50 vem paginado e a próxima página sai de ?cursor=<proximo_cursor>
+    (mesmos filtros).
+    """
+    try:
+        args = request.args
+        limite = args.get("limite", type=int)
+        if limite is None and args.get("cursor"):
+            limite = LIMITE_HISTORICO_PADRAO
+        with metricas.etapa("/historico", "busca"):
+            pagina = historico.listar(
+                id_cliente=args.get("id_cliente"), desde=args.get("desde"), ate=args.get("ate"),
+                nivel=args.get("nivel"), limite=limite, cursor=args.get("cursor")
+            )
+        return jsonify(pagina)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -362,25 +766,154 @@ def listar_historico():
 def estatisticas():
     """Retorna estatísticas básicas do sistema"""
     try:
-        historico_count = 0
-        historico_path = os.path.join(BASE_DIR, "historico.csv")
-        if os.path.exists(historico_path):
-            with open(historico_path, 'r', encoding='utf-8-sig') as f:
-                historico_count = sum(1 for line in f) - 1
+        contagens = historico.contagens()
 
         base_exists = os.path.exists(DATABASE_PATH)
         modelo_exists = os.path.exists(MODEL_PATH)
 
         return jsonify({
-            "historico_registros": max(0, historico_count),
+            "historico_registros": contagens.pop("total"),
+            "historico_por_nivel": contagens,
             "base_clientes_existe": base_exists,
             "modelo_existe": modelo_exists,
-            "features_suportadas": FEATURES
+            "features_suportadas": FEATURES,
+            "cache_predicoes": cache_predicoes.estatisticas()
         })
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
+# =========================
+# DASHBOARD
+# =========================
+# Filtros comuns: ?data_inicio=AAAA-MM-DD&data_fim=AAAA-MM-DD&status=ativo|churn&genero=&busca=
+
+def _filtros_dashboard() -> tuple:
+    args = request.args
+    return dashboard.normalizar_filtros(
+        args.get("data_inicio"), args.get("data_fim"), args.get("status"),
+        args.get("genero"), args.get("busca")
+    )
+
+
+def _erro_dashboard(e: Exception):
+    if isinstance(e, FileNotFoundError):
+        return jsonify({"error": str(e)}), 404
+    if isinstance(e, ValueError):
+        return jsonify({"error": str(e)}), 400
+    return jsonify({"error": str(e)}), 500
+
+
+@app.route("/dashboard/resumo", methods=["GET"])
+def dashboard_resumo():
+    """KPIs, churn por serviço/gênero/cidade/canal, série mensal e faixas de idade."""
+    try:
+        filtros = _filtros_dashboard()
+        with metricas.etapa("/dashboard/resumo", "agregacao"):
+            return jsonify(dashboard.resumo(filtros))
+    except Exception as e:
+        return _erro_dashboard(e)
+
+
+@app.route("/dashboard/churn/<dimensao>", methods=["GET"])
+def dashboard_churn(dimensao):
+    """Taxa de churn por genero|servico|cidade|canal (?limite=10&ordem=total|churn|taxa_churn)."""
+    try:
+        filtros = _filtros_dashboard()
+        limite = request.args.get("limite", type=int)
+        ordem = request.args.get("ordem")
+        with metricas.etapa("/dashboard/churn/<dimensao>", "agregacao"):
+            return jsonify({"dimensao": dimensao, "valores": dashboard.churn_por(dimensao, filtros, limite, ordem)})
+    except Exception as e:
+        return _erro_dashboard(e)
+
+
+@app.route("/dashboard/serie", methods=["GET"])
+def dashboard_serie():
+    """Série temporal da taxa de churn (?periodo=mes|dia)."""
+    try:
+        filtros = _filtros_dashboard()
+        periodo = request.args.get("periodo", "mes")
+        with metricas.etapa("/dashboard/serie", "agregacao"):
+            return jsonify({"periodo": periodo, "serie": dashboard.serie(filtros, periodo)})
+    except Exception as e:
+        return _erro_dashboard(e)
+
+
+@app.route("/dashboard/registros", methods=["GET"])
+def dashboard_registros():
+    """Uma página da tabela do dashboard (?pagina=1&por_pagina=10)."""
+    try:
+        filtros = _filtros_dashboard()
+        return jsonify(dashboard.registros(
+            filtros, request.args.get("pagina", default=1, type=int),
+            request.args.get("por_pagina", default=10, type=int)
+        ))
+    except Exception as e:
+        return _erro_dashboard(e)
+
+
+@app.route("/dashboard/exportar", methods=["GET"])
+def dashboard_exportar():
+    """CSV com as linhas filtradas (gerado em blocos, sem montar o arquivo na memória)."""
+    try:
+        linhas = dashboard.exportar_csv(_filtros_dashboard())
+        nome = f"export_dashboard_{date.today().isoformat()}.csv"
+        return Response(linhas, mimetype="text/csv; charset=utf-8",
+                        headers={"Content-Disposition": f"attachment; filename={nome}"})
+    except Exception as e:
+        return _erro_dashboard(e)
+
+
+# =========================
+# ADMINISTRAÇÃO DO MODELO
+# =========================
+
+def _admin_autorizado() -> bool:
+    if ADMIN_TOKEN:
+        return request.headers.get("X-Admin-Token") == ADMIN_TOKEN
+    return request.remote_addr in ("127.0.0.1", "::1")
+
+
+@app.route("/admin/modelo", methods=["GET"])
+def estado_modelo():
+    """Versão servida por este worker, versão ativa no registro e versões registradas."""
+    if not _admin_autorizado():
+        return jsonify({"error": "Não autorizado"}), 403
+    return jsonify(recarregador.estado())
+
+
+@app.route("/admin/modelo", methods=["POST"])
+def trocar_modelo():
+    """Carrega e valida {"versao": ...} do registro em segundo plano e troca a quente."""
+    if not _admin_autorizado():
+        return jsonify({"error": "Não autorizado"}), 403
+    if servido is None:
+        return jsonify({"error": "Modelo não carregado"}), 500
+
+    versao = str((request.get_json(silent=True) or {}).get("versao", "")).strip()
+    if versao not in registro_modelos.ler_manifesto(REGISTRO_DIR)["versoes"]:
+        return jsonify({"error": f"Versão '{versao}' não está no registro"}), 404
+    if versao == servido.versao:
+        return jsonify({"status": "ja_ativa", "versao": versao})
+
+    if not recarregador.solicitar(versao, gravar_manifesto=True):
+        return jsonify({"error": "Já existe uma troca de modelo em andamento"}), 409
+    return jsonify({"status": "carregando", "versao": versao}), 202
+
+
+# =========================
+# MONITOR DE DRIFT
+# =========================
+
+@app.route("/monitor/drift", methods=["GET"])
+def monitor_drift():
+    """PSI/KS contra o perfil do treino e taxas de ausentes/coagidos (janela e acumulado)."""
+    if monitor is None:
+        return jsonify({"error": "Monitor desligado (CHURN_MONITOR=0) ou modelo não carregado"}), 404
+    return jsonify(dict(monitor.relatorio(), versao_modelo=MODEL_VERSION, worker_pid=os.getpid()))
+
+
 # =========================
 # HEALTH CHECK
 # =========================
@@ -391,6 +924,7 @@ def health_check():
     status = {
         "status": "healthy",
         "model_loaded": os.path.exists(MODEL_PATH),
+        "versao_modelo": MODEL_VERSION,
         "database_exists": os.path.exists(DATABASE_PATH),
         "timestamp": datetime.now().isoformat()
     }
@@ -0,0 +1,191 @@
+"""
+API SÓ DE INFERÊNCIA (SUBIDA RÁPIDA, POUCA MEMÓRIA)
+
+Serve /predict, /predict_batch (lista de dicts de features) e /health com
+as MESMAS respostas do api.py (?explain=true inclusive), mas carregando o
+modelo leve (.npz gerado por `python modelo_leve.py exportar`) em vez do
+.joblib: sem sklearn, pandas, joblib, base de clientes, dashboard ou
+histórico na subida.
+Para o resto (busca por ID, scores, histórico, dashboard, frontend,
+troca de modelo a quente) continue usando o api.py.
+
+Uso (na pasta ProjetoMaxx):
+    python modelo_leve.py exportar
+    gunicorn -c gunicorn.conf.py api_inferencia:app
+Modelo em outro lugar: CHURN_MODELO_LEVE=/caminho/modelo.npz
+
+Tempo de import e memória contra o api.py:
+    python benchmarks/bench_inicializacao.py
+"""
+
+import os
+from datetime import datetime
+
+import numpy as np
+from flask import Flask, jsonify, request
+
+try:
+    from flask_cors import CORS
+except ImportError:  # opcional: só o frontend em outra origem precisa
+    CORS = None
+
+import modelo_leve
+import pipeline_features
+from cache_predicoes import CachePredicoes
+
+# =========================
+# CONFIGURAÇÕES
+# =========================
+MODELO_LEVE_PATH = os.environ.get("CHURN_MODELO_LEVE", modelo_leve.MODELO_LEVE_PATH)
+
+# Cache LRU de predições do /predict ("0" no tamanho desliga), como no api.py
+CACHE_TAMANHO = int(os.environ.get("CHURN_CACHE_TAMANHO", 4096))
+CACHE_TTL_S = float(os.environ.get("CHURN_CACHE_TTL_S", 300))
+
+app = Flask(__name__)
+if CORS is not None:
+    CORS(app)
+
+# =========================
+# CARREGAMENTO DO MODELO
+# =========================
+servido = None
+if os.path.exists(MODELO_LEVE_PATH):
+    servido = modelo_leve.carregar(MODELO_LEVE_PATH)
+    print(f"Modelo leve {servido.versao} carregado ({len(servido.features)} features)")
+else:
+    print(f"ERRO: Modelo leve não encontrado em {MODELO_LEVE_PATH} (python modelo_leve.py exportar)")
+
+FEATURES = servido.features if servido else []
+MODEL_VERSION = servido.versao if servido else None
+
+cache_predicoes = CachePredicoes(CACHE_TAMANHO, CACHE_TTL_S, MODELO_LEVE_PATH, MODEL_VERSION)
+
+
+# =========================
+# FUNÇÕES AUXILIARES
+# =========================
+
+def _prever_proba(X_linha: np.ndarray) -> np.ndarray:
+    chave = cache_predicoes.chave(X_linha, servido.versao) if cache_predicoes.ativo else None
+    proba = cache_predicoes.obter(chave) if chave is not None else None
+    if proba is None:
+        proba = servido.scorer.predict_proba(X_linha[None, :])[0]
+        if chave is not None:
+            cache_predicoes.guardar(chave, proba)
+    return proba
+
+
+def _quer_explicacao() -> bool:
+    return request.args.get("explain", "").lower() in ("1", "true", "sim")
+
+
+def _prever_lote(X: np.ndarray, dias_desde_ultimo: np.ndarray, explicar: bool = False) -> list:
+    zeradas, inativo_1_ano, usar_modelo = pipeline_features.aplicar_regras(X, dias_desde_ultimo)
+
+    probas = np.zeros(X.shape[0], dtype=np.float64)
+    if usar_modelo.any():
+        probas[usar_modelo] = servido.scorer.predict_proba(X[usar_modelo])[:, servido.idx_churn]
+
+    saida = pipeline_features.resultados(zeradas, inativo_1_ano, pipeline_features.percentuais(probas))
+    if explicar:
+        linhas = np.flatnonzero(usar_modelo)
+        explicacoes = servido.explicador.explicar(X[linhas]) if len(linhas) else []
+        for res in saida:
+            res["explicacao"] = None
+        for i, explicacao in zip(linhas, explicacoes):
+            saida[i]["explicacao"] = explicacao
+    return saida
+
+
+def _explicacao_indisponivel():
+    """Resposta de erro se ?explain=true não puder ser atendido (None se puder)."""
+    if _quer_explicacao() and servido.explicador is None:
+        return jsonify({"error": "Explicação indisponível (exporte o modelo leve de novo)"}), 400
+    return None
+
+
+# =========================
+# ROTAS
+# =========================
+
+@app.route("/predict", methods=["POST"])
+def predict():
+    try:
+        if servido is None:
+            return jsonify({"error": "Modelo não carregado"}), 500
+        erro = _explicacao_indisponivel()
+        if erro:
+            return erro
+
+        data = request.get_json() or {}
+        X = pipeline_features.matriz_features(data, FEATURES)
+        dias = pipeline_features.dias_desde_ultimo(X, FEATURES, data)
+        zeradas, inativo_1_ano, _ = pipeline_features.aplicar_regras(X, dias)
+
+        percentual = [0.0]
+        if not zeradas[0] and not inativo_1_ano[0]:
+            percentual = pipeline_features.percentuais([_prever_proba(X[0])[servido.idx_churn]])
+
+        resultado = pipeline_features.resultados(zeradas, inativo_1_ano, percentual)[0]
+        resultado["versao_modelo"] = servido.versao
+        if _quer_explicacao():
+            resultado["explicacao"] = servido.explicador.explicar(X)[0] if resultado["usou_modelo"] else None
+        return jsonify(resultado)
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route("/predict_batch", methods=["POST"])
+def predict_batch():
+    """Predição em lote: {"clientes": [ {features...}, ... ]} ou a lista direto.
+
+    Sem a base de clientes, lotes por ID só no api.py.
+    """
+    try:
+        if servido is None:
+            return jsonify({"error": "Modelo não carregado"}), 500
+        erro = _explicacao_indisponivel()
+        if erro:
+            return erro
+
+        data = request.get_json()
+        entradas = data.get("clientes", data.get("ids")) if isinstance(data, dict) else data
+
+        if not isinstance(entradas, list):
+            return jsonify({"error": "Envie uma lista em 'clientes' ou 'ids'"}), 400
+
+        if not entradas:
+            return jsonify({"resultados": [], "total": 0, "versao_modelo": servido.versao})
+
+        if not all(isinstance(e, dict) for e in entradas):
+            return jsonify({"error": "Lotes por ID_CLIENTE exigem a base de clientes (use o api.py)"}), 400
+
+        X = pipeline_features.matriz_features(entradas, FEATURES)
+        dias = pipeline_features.dias_desde_ultimo(X, FEATURES, entradas)
+        resultados = _prever_lote(X, dias, _quer_explicacao())
+
+        for entrada, res in zip(entradas, resultados):
+            if entrada.get("ID_CLIENTE") is not None:
+                res["ID_CLIENTE"] = entrada["ID_CLIENTE"]
+
+        return jsonify({"resultados": resultados, "total": len(resultados), "versao_modelo": servido.versao})
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route("/health", methods=["GET"])
+def health_check():
+    return jsonify({
+        "status": "healthy" if servido is not None else "sem_modelo",
+        "modo": "inferencia",
+        "model_loaded": servido is not None,
+        "versao_modelo": MODEL_VERSION,
+        "timestamp": datetime.now().isoformat()
+    })
+
+
+if __name__ == "__main__":
+    app.run(port=int(os.environ.get("PORT", 5001)))
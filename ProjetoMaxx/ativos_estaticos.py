@@ -0,0 +1,251 @@
+"""
+FRONTEND ESTÁTICO (NOMES COM HASH, ETAG E COMPRESSÃO)
+
+A API serve a pasta frontend/ sem depender de CDN nem de revalidação a cada
+visita:
+
+- script.js, style.css, logo.png e as bibliotecas em frontend/vendor/ são
+  servidos como /ativos/<nome>.<hash>.<ext> (hash do conteúdo), com
+  Cache-Control immutable: o navegador guarda por um ano e só baixa de novo
+  quando o arquivo muda (o nome muda junto).
+- As páginas (index.html, login.html, cadastro.html) são reescritas para
+  apontar para esses nomes e vão com ETag + no-cache (304 quando não mudou).
+- Textos (HTML/JS/CSS) ficam comprimidos em gzip (e brotli, se o pacote
+  "brotli" estiver instalado) uma vez por processo, não por requisição.
+- Chart.js, o plugin de rótulos e o xlsx são referenciados como
+  vendor/<arquivo> (index.html e ensureLibs do script.js) e saem da cópia
+  versionada em frontend/vendor/; só se o arquivo faltar a página é
+  reescrita para o CDN de origem (VENDOR).
+
+Para atualizar as cópias em frontend/vendor/ (na pasta ProjetoMaxx):
+    python ativos_estaticos.py baixar
+Tamanhos com e sem compressão:
+    python ativos_estaticos.py
+"""
+
+import argparse
+import gzip
+import hashlib
+import mimetypes
+import os
+import threading
+import urllib.request
+from typing import Dict, Optional, Tuple
+
+try:
+    import brotli
+except ImportError:  # opcional: sem ele, só gzip
+    brotli = None
+
+# Arquivo em frontend/vendor/ -> URL de origem (usada pelo "baixar" e se o arquivo faltar)
+VENDOR = {
+    "chart.umd.min.js": "https://cdn.jsdelivr.net/npm/chart.js@4.4.1/dist/chart.umd.min.js",
+    "chartjs-plugin-datalabels.min.js":
+        "https://cdn.jsdelivr.net/npm/chartjs-plugin-datalabels@2.2.0/dist/chartjs-plugin-datalabels.min.js",
+    "xlsx.full.min.js": "https://cdn.jsdelivr.net/npm/xlsx@0.18.5/dist/xlsx.full.min.js",
+}
+
+PASTA_VENDOR = "vendor"
+PAGINAS = ("index.html", "login.html", "cadastro.html")
+EXTENSOES_ATIVOS = (".js", ".css", ".png", ".jpg", ".svg", ".ico", ".woff2")
+EXTENSOES_TEXTO = (".html", ".js", ".css", ".svg")
+
+PREFIXO_URL = "/ativos/"
+CACHE_IMUTAVEL = "public, max-age=31536000, immutable"
+CACHE_PAGINA = "no-cache"
+
+
+class Arquivo:
+    """Conteúdo pronto para servir: original + variantes comprimidas e ETag."""
+    __slots__ = ("nome", "mimetype", "etag", "variantes")
+
+    def __init__(self, nome: str, conteudo: bytes, hash_conteudo: str):
+        self.nome = nome
+        self.mimetype = mimetypes.guess_type(nome)[0] or "application/octet-stream"
+        if self.mimetype.startswith("text/") or self.mimetype.endswith("javascript"):
+            self.mimetype += "; charset=utf-8"
+        self.etag = hash_conteudo
+        self.variantes: Dict[str, bytes] = {"identity": conteudo}
+
+        if nome.endswith(EXTENSOES_TEXTO):
+            # mtime=0: o mesmo conteúdo gera sempre os mesmos bytes
+            comprimido = gzip.compress(conteudo, compresslevel=9, mtime=0)
+            if len(comprimido) < len(conteudo):
+                self.variantes["gzip"] = comprimido
+            if brotli is not None:
+                comprimido = brotli.compress(conteudo, quality=11)
+                if len(comprimido) < len(conteudo):
+                    self.variantes["br"] = comprimido
+
+    def escolher(self, accept_encoding: str) -> Tuple[str, bytes]:
+        """Melhor variante aceita pelo cliente (br > gzip > sem compressão)."""
+        aceitas = _codificacoes_aceitas(accept_encoding)
+        for codificacao in ("br", "gzip"):
+            if codificacao in aceitas and codificacao in self.variantes:
+                return codificacao, self.variantes[codificacao]
+        return "identity", self.variantes["identity"]
+
+
+def _codificacoes_aceitas(accept_encoding: str) -> set:
+    aceitas = set()
+    for parte in (accept_encoding or "").split(","):
+        nome, _, params = parte.strip().partition(";")
+        if nome and params.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            aceitas.add(nome.strip().lower())
+    return aceitas
+
+
+def _hash(conteudo: bytes, tamanho: int = 10) -> str:
+    return hashlib.sha256(conteudo).hexdigest()[:tamanho]
+
+
+def nome_com_hash(nome: str, hash_conteudo: str) -> str:
+    """vendor/xlsx.full.min.js -> vendor/xlsx.full.min.<hash>.js"""
+    base, ext = os.path.splitext(nome)
+    return f"{base}.{hash_conteudo}{ext}"
+
+
+# ======================================================
+# CONJUNTO DE ARQUIVOS DO FRONTEND
+# ======================================================
+
+class AtivosEstaticos:
+
+    def __init__(self, pasta: str):
+        self.pasta = pasta
+        self._lock = threading.Lock()
+        self._assinatura = None
+        self.paginas: Dict[str, Arquivo] = {}
+        # Só o hash atual de cada arquivo (nome com hash -> conteúdo)
+        self.ativos: Dict[str, Arquivo] = {}
+        self.urls: Dict[str, str] = {}
+
+    def _arquivos(self):
+        nomes = []
+        for nome in sorted(os.listdir(self.pasta)):
+            if nome.endswith(EXTENSOES_ATIVOS) or nome in PAGINAS:
+                nomes.append(nome)
+        pasta_vendor = os.path.join(self.pasta, PASTA_VENDOR)
+        if os.path.isdir(pasta_vendor):
+            nomes += [f"{PASTA_VENDOR}/{n}" for n in sorted(os.listdir(pasta_vendor)) if n.endswith(EXTENSOES_ATIVOS)]
+        return nomes
+
+    def _assinatura_pasta(self):
+        assinatura = []
+        for nome in self._arquivos():
+            st = os.stat(os.path.join(self.pasta, nome))
+            assinatura.append((nome, st.st_mtime_ns, st.st_size))
+        return tuple(assinatura)
+
+    def _ler(self, nome: str) -> bytes:
+        with open(os.path.join(self.pasta, nome), "rb") as f:
+            return f.read()
+
+    @staticmethod
+    def _reescrever(texto: str, urls: Dict[str, str]) -> str:
+        """Troca referências por nomes relativos (script.js, vendor/xlsx.full.min.js) pelas URLs finais."""
+        for original, nova in urls.items():
+            for aspas in ('"', "'"):
+                texto = texto.replace(f"{aspas}{original}{aspas}", f"{aspas}{nova}{aspas}")
+        return texto
+
+    def construir(self):
+        """(Re)lê a pasta: vendor -> JS/CSS/imagens (já apontando para o vendor) -> páginas."""
+        arquivos = self._arquivos()
+        urls: Dict[str, str] = {}
+        ativos: Dict[str, Arquivo] = {}
+        paginas: Dict[str, Arquivo] = {}
+
+        def registrar(nome: str, conteudo: bytes):
+            h = _hash(conteudo)
+            nome_final = nome_com_hash(nome, h)
+            # Mesmo hash = mesmo conteúdo: reaproveita a compressão da construção anterior
+            ativos[nome_final] = self.ativos.get(nome_final) or Arquivo(nome_final, conteudo, h)
+            urls[nome] = PREFIXO_URL + nome_final
+
+        for nome in arquivos:
+            if nome.startswith(PASTA_VENDOR + "/"):
+                registrar(nome, self._ler(nome))
+        for arquivo_vendor, url_origem in VENDOR.items():
+            urls.setdefault(f"{PASTA_VENDOR}/{arquivo_vendor}", url_origem)
+
+        vendor = dict(urls)
+        for nome in arquivos:
+            if nome.startswith(PASTA_VENDOR + "/") or nome in PAGINAS:
+                continue
+            conteudo = self._ler(nome)
+            if nome.endswith(EXTENSOES_TEXTO):
+                conteudo = self._reescrever(conteudo.decode("utf-8"), vendor).encode("utf-8")
+            registrar(nome, conteudo)
+
+        for nome in arquivos:
+            if nome in PAGINAS:
+                conteudo = self._reescrever(self._ler(nome).decode("utf-8"), urls).encode("utf-8")
+                paginas[nome] = Arquivo(nome, conteudo, _hash(conteudo))
+
+        self.ativos, self.paginas, self.urls = ativos, paginas, urls
+
+    def atualizar(self):
+        """Reconstrói se algum arquivo da pasta mudou (conferido a cada página servida)."""
+        assinatura = self._assinatura_pasta()
+        if assinatura != self._assinatura:
+            with self._lock:
+                if assinatura != self._assinatura:
+                    self.construir()
+                    self._assinatura = assinatura
+
+    def pagina(self, nome: str) -> Optional[Arquivo]:
+        self.atualizar()
+        return self.paginas.get(nome)
+
+    def ativo(self, nome_com_hash: str) -> Optional[Arquivo]:
+        if not self.ativos:
+            self.atualizar()
+        return self.ativos.get(nome_com_hash)
+
+
+# ======================================================
+# CLI: baixar bibliotecas / relatório de tamanhos
+# ======================================================
+
+def baixar_vendor(pasta_frontend: str):
+    destino = os.path.join(pasta_frontend, PASTA_VENDOR)
+    os.makedirs(destino, exist_ok=True)
+    for nome, url in VENDOR.items():
+        with urllib.request.urlopen(url, timeout=60) as resposta:
+            conteudo = resposta.read()
+        with open(os.path.join(destino, nome), "wb") as f:
+            f.write(conteudo)
+        print(f"  {nome:<36} {len(conteudo) / 1024:>8.1f} KB  sha256 {_hash(conteudo, 64)}")
+
+
+def relatorio(pasta_frontend: str):
+    ativos = AtivosEstaticos(pasta_frontend)
+    ativos.construir()
+    print(f"\n{'arquivo':<52} {'original':>10} {'gzip':>10} {'br':>10}")
+    for nome, arquivo in list(ativos.paginas.items()) + sorted(ativos.ativos.items()):
+        v = arquivo.variantes
+        tamanhos = [f"{len(v[k]) / 1024:>9.1f}K" if k in v else f"{'-':>10}" for k in ("identity", "gzip", "br")]
+        print(f"{nome:<52} " + " ".join(tamanhos))
+    faltando = [n for n in VENDOR if not os.path.exists(os.path.join(pasta_frontend, PASTA_VENDOR, n))]
+    if faltando:
+        print(f"\nSem cópia em frontend/vendor/ (servidos do CDN): {', '.join(faltando)}"
+              f" -> python ativos_estaticos.py baixar")
+    if brotli is None:
+        print("Pacote 'brotli' não instalado: só gzip")
+
+
+def main():
+    pasta_frontend = os.path.join(os.path.dirname(os.path.abspath(__file__)), "frontend")
+    parser = argparse.ArgumentParser(description="Arquivos estáticos do frontend")
+    parser.add_argument("comando", nargs="?", choices=["relatorio", "baixar"], default="relatorio")
+    args = parser.parse_args()
+
+    if args.comando == "baixar":
+        print(f"Baixando bibliotecas para {os.path.join(pasta_frontend, PASTA_VENDOR)}")
+        baixar_vendor(pasta_frontend)
+    relatorio(pasta_frontend)
+
+
+if __name__ == "__main__":
+    main()
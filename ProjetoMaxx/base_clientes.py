@@ -0,0 +1,563 @@
+"""
+BASE DE CLIENTES EM MEMÓRIA
+
+Carrega o base_clientes.csv uma única vez por processo e mantém:
+- as colunas numéricas em arrays NumPy (float64)
+- um índice hash ID normalizado -> linha
+
+O arquivo é recarregado automaticamente quando o mtime muda, então
+as consultas são O(1) e não montam DataFrame por requisição.
+
+Escrita (salvar_historico): em vez de reescrever o CSV inteiro a cada
+alteração, cada mudança vira UMA linha anexada em
+base_clientes_alteracoes.jsonl, com lock entre threads e entre processos.
+A alteração é aplicada na memória na hora (o /cliente já enxerga) e uma
+thread em segundo plano compacta o log no CSV de tempos em tempos.
+
+Formato colunar (converter_base.py): a base também pode ficar em
+base_clientes.colunar/, uma coluna por arquivo .npy (float64) mais o
+índice de IDs. Quando essa pasta existe e está em dia com o CSV, as
+colunas são mapeadas em memória (mmap, sem cópia e sem parse de texto);
+o CSV só é lido quando o formato colunar não existe (ou ficou desatualizado).
+
+Envelhecimento (envelhecimento.py): envelhecer() leva DAYS_SINCE_LAST /
+QTD_SOL_LAST_30D da base inteira até uma data, reescrevendo o CSV do
+mesmo jeito que a compactação.
+"""
+
+import atexit
+import json
+import os
+import threading
+from contextlib import contextmanager
+from datetime import date
+from typing import Dict, Iterable, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+import numpy as np
+import pandas as pd
+
+import envelhecimento
+from envelhecimento import COLUNA_DATA_REFERENCIA, COLUNA_DIAS, COLUNA_SOL_30D
+from pipeline_features import normalizar_id
+
+COLUNA_ID = "ID_CLIENTE"
+
+LOG_SUFIXO = "_alteracoes.jsonl"
+SUFIXO_COLUNAR = ".colunar"
+COMPACTAR_A_CADA_S = 30
+COMPACTAR_COM_N_ALTERACOES = 200
+
+
+def _coluna_para_float(serie: pd.Series) -> np.ndarray:
+    """Converte uma coluna texto (inclusive com vírgula decimal) para float64; inválidos viram NaN."""
+    if pd.api.types.infer_dtype(serie) in ("string", "empty"):
+        try:
+            # Coluna limpa (o caso comum): o parser numérico direto, sem as operações de texto
+            return np.array(pd.to_numeric(serie), dtype=np.float64)
+        except (ValueError, TypeError):
+            pass
+    texto = serie.astype(str).str.strip().str.replace(",", ".", regex=False)
+    return np.array(pd.to_numeric(texto, errors="coerce"), dtype=np.float64)
+
+
+def _formatar_numeros(valores: np.ndarray) -> np.ndarray:
+    """Números para o texto do CSV ("207", não "207.0"); NaN vira célula vazia."""
+    texto = np.full(len(valores), "", dtype=object)
+    validos = ~np.isnan(valores)
+    inteiros = validos & (valores == np.floor(valores)) & (np.abs(valores) < 2 ** 53)
+    texto[inteiros] = valores[inteiros].astype(np.int64).astype(str)
+    outros = validos & ~inteiros
+    texto[outros] = [repr(v) for v in valores[outros].tolist()]
+    return texto
+
+
+def _texto_para_float(v) -> float:
+    """Mesma conversão de _coluna_para_float, para um valor só."""
+    try:
+        return float(str(v).strip().replace(",", "."))
+    except ValueError:
+        return float("nan")
+
+
+def _assinatura_arquivo(caminho: str):
+    try:
+        st = os.stat(caminho)
+    except FileNotFoundError:
+        return None
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+
+# ======================================================
+# FORMATO COLUNAR (.npy + ÍNDICE DE IDs)
+# ======================================================
+
+def caminho_colunar(caminho_csv: str) -> str:
+    return os.path.splitext(caminho_csv)[0] + SUFIXO_COLUNAR
+
+
+def _ler_meta(pasta: str) -> Optional[dict]:
+    try:
+        with open(os.path.join(pasta, "meta.json"), encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def salvar_colunar(df: pd.DataFrame, caminho_csv: str) -> str:
+    """Grava a base (DataFrame texto, como lido do CSV) em colunas .npy tipadas.
+
+    Cada gravação usa um prefixo de versão novo e o meta.json é trocado por
+    último (os.replace), então quem está lendo nunca vê uma versão pela metade.
+    """
+    pasta = caminho_colunar(caminho_csv)
+    os.makedirs(pasta, exist_ok=True)
+
+    versao = (_ler_meta(pasta) or {}).get("versao", 0) + 1
+    prefixo = f"v{versao}_"
+
+    ids = np.array([normalizar_id(v) for v in df[COLUNA_ID].tolist()], dtype=str)
+    np.save(os.path.join(pasta, prefixo + COLUNA_ID + ".npy"), ids)
+
+    colunas = [c for c in df.columns if c != COLUNA_ID]
+    for c in colunas:
+        np.save(os.path.join(pasta, prefixo + c + ".npy"), _coluna_para_float(df[c]))
+
+    assinatura_csv = _assinatura_arquivo(caminho_csv)
+    meta = {
+        "versao": versao,
+        "linhas": len(ids),
+        "colunas": colunas,
+        "csv": list(assinatura_csv[1:]) if assinatura_csv else None,
+    }
+    tmp = os.path.join(pasta, "meta.json.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, os.path.join(pasta, "meta.json"))
+
+    # Versões antigas: remove o que der (no Windows, arquivos ainda mapeados ficam)
+    for nome in os.listdir(pasta):
+        if nome.endswith(".npy") and not nome.startswith(prefixo):
+            try:
+                os.remove(os.path.join(pasta, nome))
+            except OSError:
+                pass
+
+    return pasta
+
+
+def carregar_colunas(caminho_csv: str, formato: str = "auto"):
+    """Lê a base como (ids, {coluna: array float64}, formato_usado).
+
+    formato="auto" usa o colunar (mmap copy-on-write) quando existe e está em
+    dia com o CSV; senão lê o CSV. "csv"/"colunar" forçam um dos dois.
+    """
+    pasta = caminho_colunar(caminho_csv)
+
+    if formato in ("auto", "colunar"):
+        meta = _ler_meta(pasta)
+        assinatura_csv = _assinatura_arquivo(caminho_csv)
+        em_dia = meta is not None and (
+            assinatura_csv is None or meta.get("csv") == list(assinatura_csv[1:])
+        )
+
+        if em_dia or (meta is not None and formato == "colunar"):
+            prefixo = os.path.join(pasta, f"v{meta['versao']}_")
+            ids = np.load(prefixo + COLUNA_ID + ".npy", mmap_mode="r").tolist()
+            # "c" = copy-on-write: leitura sem cópia, escrita só na memória do processo
+            colunas = {c: np.load(prefixo + c + ".npy", mmap_mode="c") for c in meta["colunas"]}
+            return ids, colunas, "colunar"
+
+        if meta is not None:
+            print("Formato colunar desatualizado em relação ao CSV (rode converter_base.py); lendo o CSV")
+
+    df = pd.read_csv(caminho_csv, dtype=str)
+    df.columns = df.columns.str.strip()
+
+    ids = [normalizar_id(v) for v in df[COLUNA_ID].tolist()]
+    colunas = {
+        c: _coluna_para_float(df[c])
+        for c in df.columns
+        if c != COLUNA_ID
+    }
+    return ids, colunas, "csv"
+
+
+@contextmanager
+def _trava_arquivo(caminho: str):
+    """Lock exclusivo entre processos (fcntl no Linux/macOS, msvcrt no Windows)."""
+    with open(caminho, "a+b") as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class _Snapshot:
+    """Estado da base; trocado por inteiro a cada recarga do CSV.
+
+    Alterações vindas do log são aplicadas nos próprios arrays.
+    """
+
+    __slots__ = ("ids", "colunas", "indice")
+
+    def __init__(self, ids: List[str], colunas: Dict[str, np.ndarray], indice: Dict[str, int]):
+        self.ids = ids
+        self.colunas = colunas
+        self.indice = indice
+
+
+class BaseClientes:
+
+    def __init__(self, caminho: str):
+        self.caminho = caminho
+        self.caminho_log = os.path.splitext(caminho)[0] + LOG_SUFIXO
+        self.caminho_trava = caminho + ".lock"
+
+        self._lock = threading.RLock()
+        self._assinatura = None
+        self._offset_log = 0
+        self._snap = _Snapshot([], {}, {})
+
+        # Incrementa a cada mudança (recarga ou alteração do log): quem guarda
+        # dados derivados sabe quando conferir
+        self.geracao = 0
+
+        # Compactação em segundo plano (iniciada na primeira escrita)
+        self._pendentes = 0
+        self._acordar = threading.Event()
+        self._compactador: Optional[threading.Thread] = None
+
+    # --------------------------------------------------
+    # CARREGAMENTO
+    # --------------------------------------------------
+    def _carregar(self) -> _Snapshot:
+        ids, colunas, formato = carregar_colunas(self.caminho)
+
+        # Mantém a PRIMEIRA ocorrência de cada ID (mesmo comportamento do iloc[0])
+        indice: Dict[str, int] = {}
+        for i, id_busca in enumerate(ids):
+            indice.setdefault(id_busca, i)
+
+        print(f"Base de clientes carregada em memória: {len(ids)} registros ({formato})")
+        return _Snapshot(ids, colunas, indice)
+
+    def _assinatura_arquivos(self):
+        """Muda quando o CSV ou o formato colunar são regravados."""
+        meta = os.path.join(caminho_colunar(self.caminho), "meta.json")
+        return (_assinatura_arquivo(self.caminho), _assinatura_arquivo(meta))
+
+    def _tamanho_log(self) -> int:
+        try:
+            return os.path.getsize(self.caminho_log)
+        except FileNotFoundError:
+            return 0
+
+    def _atual(self) -> _Snapshot:
+        """Retorna o estado atual, sincronizando se o CSV ou o log mudaram."""
+        if self._assinatura_arquivos() != self._assinatura or self._tamanho_log() != self._offset_log:
+            with self._lock, _trava_arquivo(self.caminho_trava):
+                self._sincronizar()
+
+        return self._snap
+
+    def _sincronizar(self):
+        """Recarrega o CSV (se mudou) e aplica o que houver de novo no log.
+
+        Deve ser chamada com o lock de thread E a trava de arquivo.
+        """
+        assinatura = self._assinatura_arquivos()
+        tamanho = self._tamanho_log()
+
+        # CSV trocado ou log truncado: outro processo compactou -> recarga completa
+        if assinatura != self._assinatura or tamanho < self._offset_log:
+            self._snap = self._carregar()
+            self._assinatura = assinatura
+            self._offset_log = 0
+            self._pendentes = 0
+            self.geracao += 1
+
+        if tamanho > self._offset_log:
+            entradas, self._offset_log = self._ler_log(self._offset_log)
+            for entrada in entradas:
+                self._aplicar_em_memoria(entrada)
+            self._pendentes += len(entradas)
+            self.geracao += 1
+
+    # --------------------------------------------------
+    # LOG DE ALTERAÇÕES
+    # --------------------------------------------------
+    def _ler_log(self, inicio: int):
+        """Lê as linhas completas do log a partir de `inicio`; retorna (entradas, novo_offset)."""
+        if not os.path.exists(self.caminho_log):
+            return [], 0
+
+        with open(self.caminho_log, "rb") as f:
+            f.seek(inicio)
+            bruto = f.read()
+
+        fim = bruto.rfind(b"\n") + 1
+        entradas = []
+        for linha in bruto[:fim].splitlines():
+            if not linha.strip():
+                continue
+            try:
+                entradas.append(json.loads(linha))
+            except ValueError:
+                print(f"Linha inválida ignorada no log de alterações: {linha[:80]!r}")
+
+        return entradas, inicio + fim
+
+    def _aplicar_em_memoria(self, entrada: dict):
+        snap = self._snap
+        i = snap.indice.get(normalizar_id(entrada.get(COLUNA_ID)))
+        if i is None:
+            return
+
+        for coluna, valor in entrada.get("valores", {}).items():
+            arr = snap.colunas.get(coluna)
+            if arr is None:
+                arr = np.full(len(snap.ids), np.nan)
+                snap.colunas[coluna] = arr
+            arr[i] = _texto_para_float(valor)
+
+    def atualizar(self, id_cliente, valores: Dict[str, str]) -> bool:
+        """Registra novos valores para o cliente. Retorna False se o ID não existe na base.
+
+        A escrita é O(1): uma linha anexada no log (com fsync), sob lock.
+        """
+        id_norm = normalizar_id(id_cliente)
+        registro = {COLUNA_ID: id_norm, "valores": {k: str(v) for k, v in valores.items()}}
+        linha = (json.dumps(registro, ensure_ascii=False) + "\n").encode("utf-8")
+
+        with self._lock, _trava_arquivo(self.caminho_trava):
+            self._sincronizar()
+            if id_norm not in self._snap.indice:
+                return False
+            if not valores:
+                return True
+
+            with open(self.caminho_log, "ab") as f:
+                f.write(linha)
+                f.flush()
+                os.fsync(f.fileno())
+
+            # Aplica a própria linha (e o que outros processos tenham anexado)
+            self._sincronizar()
+
+        self._agendar_compactacao()
+        return True
+
+    # --------------------------------------------------
+    # COMPACTAÇÃO (LOG -> CSV)
+    # --------------------------------------------------
+    def _ler_csv_com_log(self):
+        """CSV (texto) com o log aplicado. Chamar com o lock de thread E a trava de arquivo."""
+        entradas, _ = self._ler_log(0)
+
+        df = pd.read_csv(self.caminho, dtype=str)
+        df.columns = df.columns.str.strip()
+        if not entradas:
+            return df, entradas
+
+        posicoes: Dict[str, List[int]] = {}
+        for i, v in enumerate(df[COLUNA_ID].tolist()):
+            posicoes.setdefault(normalizar_id(v), []).append(i)
+
+        # Aplica na ordem do log: a última alteração de cada célula prevalece
+        for entrada in entradas:
+            linhas = posicoes.get(normalizar_id(entrada.get(COLUNA_ID)))
+            if not linhas:
+                continue
+            for coluna, valor in entrada.get("valores", {}).items():
+                if coluna not in df.columns:
+                    df[coluna] = np.nan
+                df.iloc[linhas, df.columns.get_loc(coluna)] = valor
+
+        return df, entradas
+
+    def _gravar_csv(self, df: pd.DataFrame):
+        """Troca o CSV (escrita atômica), atualiza o colunar e zera o log."""
+        tmp = self.caminho + ".tmp"
+        df.to_csv(tmp, index=False)
+        os.replace(tmp, self.caminho)
+
+        # Mantém o formato colunar (se estiver em uso) em dia com o CSV
+        if os.path.isdir(caminho_colunar(self.caminho)):
+            salvar_colunar(df, self.caminho)
+
+        open(self.caminho_log, "wb").close()
+
+    def compactar(self) -> int:
+        """Incorpora o log no CSV (escrita atômica) e zera o log. Retorna nº de alterações."""
+        with self._lock, _trava_arquivo(self.caminho_trava):
+            self._sincronizar()
+            entradas, _ = self._ler_log(0)
+            if not entradas:
+                return 0
+
+            df, entradas = self._ler_csv_com_log()
+            self._gravar_csv(df)
+
+            # A memória já reflete o CSV novo: só registra as novas assinaturas
+            self._assinatura = self._assinatura_arquivos()
+            self._offset_log = 0
+            self._pendentes = 0
+
+        print(f"Base de clientes compactada: {len(entradas)} alterações incorporadas ao CSV")
+        return len(entradas)
+
+    def envelhecer(self, data_alvo: date) -> int:
+        """Leva DAYS_SINCE_LAST / QTD_SOL_LAST_30D da base inteira até data_alvo.
+
+        Uma passada vetorizada (ver envelhecimento.py) sobre o CSV com o log já
+        incorporado; grava DATA_REFERENCIA em cada linha. Retorna nº de linhas alteradas.
+        """
+        # Não precisa da base em memória: lê o CSV + log direto; quem já tem a base
+        # carregada (este processo ou a API) recarrega na próxima consulta
+        with self._lock, _trava_arquivo(self.caminho_trava):
+            df, entradas = self._ler_csv_com_log()
+
+            for coluna in (COLUNA_DIAS, COLUNA_SOL_30D, COLUNA_DATA_REFERENCIA):
+                if coluna not in df.columns:
+                    df[coluna] = np.nan
+
+            dias = _coluna_para_float(df[COLUNA_DIAS])
+            sol = _coluna_para_float(df[COLUNA_SOL_30D])
+            ref = _coluna_para_float(df[COLUNA_DATA_REFERENCIA])
+            novos_dias, novos_sol, novas_ref = envelhecimento.envelhecer(dias, sol, ref, data_alvo)
+
+            # Só reescreve o texto das células que mudaram (NaN == NaN conta como igual)
+            alteradas = np.zeros(len(df), dtype=bool)
+            for coluna, antes, depois in ((COLUNA_DIAS, dias, novos_dias),
+                                          (COLUNA_SOL_30D, sol, novos_sol),
+                                          (COLUNA_DATA_REFERENCIA, ref, novas_ref)):
+                mudou = ~((antes == depois) | (np.isnan(antes) & np.isnan(depois)))
+                if mudou.any():
+                    df.loc[mudou, coluna] = _formatar_numeros(depois[mudou])
+                    alteradas |= mudou
+
+            if not alteradas.any() and not entradas:
+                return 0
+
+            self._gravar_csv(df)
+
+        print(f"Base de clientes envelhecida até {data_alvo:%d/%m/%Y}: {int(alteradas.sum())} linhas alteradas")
+        return int(alteradas.sum())
+
+    def data_referencia(self) -> Optional[date]:
+        """Data até onde a base toda já foi envelhecida (a menor referência entre as linhas)."""
+        snap = self._atual()
+        ref = snap.colunas.get(COLUNA_DATA_REFERENCIA)
+        if not snap.ids:
+            return None
+        if ref is None:
+            return envelhecimento.DATA_BASE_CSV
+        return envelhecimento.numero_para_data(envelhecimento.referencias_efetivas(ref).min())
+
+    def _agendar_compactacao(self):
+        if self._compactador is None:
+            with self._lock:
+                if self._compactador is None:
+                    self._compactador = threading.Thread(
+                        target=self._laco_compactacao, name="compactador-base", daemon=True
+                    )
+                    self._compactador.start()
+                    atexit.register(self._compactar_seguro)
+
+        if self._pendentes >= COMPACTAR_COM_N_ALTERACOES:
+            self._acordar.set()
+
+    def _laco_compactacao(self):
+        while True:
+            self._acordar.wait(COMPACTAR_A_CADA_S)
+            self._acordar.clear()
+            if self._pendentes:
+                self._compactar_seguro()
+
+    def _compactar_seguro(self):
+        try:
+            self.compactar()
+        except Exception as e:
+            # O log continua íntegro; a próxima compactação tenta de novo
+            print(f"Erro ao compactar a base de clientes: {e}")
+
+    # --------------------------------------------------
+    # CONSULTAS
+    # --------------------------------------------------
+    def buscar(self, id_cliente, colunas: Iterable[str]) -> Optional[Dict[str, float]]:
+        """Retorna {coluna: valor} para o cliente, ou None se não encontrado.
+
+        Valores inválidos/ausentes (NaN ou coluna inexistente) voltam como 0.0.
+        """
+        snap = self._atual()
+        i = snap.indice.get(normalizar_id(id_cliente))
+        if i is None:
+            return None
+
+        dados = {}
+        for c in colunas:
+            arr = snap.colunas.get(c)
+            v = float(arr[i]) if arr is not None else 0.0
+            dados[c] = 0.0 if v != v else v
+        return dados
+
+    def matriz(self, ids: Iterable, colunas: List[str]):
+        """Monta a matriz (n_ids x n_colunas) de uma vez só, direto dos arrays.
+
+        Retorna (X, encontrados): linhas de IDs inexistentes ficam zeradas e
+        marcadas como False em `encontrados`. NaN vira 0.0, como em buscar().
+        """
+        snap = self._atual()
+        pos = np.fromiter(
+            (snap.indice.get(normalizar_id(v), -1) for v in ids),
+            dtype=np.int64
+        )
+        encontrados = pos >= 0
+        linhas = np.where(encontrados, pos, 0)
+
+        X = np.zeros((len(pos), len(colunas)), dtype=np.float64)
+        for j, c in enumerate(colunas):
+            arr = snap.colunas.get(c)
+            if arr is not None and len(arr):
+                X[:, j] = arr[linhas]
+
+        X[np.isnan(X)] = 0.0
+        X[~encontrados] = 0.0
+        return X, encontrados
+
+    def geracao_atual(self) -> int:
+        """Confere o arquivo (recarregando se mudou) e retorna a geração atual."""
+        self._atual()
+        return self.geracao
+
+    def matriz_completa(self, colunas: List[str]):
+        """Retorna (ids, X) com TODAS as linhas da base, na ordem do arquivo (NaN -> 0.0)."""
+        snap = self._atual()
+        X = np.zeros((len(snap.ids), len(colunas)), dtype=np.float64)
+        for j, c in enumerate(colunas):
+            arr = snap.colunas.get(c)
+            if arr is not None:
+                X[:, j] = arr
+        X[np.isnan(X)] = 0.0
+        return snap.ids, X
+
+    def __contains__(self, id_cliente) -> bool:
+        return normalizar_id(id_cliente) in self._atual().indice
+
+    def __len__(self) -> int:
+        return len(self._atual().ids)
@@ -0,0 +1,102 @@
+"""
+BENCHMARK DO PIPELINE DE FEATURES
+
+Compara o caminho antigo da API (DataFrame + reindex + applymap(_to_float)
++ regras dict a dict) com o pipeline_features (matriz + máscaras) para
+1 linha (o /predict) e 10.000 linhas (lote), com payloads numéricos (JSON)
+e com texto em vírgula decimal. Antes de medir confere que os dois
+caminhos geram a mesma matriz e as mesmas regras.
+
+Uso (na pasta ProjetoMaxx):
+    python benchmarks/bench_features.py [--repeticoes 200]
+"""
+
+import argparse
+import os
+import sys
+import time
+import warnings
+
+warnings.filterwarnings("ignore")
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+import numpy as np
+import pandas as pd
+
+import pipeline_features
+from cache_dados import ler_excel
+from pipeline_features import to_float
+from registro_modelos import carregar
+
+MODEL_PATH = os.path.join(BASE_DIR, "gradient_boosting_model (1).joblib")
+TEST_PATH = os.path.join(BASE_DIR, "test (2).xlsx")
+
+
+def caminho_antigo(registros, features):
+    """DataFrame + reindex + applymap como no /predict (um DataFrame só para o lote inteiro)."""
+    regras = np.array([
+        all(to_float(data.get(f, 0)) == 0.0 for f in features)
+        or int(to_float(data.get("DAYS_SINCE_LAST", 0))) >= 366
+        for data in registros
+    ])
+    df = pd.DataFrame(registros).reindex(columns=features, fill_value=0).applymap(to_float)
+    return df.to_numpy(dtype=np.float64), regras
+
+
+def caminho_novo(registros, features):
+    X = pipeline_features.matriz_features(registros, features)
+    dias = pipeline_features.dias_desde_ultimo(X, features, registros)
+    _, _, usar_modelo = pipeline_features.aplicar_regras(X, dias)
+    return X, ~usar_modelo
+
+
+def medir(func, repeticoes: int) -> float:
+    """Mediana (ms) de várias chamadas."""
+    tempos = np.empty(repeticoes)
+    for i in range(repeticoes):
+        t0 = time.perf_counter()
+        func()
+        tempos[i] = (time.perf_counter() - t0) * 1000
+    return float(np.median(tempos))
+
+
+def gerar_registros(features, n: int, texto: bool):
+    df, _ = ler_excel(TEST_PATH)
+    df = df.reindex(columns=features, fill_value=0).astype(np.float64)
+    df = pd.concat([df] * (n // len(df) + 1), ignore_index=True).iloc[:n]
+    registros = df.to_dict(orient="records")
+    if texto:
+        registros = [{f: str(v).replace(".", ",") for f, v in r.items()} for r in registros]
+    return registros
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeticoes", type=int, default=200)
+    args = parser.parse_args()
+
+    features = carregar(MODEL_PATH, usar_compilado=False).features
+
+    print("\n📊 FEATURES: applymap x pipeline_features (mediana, ms)")
+    print(f"   {'payload':<8} {'linhas':>7} {'applymap':>10} {'pipeline':>10} {'ganho':>7}")
+
+    for texto in (False, True):
+        for n in (1, 10_000):
+            registros = gerar_registros(features, n, texto)
+
+            X_antigo, regras_antigo = caminho_antigo(registros, features)
+            X_novo, regras_novo = caminho_novo(registros, features)
+            assert np.array_equal(X_antigo, X_novo), "matrizes diferentes"
+            assert np.array_equal(regras_antigo, regras_novo), "regras diferentes"
+
+            repeticoes = args.repeticoes if n == 1 else max(3, args.repeticoes // 100)
+            t_antigo = medir(lambda: caminho_antigo(registros, features), repeticoes)
+            t_novo = medir(lambda: caminho_novo(registros, features), repeticoes)
+            print(f"   {'texto' if texto else 'número':<8} {n:>7,} {t_antigo:10.3f} {t_novo:10.3f} "
+                  f"{t_antigo / t_novo:6.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+BENCHMARK DE SUBIDA: api.py x api_inferencia.py
+
+Cada medição é um processo Python novo que só importa o módulo da API
+(o que o gunicorn faz antes de atender) e informa o tempo do import, a
+memória residente (RSS) logo depois e quais dependências pesadas foram
+carregadas. Também mede a primeira predição (/predict pelo test client),
+que no api.py ainda paga o aquecimento do modelo.
+
+Os imports rodam numa cópia temporária da pasta (o api.py cria tabela de
+scores e histórico na subida). Sem modelo_leve.npz, exporta antes.
+
+Uso (na pasta ProjetoMaxx):
+    python benchmarks/bench_inicializacao.py [--repeticoes 5]
+"""
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODULOS = ("api", "api_inferencia")
+PESADOS = ("sklearn", "pandas", "joblib", "scipy.special", "flask_cors")
+
+# Roda dentro do processo filho: imprime um JSON com as medições
+_MEDIR = """
+import json, os, resource, sys, time
+t0 = time.perf_counter()
+modulo = __import__({modulo!r})
+t_import = time.perf_counter() - t0
+
+def rss_mb():
+    try:
+        with open("/proc/self/status") as f:
+            for linha in f:
+                if linha.startswith("VmRSS:"):
+                    return int(linha.split()[1]) / 1024
+    except OSError:
+        pass
+    maximo = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maximo / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+rss = rss_mb()
+carregados = [m for m in {pesados!r} if m in sys.modules]
+
+cliente = modulo.app.test_client()
+payload = dict.fromkeys(modulo.FEATURES, 1)
+t0 = time.perf_counter()
+resposta = cliente.post("/predict", json=payload)
+t_predict = time.perf_counter() - t0
+
+print(json.dumps({{"import_s": t_import, "rss_mb": rss, "pesados": carregados,
+                  "predict_ms": t_predict * 1e3, "status": resposta.status_code,
+                  "resposta": resposta.get_json()}}))
+"""
+
+
+def copiar_pasta(destino: str):
+    ignorar = shutil.ignore_patterns("__pycache__", "frontend", "benchmarks", "*.xlsx", ".cache_dados")
+    shutil.copytree(BASE_DIR, destino, ignore=ignorar)
+
+
+def medir(pasta: str, modulo: str) -> dict:
+    codigo = _MEDIR.format(modulo=modulo, pesados=PESADOS)
+    saida = subprocess.run(
+        [sys.executable, "-c", codigo], cwd=pasta, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(saida.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tempo de import e memória da API completa x só inferência")
+    parser.add_argument("--repeticoes", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pasta = os.path.join(tmp, "ProjetoMaxx")
+        copiar_pasta(pasta)
+        if not os.path.exists(os.path.join(pasta, "modelo_leve.npz")):
+            subprocess.run([sys.executable, "modelo_leve.py", "exportar"], cwd=pasta, check=True,
+                           stdout=subprocess.DEVNULL)
+
+        resultados = {}
+        for modulo in MODULOS:
+            medidas = [medir(pasta, modulo) for _ in range(args.repeticoes)]
+            resultados[modulo] = medidas
+
+    print(f"\n📊 SUBIDA (mediana de {args.repeticoes} processos novos)")
+    print(f"   {'módulo':<16} {'import':>10} {'RSS':>10} {'1ª predição':>13}   dependências pesadas")
+    for modulo, medidas in resultados.items():
+        t = statistics.median(m["import_s"] for m in medidas)
+        rss = statistics.median(m["rss_mb"] for m in medidas)
+        pred = statistics.median(m["predict_ms"] for m in medidas)
+        pesados = ", ".join(medidas[0]["pesados"]) or "-"
+        print(f"   {modulo:<16} {t * 1e3:>8.0f} ms {rss:>7.1f} MB {pred:>10.2f} ms   {pesados}")
+
+    completa, leve = (resultados[m][0]["resposta"] for m in MODULOS)
+    print(f"\n📍 Mesma resposta no /predict: {completa == leve}")
+
+
+if __name__ == "__main__":
+    main()
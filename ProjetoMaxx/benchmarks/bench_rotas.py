@@ -0,0 +1,200 @@
+"""
+BENCHMARK DAS ROTAS DA API (sem rede)
+
+Usa o test client do Flask sobre uma CÓPIA temporária da pasta do projeto
+(o /salvar_historico escreve em disco, então os arquivos reais não são
+tocados). Para cada rota mede vazão, latência (p50/p90/p99) e alocações
+de memória por requisição (tracemalloc), com IDs reais da base_clientes.
+
+Uso (na pasta ProjetoMaxx):
+    python benchmarks/bench_rotas.py --salvar benchmarks/baseline_rotas.json
+    python benchmarks/bench_rotas.py --comparar benchmarks/baseline_rotas.json [--tolerancia 0.2]
+
+Com --comparar, sai com código 1 se alguma rota regrediu além da tolerância
+(p50 maior ou vazão menor que o baseline).
+"""
+
+import argparse
+import atexit
+import contextlib
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+import warnings
+from datetime import datetime
+
+warnings.filterwarnings("ignore")
+
+import numpy as np
+
+PROJETO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# O que não precisa ir para a cópia temporária
+IGNORAR = shutil.ignore_patterns("frontend", "benchmarks", "*.xlsx", "__pycache__", "*.lock")
+
+
+def preparar_sandbox() -> str:
+    destino = os.path.join(tempfile.mkdtemp(prefix="bench_rotas_"), "ProjetoMaxx")
+    shutil.copytree(PROJETO_DIR, destino, ignore=IGNORAR)
+    return destino
+
+
+def montar_cenarios(api, ids, rnd):
+    """Uma função por rota; cada chamada faz UMA requisição com um ID sorteado."""
+    client = api.app.test_client()
+    features = list(api.FEATURES)
+
+    payloads = {}
+    for id_cliente in ids:
+        dados = api.clientes.buscar(id_cliente, features)
+        payloads[id_cliente] = dados
+
+    def sortear():
+        return ids[rnd.randrange(len(ids))]
+
+    def salvar():
+        id_cliente = sortear()
+        corpo = dict(payloads[id_cliente], ID_CLIENTE=id_cliente,
+                     RISCO_PREDITO="42.0%", DATA_HORA=datetime.now().isoformat())
+        return client.post("/salvar_historico", json=corpo)
+
+    return {
+        "/predict": lambda: client.post("/predict", json=payloads[sortear()]),
+        "/predict?explain=true": lambda: client.post("/predict?explain=true", json=payloads[sortear()]),
+        "/predict_legacy": lambda: client.post("/predict_legacy", json=payloads[sortear()]),
+        "/cliente/<id>": lambda: client.get(f"/cliente/{sortear()}"),
+        "/atualizar_temporal/<id>": lambda: client.get(f"/atualizar_temporal/{sortear()}"),
+        "/simular_contato/<id>": lambda: client.get(f"/simular_contato/{sortear()}"),
+        "/salvar_historico": salvar,
+        "/historico?id_cliente": lambda: client.get(f"/historico?id_cliente={sortear()}"),
+    }
+
+
+def medir_rota(func, n: int, n_alocacao: int, aquecimento: int = 20) -> dict:
+    for _ in range(aquecimento):
+        func()
+
+    latencias = np.empty(n)
+    inicio = time.perf_counter()
+    for i in range(n):
+        t0 = time.perf_counter()
+        resp = func()
+        latencias[i] = (time.perf_counter() - t0) * 1000
+        if resp.status_code != 200:
+            raise RuntimeError(f"Status {resp.status_code}: {resp.get_data(as_text=True)[:200]}")
+    total = time.perf_counter() - inicio
+
+    # Alocações numa passada separada (o tracemalloc deixa tudo mais lento)
+    picos = np.empty(n_alocacao)
+    tracemalloc.start()
+    for i in range(n_alocacao):
+        base, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        func()
+        _, pico = tracemalloc.get_traced_memory()
+        picos[i] = (pico - base) / 1024
+    tracemalloc.stop()
+
+    p50, p90, p99 = np.percentile(latencias, [50, 90, 99])
+    return {
+        "req_s": n / total,
+        "p50_ms": float(p50),
+        "p90_ms": float(p90),
+        "p99_ms": float(p99),
+        "alocacao_pico_kb": float(np.median(picos)),
+    }
+
+
+def comparar(atual: dict, baseline: dict, tolerancia: float) -> bool:
+    """Imprime a comparação; retorna True se houve regressão."""
+    regrediu = False
+    print(f"\n📊 COMPARAÇÃO COM O BASELINE ({baseline.get('gerado_em', '?')}, tolerância {tolerancia:.0%})")
+    for rota, r in atual["rotas"].items():
+        b = baseline.get("rotas", {}).get(rota)
+        if b is None:
+            print(f"   {rota:<26} (sem baseline)")
+            continue
+
+        var_p50 = r["p50_ms"] / b["p50_ms"] - 1
+        var_vazao = r["req_s"] / b["req_s"] - 1
+        ruim = var_p50 > tolerancia or var_vazao < -tolerancia
+        regrediu |= ruim
+
+        marca = "⚠️  REGRESSÃO" if ruim else "✓"
+        print(f"   {rota:<26} p50 {var_p50:+7.1%}   vazão {var_vazao:+7.1%}   {marca}")
+    return regrediu
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requisicoes", type=int, default=500, help="Requisições medidas por rota")
+    parser.add_argument("--alocacoes", type=int, default=50, help="Requisições medidas com tracemalloc")
+    parser.add_argument("--rotas", help="Só estas rotas (separadas por vírgula)")
+    parser.add_argument("--salvar", help="Grava o resultado como baseline JSON")
+    parser.add_argument("--comparar", help="Baseline JSON para detectar regressões")
+    parser.add_argument("--tolerancia", type=float, default=0.2)
+    args = parser.parse_args()
+
+    salvar = os.path.abspath(args.salvar) if args.salvar else None
+    baseline_path = os.path.abspath(args.comparar) if args.comparar else None
+
+    sandbox = preparar_sandbox()
+    sys.path.insert(0, sandbox)
+    os.chdir(sandbox)
+
+    # Registrado ANTES de importar a API: o atexit roda em ordem inversa, então a
+    # compactação da base (registrada pela API) acontece antes de apagar a cópia
+    atexit.register(shutil.rmtree, os.path.dirname(sandbox), ignore_errors=True)
+
+    try:
+        import api
+
+        ids = list(api.clientes.matriz_completa([])[0])
+        rnd = random.Random(42)
+        amostra = rnd.sample(ids, min(500, len(ids)))
+        cenarios = montar_cenarios(api, amostra, rnd)
+
+        if args.rotas:
+            escolhidas = set(args.rotas.split(","))
+            cenarios = {r: f for r, f in cenarios.items() if r in escolhidas}
+
+        print(f"\n📍 {args.requisicoes} requisições por rota (test client, sem rede)")
+        print(f"   {'rota':<26} {'req/s':>9} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'aloc KB':>8}")
+
+        resultado = {
+            "gerado_em": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "maquina": platform.node(),
+            "requisicoes": args.requisicoes,
+            "rotas": {},
+        }
+        for rota, func in cenarios.items():
+            # Os prints das rotas (ex.: salvar_historico) não entram no relatório
+            with open(os.devnull, "w") as nulo, contextlib.redirect_stdout(nulo):
+                r = medir_rota(func, args.requisicoes, args.alocacoes)
+            resultado["rotas"][rota] = r
+            print(f"   {rota:<26} {r['req_s']:9.1f} {r['p50_ms']:8.2f} {r['p90_ms']:8.2f} "
+                  f"{r['p99_ms']:8.2f} {r['alocacao_pico_kb']:8.1f}")
+    finally:
+        os.chdir(PROJETO_DIR)
+
+    if salvar:
+        with open(salvar, "w", encoding="utf-8") as f:
+            json.dump(resultado, f, indent=2, ensure_ascii=False)
+        print(f"\n💾 Baseline salvo em: {salvar}")
+
+    if baseline_path:
+        with open(baseline_path, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if comparar(resultado, baseline, args.tolerancia):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+MICRO-BENCHMARK: sklearn predict_proba x scorer compilado
+
+Mede a latência por linha (chamadas de 1 linha) e por lote, e confere
+que as probabilidades são idênticas bit a bit. Mede também a explicação
+(contribuição por feature, explain=true) e confere que base + soma das
+contribuições = decision_function; sai com código 1 se o custo extra por
+linha passar do orçamento.
+
+Uso (na pasta ProjetoMaxx):
+    python benchmarks/bench_scorer.py [--repeticoes 2000] [--orcamento-us 100]
+"""
+
+import argparse
+import os
+import sys
+import time
+import warnings
+
+warnings.filterwarnings("ignore")
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from explicacao import ExplicadorArvores
+from scorer_compilado import ScorerCompilado
+
+MODEL_PATH = os.path.join(BASE_DIR, "gradient_boosting_model (1).joblib")
+DATABASE_PATH = os.path.join(BASE_DIR, "base_clientes.csv")
+
+
+def medir(func, repeticoes: int) -> np.ndarray:
+    """Tempo (µs) de cada chamada."""
+    tempos = np.empty(repeticoes)
+    for i in range(repeticoes):
+        t0 = time.perf_counter()
+        func()
+        tempos[i] = (time.perf_counter() - t0) * 1e6
+    return tempos
+
+
+def resumo(nome: str, tempos: np.ndarray):
+    p50, p99 = np.percentile(tempos, [50, 99])
+    print(f"   {nome:<28} p50={p50:9.1f} µs   p99={p99:9.1f} µs")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeticoes", type=int, default=2000)
+    parser.add_argument("--orcamento-us", type=float, default=100.0,
+                        help="Custo máximo (p50, µs) da explicação de 1 linha")
+    args = parser.parse_args()
+
+    artifact = joblib.load(MODEL_PATH)
+    model = artifact["model"]
+    features = artifact["features"]
+
+    t0 = time.perf_counter()
+    scorer = ScorerCompilado.de_modelo(model, features)
+    print(f"📍 Compilação: {(time.perf_counter() - t0) * 1e3:.1f} ms "
+          f"({len(scorer.raizes)} árvores, {len(scorer.valor)} nós)")
+
+    base = pd.read_csv(DATABASE_PATH)
+    X = base.reindex(columns=features, fill_value=0).astype(float)
+
+    p_sk = model.predict_proba(X)
+    p_comp = scorer.predict_proba(X)
+    print(f"📍 Bit a bit idênticas em {len(X)} linhas: {np.array_equal(p_sk, p_comp)}")
+
+    linha = X.iloc[[0]]
+    print("\n📊 POR LINHA (DataFrame de 1 linha, como o /predict)")
+    resumo("sklearn predict_proba", medir(lambda: model.predict_proba(linha), args.repeticoes))
+    resumo("scorer compilado", medir(lambda: scorer.predict_proba(linha), args.repeticoes))
+
+    linha_np = linha.to_numpy()
+    resumo("scorer compilado (ndarray)", medir(lambda: scorer.predict_proba(linha_np), args.repeticoes))
+
+    print(f"\n📊 LOTE ({len(X)} linhas, tempo por linha)")
+    rep_lote = max(5, args.repeticoes // 200)
+    for nome, func in [
+        ("sklearn predict_proba", lambda: model.predict_proba(X)),
+        ("scorer compilado", lambda: scorer.predict_proba(X)),
+    ]:
+        tempos = medir(func, rep_lote) / len(X)
+        resumo(nome, tempos)
+
+    t0 = time.perf_counter()
+    explicador = ExplicadorArvores(scorer)
+    print(f"\n📍 Explicador (valores esperados dos nós): {(time.perf_counter() - t0) * 1e3:.2f} ms na carga")
+    erro = np.abs(explicador.base + explicador.contribuicoes(X).sum(axis=1) - scorer.decision_function(X)).max()
+    print(f"📍 base + soma das contribuições = decision_function: erro máximo {erro:.1e}")
+
+    print("\n📊 EXPLICAÇÃO (explain=true)")
+    tempos_linha = medir(lambda: explicador.contribuicoes(linha_np), args.repeticoes)
+    resumo("contribuições, 1 linha", tempos_linha)
+    resumo("resposta JSON, 1 linha", medir(lambda: explicador.explicar(linha_np), args.repeticoes))
+    resumo("contribuições, lote (por linha)", medir(lambda: explicador.contribuicoes(X), rep_lote) / len(X))
+
+    p50 = np.percentile(tempos_linha, 50)
+    if p50 > args.orcamento_us:
+        print(f"\n⚠️  Explicação acima do orçamento: p50 {p50:.1f} µs > {args.orcamento_us:.0f} µs")
+        sys.exit(1)
+    print(f"\n✓ Explicação dentro do orçamento ({p50:.1f} µs <= {args.orcamento_us:.0f} µs por linha)")
+
+
+if __name__ == "__main__":
+    main()
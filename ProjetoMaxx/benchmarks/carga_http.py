@@ -0,0 +1,159 @@
+"""
+TESTE DE CARGA HTTP DA API
+
+Sobe a API com o gunicorn.conf.py para cada quantidade de workers pedida,
+dispara requisições em paralelo (conexões keep-alive, um processo cliente
+por conexão) contra /predict e /cliente/<id> usando IDs reais da base e
+mostra requisições/s, p50 e p99.
+
+Uso (na pasta ProjetoMaxx):
+    python benchmarks/carga_http.py --workers 1,2,4 --conexoes 8 --segundos 10
+    python benchmarks/carga_http.py --url http://127.0.0.1:5000   (servidor já rodando)
+"""
+
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import random
+import signal
+import subprocess
+import sys
+import time
+from urllib.parse import urlparse
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+import numpy as np
+
+from base_clientes import carregar_colunas
+
+DATABASE_PATH = os.path.join(BASE_DIR, "base_clientes.csv")
+
+
+def carregar_amostra(n: int = 500):
+    """IDs reais e o payload de features de cada um (como o front manda pro /predict)."""
+    ids, colunas, _ = carregar_colunas(DATABASE_PATH)
+    random.seed(42)
+    linhas = random.sample(range(len(ids)), min(n, len(ids)))
+    amostra = []
+    for i in linhas:
+        payload = {c: float(arr[i]) for c, arr in colunas.items() if arr[i] == arr[i]}
+        amostra.append((ids[i], json.dumps(payload)))
+    return amostra
+
+
+def _cliente(args):
+    """Uma conexão keep-alive martelando a rota até o prazo; retorna latências (ms)."""
+    host, porta, rota, amostra, prazo, semente = args
+    rnd = random.Random(semente)
+    conn = http.client.HTTPConnection(host, porta, timeout=30)
+    latencias = []
+    erros = 0
+
+    while time.time() < prazo:
+        id_cliente, payload = amostra[rnd.randrange(len(amostra))]
+        t0 = time.perf_counter()
+        try:
+            if rota == "/predict":
+                conn.request("POST", "/predict", body=payload,
+                             headers={"Content-Type": "application/json"})
+            else:
+                conn.request("GET", f"/cliente/{id_cliente}")
+            resp = conn.getresponse()
+            resp.read()
+            if resp.status != 200:
+                erros += 1
+        except (OSError, http.client.HTTPException):
+            erros += 1
+            conn.close()
+            conn = http.client.HTTPConnection(host, porta, timeout=30)
+            continue
+        latencias.append((time.perf_counter() - t0) * 1000)
+
+    conn.close()
+    return latencias, erros
+
+
+def rodar_carga(url: str, rota: str, amostra, conexoes: int, segundos: float) -> dict:
+    alvo = urlparse(url)
+    prazo = time.time() + segundos
+    tarefas = [(alvo.hostname, alvo.port or 80, rota, amostra, prazo, s) for s in range(conexoes)]
+
+    inicio = time.perf_counter()
+    with multiprocessing.Pool(conexoes) as pool:
+        resultados = pool.map(_cliente, tarefas)
+    duracao = time.perf_counter() - inicio
+
+    latencias = np.concatenate([np.asarray(r[0]) for r in resultados]) if resultados else np.array([])
+    erros = sum(r[1] for r in resultados)
+    p50, p99 = np.percentile(latencias, [50, 99]) if len(latencias) else (float("nan"),) * 2
+
+    return {
+        "rota": rota,
+        "requisicoes": int(len(latencias)),
+        "erros": int(erros),
+        "req_s": len(latencias) / duracao,
+        "p50_ms": float(p50),
+        "p99_ms": float(p99),
+    }
+
+
+def subir_servidor(workers: int, porta: int) -> subprocess.Popen:
+    env = dict(os.environ, WEB_CONCURRENCY=str(workers), API_BIND=f"127.0.0.1:{porta}")
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "api:app"],
+        cwd=BASE_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+
+    # Espera o /health responder
+    for _ in range(300):
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", porta, timeout=1)
+            conn.request("GET", "/health")
+            if conn.getresponse().status == 200:
+                return proc
+        except OSError:
+            time.sleep(0.1)
+    proc.kill()
+    raise RuntimeError("Servidor não respondeu ao /health")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", help="Usa um servidor já rodando em vez de subir o gunicorn")
+    parser.add_argument("--workers", default="1,2,4", help="Lista de nº de workers a testar")
+    parser.add_argument("--conexoes", type=int, default=8)
+    parser.add_argument("--segundos", type=float, default=10)
+    parser.add_argument("--porta", type=int, default=5055)
+    args = parser.parse_args()
+
+    amostra = carregar_amostra()
+    rotas = ["/predict", "/cliente/<id>"]
+
+    cenarios = [None] if args.url else [int(w) for w in args.workers.split(",")]
+
+    print(f"📍 {args.conexoes} conexões keep-alive, {args.segundos:.0f}s por rota")
+    print(f"{'workers':>8} {'rota':<16} {'req/s':>9} {'p50 ms':>9} {'p99 ms':>9} {'erros':>6}")
+
+    for workers in cenarios:
+        proc = None
+        url = args.url
+        if workers is not None:
+            proc = subir_servidor(workers, args.porta)
+            url = f"http://127.0.0.1:{args.porta}"
+        try:
+            for rota in rotas:
+                r = rodar_carga(url, rota, amostra, args.conexoes, args.segundos)
+                print(f"{workers or '-':>8} {rota:<16} {r['req_s']:9.1f} "
+                      f"{r['p50_ms']:9.2f} {r['p99_ms']:9.2f} {r['erros']:6d}")
+        finally:
+            if proc is not None:
+                proc.send_signal(signal.SIGTERM)
+                proc.wait(timeout=60)
+
+
+if __name__ == "__main__":
+    main()
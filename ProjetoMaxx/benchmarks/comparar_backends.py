@@ -0,0 +1,120 @@
+"""
+COMPARAÇÃO DOS BACKENDS DE TREINO: GradientBoosting x HistGradientBoosting
+
+Treina cada backend do treino_m.py com os parâmetros padrão (mesmos dados,
+mesmo preparo de features) e compara:
+- tempo de treino (fit)
+- latência de predict_proba por linha (DataFrame de 1 linha, como o /predict)
+  e por lote (o test inteiro, tempo por linha)
+- tamanho do artefato .joblib ({"model", "features"}, como o save_model grava)
+- AUC no test (2).xlsx
+
+Nada é salvo no lugar do modelo da API.
+
+Uso (na pasta ProjetoMaxx):
+    python benchmarks/comparar_backends.py [--repeticoes 500] [--saida comparacao.json]
+"""
+
+import argparse
+import io
+import json
+import os
+import sys
+import time
+import warnings
+
+warnings.filterwarnings("ignore")
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+import joblib
+import numpy as np
+from sklearn.metrics import roc_auc_score
+
+import treino_m
+from scorer_compilado import ScorerCompilado
+
+
+def medir(func, repeticoes: int) -> np.ndarray:
+    """Tempo (µs) de cada chamada."""
+    tempos = np.empty(repeticoes)
+    for i in range(repeticoes):
+        t0 = time.perf_counter()
+        func()
+        tempos[i] = (time.perf_counter() - t0) * 1e6
+    return tempos
+
+
+def tamanho_artefato(model, features) -> int:
+    buffer = io.BytesIO()
+    joblib.dump({"model": model, "features": features}, buffer)
+    return buffer.tell()
+
+
+def avaliar_backend(backend: str, dados, repeticoes: int) -> dict:
+    df_train, df_test = dados
+    trainer = treino_m.GradientBoostingTrainerCustom(backend)
+    trainer.prepare_features(df_train, df_test)
+
+    model = trainer.build_model()
+    t0 = time.perf_counter()
+    model.fit(trainer.X_train, trainer.y_train)
+    tempo_fit = time.perf_counter() - t0
+
+    X_test = trainer.X_test
+    linha = X_test.iloc[[0]]
+    rep_lote = max(5, repeticoes // 50)
+
+    r = {
+        "backend": backend,
+        "classe": type(model).__name__,
+        "arvores": int(getattr(model, "n_iter_", None) or model.n_estimators_),
+        "fit_s": tempo_fit,
+        "linha_us": float(np.median(medir(lambda: model.predict_proba(linha), repeticoes))),
+        "lote_us_por_linha": float(np.median(medir(lambda: model.predict_proba(X_test), rep_lote)) / len(X_test)),
+        "tamanho_kb": tamanho_artefato(model, trainer.feature_names) / 1024,
+        "auc_test": float(roc_auc_score(trainer.y_test, model.predict_proba(X_test)[:, 1])),
+    }
+
+    # O que a API usa de fato para o backend "gb"
+    try:
+        scorer = ScorerCompilado.de_modelo(model, trainer.feature_names)
+        r["linha_us_scorer_compilado"] = float(np.median(medir(lambda: scorer.predict_proba(linha), repeticoes)))
+    except ValueError:
+        r["linha_us_scorer_compilado"] = None
+    return r
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeticoes", type=int, default=500)
+    parser.add_argument("--saida", help="Grava o resultado em JSON")
+    args = parser.parse_args()
+
+    saida = os.path.abspath(args.saida) if args.saida else None
+    os.chdir(BASE_DIR)  # caminhos do treino_m.py são relativos à pasta do projeto
+
+    dados = treino_m.GradientBoostingTrainerCustom().load_data()
+
+    resultados = []
+    for backend in treino_m.BACKENDS:
+        print(f"\n📍 Treinando backend '{backend}'...")
+        resultados.append(avaliar_backend(backend, dados, args.repeticoes))
+
+    print("\n📊 COMPARAÇÃO DOS BACKENDS")
+    print(f"   {'backend':<8} {'árvores':>7} {'fit s':>7} {'linha µs':>9} {'lote µs/lin':>11} "
+          f"{'compilado µs':>12} {'KB':>8} {'AUC test':>9}")
+    for r in resultados:
+        compilado = f"{r['linha_us_scorer_compilado']:12.1f}" if r["linha_us_scorer_compilado"] else f"{'-':>12}"
+        print(f"   {r['backend']:<8} {r['arvores']:7d} {r['fit_s']:7.2f} {r['linha_us']:9.1f} "
+              f"{r['lote_us_por_linha']:11.2f} {compilado} {r['tamanho_kb']:8.1f} {r['auc_test']:9.4f}")
+
+    if saida:
+        with open(saida, "w", encoding="utf-8") as f:
+            json.dump(resultados, f, indent=2)
+        print(f"\n💾 Resultado salvo em: {saida}")
+
+
+if __name__ == "__main__":
+    main()
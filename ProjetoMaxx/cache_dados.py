@@ -0,0 +1,153 @@
+"""
+CACHE DOS DADOS DE TREINO (Excel -> colunar tipado)
+
+O pd.read_excel (openpyxl) é de longe a etapa mais lenta do treino_m.py.
+Na primeira leitura cada planilha vira um .npz (uma coluna por array, com
+os tipos reduzidos) em .cache_dados/; as próximas leituras carregam o .npz
+enquanto o CONTEÚDO do Excel for o mesmo (chave = sha256 do arquivo).
+
+Redução de tipos:
+- inteiros -> o menor inteiro que comporta os valores (ex.: int8 para
+  JA_TENTOU_CANCELAR_max e TARGET)
+- floats ficam em float64: o GradientBoosting converteria para float32 de
+  qualquer forma, mas o HistGradientBoosting calcula as faixas em float64 e
+  mudaria com os valores arredondados
+
+Relatório (na pasta ProjetoMaxx):
+    python cache_dados.py
+"""
+
+import glob
+import hashlib
+import os
+import time
+from pathlib import Path
+from typing import Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+PASTA_CACHE = ".cache_dados"
+
+# Muda quando o formato do .npz muda (invalida caches antigos)
+VERSAO_FORMATO = 2
+
+_NULOS = "__nulos__"  # prefixo da máscara de nulos das colunas de texto
+
+
+def hash_conteudo(caminho: Path) -> str:
+    h = hashlib.sha256()
+    h.update(f"v{VERSAO_FORMATO}".encode())
+    with open(caminho, "rb") as f:
+        for bloco in iter(lambda: f.read(1 << 20), b""):
+            h.update(bloco)
+    return h.hexdigest()[:16]
+
+
+def reduzir_tipos(df: pd.DataFrame) -> pd.DataFrame:
+    """Menor tipo inteiro que representa cada coluna inteira; floats não mudam."""
+    df = df.copy()
+    for coluna in df.columns:
+        serie = df[coluna]
+        if pd.api.types.is_bool_dtype(serie):
+            continue
+        if pd.api.types.is_integer_dtype(serie):
+            df[coluna] = pd.to_numeric(serie, downcast="integer")
+    return df
+
+
+def caminho_cache(caminho: Path, pasta_cache: Optional[Path] = None) -> Path:
+    pasta = Path(pasta_cache) if pasta_cache else caminho.parent / PASTA_CACHE
+    return pasta / f"{caminho.stem}_{hash_conteudo(caminho)}.npz"
+
+
+def _salvar_npz(df: pd.DataFrame, destino: Path):
+    arrays = {}
+    for i, coluna in enumerate(df.columns):
+        serie = df[coluna]
+        chave = f"{i:04d}_{coluna}"
+        if serie.dtype == object:
+            nulos = serie.isna().to_numpy()
+            arrays[chave] = serie.where(~nulos, "").astype(str).to_numpy()
+            arrays[_NULOS + chave] = nulos
+        else:
+            arrays[chave] = serie.to_numpy()
+
+    destino.parent.mkdir(parents=True, exist_ok=True)
+    tmp = destino.with_name(destino.name + ".tmp.npz")
+    np.savez(tmp, **arrays)
+    os.replace(tmp, destino)
+
+    # Versões antigas do mesmo arquivo (Excel alterado) não servem mais
+    prefixo = glob.escape(str(destino.parent / destino.name.rsplit("_", 1)[0]))
+    for antigo in glob.glob(f"{prefixo}_*.npz"):
+        if Path(antigo) != destino:
+            os.remove(antigo)
+
+
+def _ler_npz(origem: Path) -> pd.DataFrame:
+    colunas = {}
+    with np.load(origem, allow_pickle=False) as npz:
+        for chave in sorted(k for k in npz.files if not k.startswith(_NULOS)):
+            valores = npz[chave]
+            nome = chave.split("_", 1)[1]
+            if _NULOS + chave in npz.files:
+                valores = pd.Series(valores, dtype=object).where(~npz[_NULOS + chave], None)
+            colunas[nome] = valores
+    return pd.DataFrame(colunas)
+
+
+def ler_excel(caminho, pasta_cache: Optional[Path] = None, usar_cache: bool = True) -> Tuple[pd.DataFrame, bool]:
+    """DataFrame da planilha (tipos reduzidos); o bool diz se veio do cache."""
+    caminho = Path(caminho)
+    if not usar_cache:
+        return reduzir_tipos(pd.read_excel(caminho)), False
+
+    destino = caminho_cache(caminho, pasta_cache)
+    if destino.exists():
+        try:
+            return _ler_npz(destino), True
+        except (OSError, ValueError, KeyError):
+            pass  # cache corrompido: refaz abaixo
+
+    df = reduzir_tipos(pd.read_excel(caminho))
+    _salvar_npz(df, destino)
+    return df, False
+
+
+# ======================================================
+# RELATÓRIO
+# ======================================================
+
+def relatorio(arquivos):
+    print("\n📊 CARGA DOS DADOS DE TREINO")
+    print(f"   {'arquivo':<18} {'excel ms':>9} {'cache ms':>9} {'ganho':>7} "
+          f"{'mem excel KB':>12} {'mem cache KB':>13}")
+
+    for caminho in arquivos:
+        caminho = Path(caminho)
+
+        t0 = time.perf_counter()
+        original = pd.read_excel(caminho)
+        t_excel = (time.perf_counter() - t0) * 1000
+
+        ler_excel(caminho)  # garante o cache
+        t0 = time.perf_counter()
+        df, _ = ler_excel(caminho)
+        t_cache = (time.perf_counter() - t0) * 1000
+
+        # Mesmos valores, bit a bit (só os inteiros mudam de tipo)
+        pd.testing.assert_frame_equal(original, df.astype(original.dtypes.to_dict()), check_exact=True)
+
+        mem_antes = original.memory_usage(deep=True).sum() / 1024
+        mem_depois = df.memory_usage(deep=True).sum() / 1024
+        print(f"   {caminho.name:<18} {t_excel:9.1f} {t_cache:9.1f} {t_excel / t_cache:6.0f}x "
+              f"{mem_antes:12.1f} {mem_depois:13.1f}")
+
+    print("\n   Tipos no cache:")
+    for coluna, tipo in df.dtypes.items():
+        print(f"      {coluna:<28} {tipo}")
+
+
+if __name__ == "__main__":
+    relatorio(["train (2).xlsx", "test (2).xlsx"])
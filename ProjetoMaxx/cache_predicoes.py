@@ -0,0 +1,148 @@
+"""
+CACHE LRU DE PREDIÇÕES
+
+O front costuma chamar /cliente, /atualizar_temporal e /predict de novo
+para o mesmo cliente com as mesmas features; o cache evita rodar o modelo
+outra vez nesses casos.
+
+Chave: versão (hash) do modelo + vetor ordenado das FEATURES. Para o
+GradientBoostingClassifier o vetor é quantizado em float32 (as árvores dele
+comparam os valores em float32); para os demais modelos (ex.: o backend
+HistGradientBoosting, que separa os valores em faixas em float64) entram os
+bytes float64. Nos dois casos, dois vetores com a mesma chave recebem
+sempre a mesma probabilidade.
+
+- Tamanho limitado (LRU) e TTL por entrada.
+- Invalidação automática: se o arquivo do modelo mudar no disco (mtime/
+  tamanho), o cache é esvaziado na próxima consulta.
+- Estatísticas de acertos/erros em estatisticas().
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+import numpy as np
+
+# Intervalo mínimo entre dois os.stat() do arquivo do modelo
+VERIFICAR_ARTEFATO_A_CADA_S = 1.0
+
+
+def _assinatura(caminho: Optional[str]):
+    try:
+        st = os.stat(caminho)
+        return (st.st_mtime_ns, st.st_size)
+    except (OSError, TypeError):
+        return None
+
+
+class CachePredicoes:
+
+    def __init__(self, tamanho: int = 4096, ttl_s: float = 300.0,
+                 caminho_modelo: Optional[str] = None, versao_modelo: Optional[str] = None):
+        self.tamanho = max(0, int(tamanho))
+        self.ttl_s = float(ttl_s)
+        self.caminho_modelo = caminho_modelo
+        self.versao_modelo = versao_modelo
+
+        self._lock = threading.Lock()
+        self._dados: "OrderedDict[tuple, Tuple[float, object]]" = OrderedDict()
+        self._assinatura_modelo = _assinatura(caminho_modelo)
+        self._ultima_verificacao = time.monotonic()
+
+        self.acertos = 0
+        self.erros = 0
+        self.expirados = 0
+        self.invalidacoes = 0
+
+    @property
+    def ativo(self) -> bool:
+        return self.tamanho > 0
+
+    def chave(self, vetor, versao_modelo: Optional[str] = None, float32: bool = True) -> tuple:
+        """Versão do modelo + vetor de features como o modelo enxerga (float32 ou float64)."""
+        versao = versao_modelo if versao_modelo is not None else self.versao_modelo
+        return (versao, np.asarray(vetor, dtype=np.float32 if float32 else np.float64).tobytes())
+
+    # --------------------------------------------------
+    # INVALIDAÇÃO
+    # --------------------------------------------------
+    def _verificar_artefato(self, agora: float):
+        if agora - self._ultima_verificacao < VERIFICAR_ARTEFATO_A_CADA_S:
+            return
+        self._ultima_verificacao = agora
+
+        assinatura = _assinatura(self.caminho_modelo)
+        if assinatura != self._assinatura_modelo:
+            self._assinatura_modelo = assinatura
+            if self._dados:
+                print(f"Cache de predições invalidado: modelo alterado em disco ({len(self._dados)} entradas)")
+            self._dados.clear()
+            self.invalidacoes += 1
+
+    def limpar(self, versao_modelo: Optional[str] = None, caminho_modelo: Optional[str] = None):
+        """Esvazia o cache (e troca a versão/arquivo do modelo vigiados, se informados)."""
+        with self._lock:
+            self._dados.clear()
+            self.invalidacoes += 1
+            if versao_modelo is not None:
+                self.versao_modelo = versao_modelo
+            if caminho_modelo is not None:
+                self.caminho_modelo = caminho_modelo
+            self._assinatura_modelo = _assinatura(self.caminho_modelo)
+
+    # --------------------------------------------------
+    # CONSULTA / GRAVAÇÃO
+    # --------------------------------------------------
+    def obter(self, chave: tuple):
+        """Valor guardado para a chave, ou None (conta acerto/erro)."""
+        if not self.ativo:
+            return None
+
+        agora = time.monotonic()
+        with self._lock:
+            self._verificar_artefato(agora)
+
+            item = self._dados.get(chave)
+            if item is None:
+                self.erros += 1
+                return None
+
+            expira_em, valor = item
+            if agora >= expira_em:
+                del self._dados[chave]
+                self.expirados += 1
+                self.erros += 1
+                return None
+
+            self._dados.move_to_end(chave)
+            self.acertos += 1
+            return valor
+
+    def guardar(self, chave: tuple, valor):
+        if not self.ativo:
+            return
+
+        with self._lock:
+            self._dados[chave] = (time.monotonic() + self.ttl_s, valor)
+            self._dados.move_to_end(chave)
+            while len(self._dados) > self.tamanho:
+                self._dados.popitem(last=False)
+
+    def estatisticas(self) -> dict:
+        with self._lock:
+            consultas = self.acertos + self.erros
+            return {
+                "ativo": self.ativo,
+                "entradas": len(self._dados),
+                "tamanho_max": self.tamanho,
+                "ttl_s": self.ttl_s,
+                "acertos": self.acertos,
+                "erros": self.erros,
+                "expirados": self.expirados,
+                "invalidacoes": self.invalidacoes,
+                "taxa_acerto": round(self.acertos / consultas, 4) if consultas else 0.0,
+                "versao_modelo": self.versao_modelo,
+            }
@@ -0,0 +1,114 @@
+"""
+CONVERSÃO DA BASE DE CLIENTES PARA FORMATO COLUNAR
+
+Entrada:
+- base_clientes.csv
+
+Saída:
+- base_clientes.colunar/  (uma coluna float64 por .npy + índice de IDs + meta.json)
+
+Depois da conversão, a API, a tabela de scores e o teste_modelo_local_por_id.py
+passam a mapear as colunas em memória em vez de fazer o parse do CSV.
+O CSV continua sendo o fallback (e é mantido em dia pela compactação).
+
+Uso (na pasta ProjetoMaxx):
+    python converter_base.py [--csv base_clientes.csv] [--sem-relatorio]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+import pandas as pd
+
+from base_clientes import COLUNA_ID, carregar_colunas, salvar_colunar
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATABASE_PATH = os.path.join(BASE_DIR, "base_clientes.csv")
+
+
+def _rss_mb() -> float:
+    """Memória residente atual do processo (MB)."""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / 2 ** 20
+    except ImportError:
+        pass
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except (OSError, ValueError, AttributeError):
+        import resource  # só o pico, mas melhor que nada
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def medir_carga(caminho_csv: str, formato: str) -> dict:
+    """Roda num processo novo: tempo para carregar a base + índice e RSS resultante."""
+    rss_antes = _rss_mb()
+    t0 = time.perf_counter()
+
+    ids, colunas, usado = carregar_colunas(caminho_csv, formato)
+    indice = {}
+    for i, v in enumerate(ids):
+        indice.setdefault(v, i)
+
+    # Uma consulta de verdade, como o /cliente faria
+    _ = {c: float(arr[indice[ids[0]]]) for c, arr in colunas.items()}
+
+    return {
+        "formato": usado,
+        "tempo_ms": (time.perf_counter() - t0) * 1000,
+        "rss_mb": _rss_mb(),
+        "rss_delta_mb": _rss_mb() - rss_antes,
+    }
+
+
+def relatorio(caminho_csv: str):
+    print("\n📊 CARGA DA BASE (processo novo para cada formato)")
+    for formato in ("csv", "colunar"):
+        saida = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--csv", caminho_csv, "--medir", formato],
+            capture_output=True, text=True, check=True
+        ).stdout.strip().splitlines()[-1]
+        r = json.loads(saida)
+        print(f"   {r['formato']:<8} carga={r['tempo_ms']:8.1f} ms   "
+              f"RSS={r['rss_mb']:7.1f} MB   (+{r['rss_delta_mb']:.1f} MB na carga)")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--csv", default=DATABASE_PATH)
+    parser.add_argument("--sem-relatorio", action="store_true")
+    parser.add_argument("--medir", choices=["csv", "colunar"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.medir:
+        print(json.dumps(medir_carga(args.csv, args.medir)))
+        return
+
+    print("📍 Convertendo base de clientes para formato colunar...")
+    t0 = time.perf_counter()
+
+    df = pd.read_csv(args.csv, dtype=str)
+    df.columns = df.columns.str.strip()
+    if COLUNA_ID not in df.columns:
+        raise ValueError(f"Coluna {COLUNA_ID} não encontrada em {args.csv}")
+
+    pasta = salvar_colunar(df, args.csv)
+
+    tamanho = sum(
+        os.path.getsize(os.path.join(pasta, n)) for n in os.listdir(pasta)
+    )
+    print(f"   ✓ {len(df)} linhas, {len(df.columns) - 1} colunas numéricas")
+    print(f"   ✓ Pasta: {pasta} ({tamanho / 1024:.0f} KB)")
+    print(f"   ✓ Tempo: {(time.perf_counter() - t0) * 1000:.0f} ms")
+
+    if not args.sem_relatorio:
+        relatorio(args.csv)
+
+
+if __name__ == "__main__":
+    main()
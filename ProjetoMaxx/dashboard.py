@@ -0,0 +1,474 @@
+"""
+DASHBOARD ANALÍTICO (AGREGADOS NO SERVIDOR)
+
+Antes, a aba Dashboard baixava o datasetdashboard.csv inteiro (centenas de
+milhares de linhas) e fazia parse, filtros e contagens em JavaScript. Agora
+o arquivo é lido UMA vez por processo, em colunas tipadas (categorias para
+gênero/serviço/cidade/canal, datas em datetime64), e as rotas /dashboard/*
+devolvem só os agregados (groupby vetorizado) em JSON pequeno.
+
+- O arquivo é relido quando muda (mtime/tamanho), como a base de clientes.
+- Cada combinação de filtros fica num cache LRU, esvaziado quando o arquivo muda.
+- Fonte: datasetdashboard.csv; sem ele, datasetdashboard.xlsx (que às vezes é
+  só o mesmo CSV com outra extensão).
+
+Para conferir os números no terminal (na pasta ProjetoMaxx):
+    python dashboard.py [--genero F] [--status churn]
+"""
+
+import argparse
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+# Colunas do arquivo -> nomes usados aqui
+COLUNAS_ORIGEM = {
+    "ID_CLIENTE": "id",
+    "DATA_REGISTRO": "data_registro",
+    "HORA_REGISTRO": "hora_registro",
+    "SITUACAO": "situacao",
+    "GENERO": "genero",
+    "IDADE_APROX": "idade",
+    "CIDADE_x": "cidade",
+    "CANAL": "canal",
+    "SERVICO": "servico",
+    "MESES": "meses",
+    "TICKET_MEDIO": "ticket",
+}
+DIMENSOES = ("genero", "servico", "cidade", "canal")
+NAO_INFORMADO = "Não informado"
+SITUACAO_CHURN = "DESLIGADO"
+
+# Colunas da tabela / exportação (mesmos nomes do arquivo)
+COLUNAS_REGISTRO = [
+    ("ID_CLIENTE", "id"), ("DATA_REGISTRO", "data_registro"), ("HORA_REGISTRO", "hora_registro"),
+    ("SITUACAO", "situacao"), ("CHURN", "churn"), ("CANAL", "canal"), ("SERVICO", "servico"),
+    ("GENERO", "genero"), ("IDADE_APROX", "idade"), ("MESES", "meses"),
+    ("TICKET_MEDIO", "ticket"), ("CIDADE", "cidade"),
+]
+
+FAIXAS_IDADE = [-np.inf, 25, 40, 55, 70, np.inf]
+ROTULOS_IDADE = ["0-25", "26-40", "41-55", "56-70", "71+"]
+
+TOP_SERVICOS = 6
+TOP_CIDADES = 5
+CACHE_TAMANHO = 256
+POR_PAGINA_MAX = 100
+
+
+def _assinatura_arquivo(caminho: str):
+    try:
+        st = os.stat(caminho)
+    except FileNotFoundError:
+        return None
+    return (caminho, st.st_mtime_ns, st.st_size)
+
+
+# ======================================================
+# LEITURA
+# ======================================================
+
+def _por_valor_unico(serie: pd.Series, converter) -> pd.Series:
+    """Aplica converter só aos valores distintos (datas, cidades, tickets se repetem muito)."""
+    codigos, unicos = pd.factorize(serie.fillna(""))
+    convertidos = converter(pd.Series(unicos, dtype=object))
+    return pd.Series(np.asarray(convertidos)[codigos], index=serie.index)
+
+
+def _texto_para_numero(serie: pd.Series) -> pd.Series:
+    """'R$ 1.234,56' / '89,9' / '42' -> float (inválido -> NaN), como o toNumber do front."""
+    if pd.api.types.is_numeric_dtype(serie):
+        return serie.astype(np.float64)
+    s = serie.astype(str).str.replace(r"R\$|\s", "", regex=True).str.replace(r"[^0-9,.\-]", "", regex=True)
+    milhar = s.str.contains(".", regex=False) & s.str.contains(",", regex=False)
+    s = s.where(~milhar, s.str.replace(".", "", regex=False))
+    s = s.str.replace(",", ".", n=1, regex=False)
+    return pd.to_numeric(s, errors="coerce")
+
+
+def _texto_para_data(serie: pd.Series) -> pd.Series:
+    """Data do registro: AAAA-MM-DD no começo do texto ou DD/MM/AAAA (outro formato -> NaT)."""
+    s = serie.astype(str).str.strip()
+    datas = pd.to_datetime(s.str.extract(r"^(\d{4}-\d{2}-\d{2})", expand=False),
+                           format="%Y-%m-%d", errors="coerce")
+    br = s.str.extract(r"^(\d{1,2}/\d{1,2}/\d{4})", expand=False)
+    resto = datas.isna() & br.notna()
+    if resto.any():
+        datas[resto] = pd.to_datetime(br[resto], format="%d/%m/%Y", errors="coerce")
+    return datas
+
+
+def _ler_arquivo(caminho: str) -> pd.DataFrame:
+    with open(caminho, "rb") as f:
+        excel = f.read(4) == b"PK\x03\x04"  # .xlsx de verdade é um zip
+    usar = list(COLUNAS_ORIGEM)
+    if excel:
+        df = pd.read_excel(caminho, dtype=str)
+        return df.reindex(columns=usar)
+    return pd.read_csv(caminho, dtype=str, keep_default_na=False,
+                       usecols=lambda c: c.strip() in COLUNAS_ORIGEM).rename(columns=str.strip).reindex(columns=usar)
+
+
+def _como_texto(serie: pd.Series) -> pd.Series:
+    """Valores como aparecem na tabela: 42.0 -> '42', NaN -> ''."""
+    if pd.api.types.is_float_dtype(serie):
+        inteiro = serie.notna() & (serie % 1 == 0)
+        texto = serie.astype(str).where(~inteiro, serie.fillna(0).astype(np.int64).astype(str))
+        return texto.where(serie.notna(), "")
+    return serie.astype(str)
+
+
+def _rotulos_busca(serie: pd.Series):
+    """(código de cada linha, texto em minúsculas de cada valor distinto) para a busca."""
+    codigos, unicos = pd.factorize(serie)
+    return codigos, _como_texto(pd.Series(unicos)).str.lower()
+
+
+def preparar(bruto: pd.DataFrame) -> pd.DataFrame:
+    """Arquivo bruto -> colunas tipadas; descarta linhas sem ID ou sem data (como o front)."""
+    df = bruto.rename(columns=COLUNAS_ORIGEM)
+    df["id"] = df["id"].fillna("").astype(str).str.strip()
+    for c in ("data_registro", "hora_registro", "situacao"):
+        df[c] = _por_valor_unico(df[c], lambda s: s.astype(str).str.strip())
+
+    df["data"] = _por_valor_unico(df["data_registro"], _texto_para_data).astype("datetime64[ns]")
+    df = df[df["id"].ne("") & df["data"].notna()].reset_index(drop=True)
+    df["id"] = df["id"].astype("category")
+
+    df["situacao"] = _por_valor_unico(df["situacao"], lambda s: s.str.upper())
+    df["churn"] = df["situacao"].eq(SITUACAO_CHURN).astype(np.int8)
+    for c in ("data_registro", "hora_registro", "situacao"):
+        df[c] = df[c].astype("category")
+    for c in DIMENSOES:
+        df[c] = _por_valor_unico(
+            df[c], lambda s: s.astype(str).str.strip().replace("", NAO_INFORMADO)
+        ).astype("category")
+    for c in ("idade", "meses", "ticket"):
+        df[c] = _por_valor_unico(df[c], _texto_para_numero).astype(np.float64)
+    df["mes"] = _por_valor_unico(df["data"], lambda s: pd.to_datetime(s).dt.strftime("%Y-%m")).astype("category")
+    return df
+
+
+# ======================================================
+# AGREGADOS
+# ======================================================
+
+def _por_valor(df: pd.DataFrame, coluna: str) -> pd.DataFrame:
+    """total / churn / taxa por valor da coluna, na ordem em que os valores aparecem."""
+    g = df.groupby(coluna, sort=False, observed=True)["churn"].agg(["size", "sum"])
+    g.columns = ["total", "churn"]
+    g["taxa_churn"] = g["churn"] / g["total"] * 100
+    return g
+
+
+def _linhas(g: pd.DataFrame, rotulo: str) -> List[dict]:
+    return [
+        {rotulo: str(k), "total": int(t), "churn": int(c), "taxa_churn": round(float(x), 2)}
+        for k, t, c, x in zip(g.index, g["total"], g["churn"], g["taxa_churn"])
+    ]
+
+
+def churn_por(df: pd.DataFrame, dimensao: str, limite: Optional[int] = None,
+              ordem: Optional[str] = None, agrupar_resto: bool = False) -> List[dict]:
+    """Taxa de churn por gênero/serviço/cidade/canal.
+
+    ordem: "total", "churn" ou "taxa_churn" (decrescente); sem ordem, a de aparição.
+    agrupar_resto soma o que passar do limite numa linha "Outros".
+    """
+    if dimensao not in DIMENSOES:
+        raise ValueError(f"Dimensão inválida: {dimensao} (use {', '.join(DIMENSOES)})")
+    g = _por_valor(df, dimensao)
+    if ordem:
+        if ordem not in ("total", "churn", "taxa_churn"):
+            raise ValueError(f"Ordem inválida: {ordem}")
+        g = g.sort_values(ordem, ascending=False, kind="stable")
+        if ordem == "churn":
+            g = g[g["churn"] > 0]
+    if limite is None or len(g) <= limite:
+        return _linhas(g, "valor")
+
+    linhas = _linhas(g.iloc[:limite], "valor")
+    if agrupar_resto:
+        resto = g.iloc[limite:]
+        total, churn = int(resto["total"].sum()), int(resto["churn"].sum())
+        linhas.append({"valor": "Outros", "total": total, "churn": churn,
+                       "taxa_churn": round(churn / total * 100, 2)})
+    return linhas
+
+
+def serie_temporal(df: pd.DataFrame, periodo: str = "mes") -> List[dict]:
+    """Taxa de churn por mês (AAAA-MM) ou por dia (AAAA-MM-DD), em ordem cronológica."""
+    if periodo == "mes":
+        chave = df["mes"]
+    elif periodo == "dia":
+        chave = df["data"].dt.strftime("%Y-%m-%d")
+    else:
+        raise ValueError(f"Período inválido: {periodo} (use mes ou dia)")
+    g = _por_valor(df.assign(_periodo=chave), "_periodo")
+    g.index = g.index.astype(str)
+    return _linhas(g.sort_index(), "periodo")
+
+
+def resumo_clientes(df: pd.DataFrame) -> Dict[str, float]:
+    """Clientes únicos pela situação do registro mais recente (empate: o primeiro do arquivo)."""
+    if df.empty:
+        return {"total": 0, "churn": 0, "ativos": 0, "taxa_churn": 0.0}
+    cliente = df["id"].cat.codes
+    mais_recente = df["data"].eq(df["data"].groupby(cliente, sort=False).transform("max"))
+    ultimos = pd.DataFrame({"cliente": cliente[mais_recente], "churn": df["churn"][mais_recente]})
+    ultimos = ultimos.drop_duplicates("cliente")
+    total, churn = len(ultimos), int(ultimos["churn"].sum())
+    return {"total": total, "churn": churn, "ativos": total - churn,
+            "taxa_churn": round(churn / total * 100, 1)}
+
+
+def faixas_idade(df: pd.DataFrame) -> List[dict]:
+    faixa = pd.cut(df["idade"], FAIXAS_IDADE, labels=ROTULOS_IDADE)
+    contagem = faixa.value_counts(sort=False)
+    linhas = [{"faixa": str(k), "total": int(v)} for k, v in contagem.items()]
+    linhas.append({"faixa": "N/I", "total": int(faixa.isna().sum())})
+    return linhas
+
+
+# ======================================================
+# DASHBOARD (arquivo + cache)
+# ======================================================
+
+class _Carga:
+    """Uma leitura do arquivo: dados tipados + rótulos da busca (montados sob demanda)."""
+    __slots__ = ("assinatura", "df", "rotulos")
+
+    def __init__(self, assinatura, df: pd.DataFrame):
+        self.assinatura = assinatura
+        self.df = df
+        self.rotulos: Dict[str, tuple] = {}
+
+
+class Dashboard:
+
+    def __init__(self, caminhos: List[str], cache_tamanho: int = CACHE_TAMANHO):
+        """caminhos: fontes em ordem de preferência (usa a primeira que existir)."""
+        self.caminhos = list(caminhos)
+        self.cache_tamanho = cache_tamanho
+
+        self._lock = threading.Lock()
+        self._carga = _Carga(None, None)
+        self._cache: "OrderedDict[tuple, object]" = OrderedDict()
+
+    # --------------------------------------------------
+    # CARREGAMENTO
+    # --------------------------------------------------
+    def _fonte(self) -> Optional[str]:
+        for caminho in self.caminhos:
+            if os.path.exists(caminho):
+                return caminho
+        return None
+
+    def _atual(self) -> _Carga:
+        """Dados tipados; relê o arquivo (e esvazia o cache) se ele mudou."""
+        fonte = self._fonte()
+        if fonte is None:
+            raise FileNotFoundError("Arquivo do dashboard não encontrado: " + ", ".join(
+                os.path.basename(c) for c in self.caminhos))
+
+        assinatura = _assinatura_arquivo(fonte)
+        if assinatura != self._carga.assinatura:
+            with self._lock:
+                if assinatura != self._carga.assinatura:
+                    t0 = time.perf_counter()
+                    self._carga = _Carga(assinatura, preparar(_ler_arquivo(fonte)))
+                    self._cache.clear()
+                    print(f"Dashboard carregado: {len(self._carga.df)} registros de "
+                          f"{os.path.basename(fonte)} em {time.perf_counter() - t0:.2f}s")
+        return self._carga
+
+    def _com_cache(self, chave: tuple, calcular):
+        carga = self._atual()
+        chave = (carga.assinatura,) + chave
+        with self._lock:
+            if chave in self._cache:
+                self._cache.move_to_end(chave)
+                return self._cache[chave]
+        valor = calcular(carga)
+        with self._lock:
+            self._cache[chave] = valor
+            if len(self._cache) > self.cache_tamanho:
+                self._cache.popitem(last=False)
+        return valor
+
+    # --------------------------------------------------
+    # FILTROS
+    # --------------------------------------------------
+    @staticmethod
+    def normalizar_filtros(data_inicio=None, data_fim=None, status=None, genero=None,
+                           busca=None) -> tuple:
+        """Filtros validados, numa tupla que também serve de chave do cache."""
+        datas = []
+        for nome, valor in (("data_inicio", data_inicio), ("data_fim", data_fim)):
+            valor = (valor or "").strip()
+            if valor:
+                try:
+                    pd.Timestamp(valor)
+                except ValueError:
+                    raise ValueError(f"{nome} inválida: {valor} (use AAAA-MM-DD)")
+            datas.append(valor or None)
+        status = (status or "").strip().lower() or None
+        if status not in (None, "ativo", "churn"):
+            raise ValueError(f"Status inválido: {status} (use ativo ou churn)")
+        return (datas[0], datas[1], status, (genero or "").strip() or None,
+                (busca or "").strip().lower() or None)
+
+    @staticmethod
+    def _contem(carga: _Carga, busca: str) -> np.ndarray:
+        """Linhas com alguma coluna da tabela contendo busca; cada valor distinto é testado uma vez."""
+        achou = np.zeros(len(carga.df), dtype=bool)
+        for _, c in COLUNAS_REGISTRO:
+            if c == "churn":
+                continue
+            if c not in carga.rotulos:
+                carga.rotulos[c] = _rotulos_busca(carga.df[c])
+            codigos, textos = carga.rotulos[c]
+            achou |= np.append(textos.str.contains(busca, regex=False).to_numpy(dtype=bool), False)[codigos]
+        return achou
+
+    def _filtrar(self, carga: _Carga, filtros: tuple) -> pd.DataFrame:
+        df = carga.df
+        data_inicio, data_fim, status, genero, busca = filtros
+        mascara = np.ones(len(df), dtype=bool)
+        if data_inicio:
+            mascara &= (df["data"] >= pd.Timestamp(data_inicio)).to_numpy()
+        if data_fim:
+            mascara &= (df["data"] <= pd.Timestamp(data_fim)).to_numpy()
+        if status:
+            mascara &= (df["churn"] == (1 if status == "churn" else 0)).to_numpy()
+        if genero:
+            mascara &= (df["genero"] == genero).to_numpy()
+        if busca:
+            mascara &= self._contem(carga, busca)
+        return df if mascara.all() else df[mascara]
+
+    # --------------------------------------------------
+    # CONSULTAS
+    # --------------------------------------------------
+    def resumo(self, filtros: tuple) -> dict:
+        """Tudo que a aba Dashboard desenha, numa resposta só."""
+        def calcular(carga):
+            sel = self._filtrar(carga, filtros)
+            df = carga.df
+            periodo = df["data"]
+            return {
+                "registros": len(sel),
+                "clientes": resumo_clientes(sel),
+                "por_servico": churn_por(sel, "servico", TOP_SERVICOS, "total", agrupar_resto=True),
+                "por_genero": churn_por(sel, "genero"),
+                "por_cidade": churn_por(sel, "cidade", TOP_CIDADES, "churn"),
+                "por_canal": churn_por(sel, "canal"),
+                "serie_mensal": serie_temporal(sel, "mes"),
+                "faixas_idade": faixas_idade(sel),
+                # Sem filtro: limites dos campos de data e opções de gênero
+                "periodo": {
+                    "inicio": periodo.min().strftime("%Y-%m-%d") if len(df) else None,
+                    "fim": periodo.max().strftime("%Y-%m-%d") if len(df) else None,
+                },
+                "generos": sorted(df["genero"].cat.categories.astype(str).tolist()),
+            }
+        return self._com_cache(("resumo", filtros), calcular)
+
+    def churn_por(self, dimensao: str, filtros: tuple, limite: Optional[int] = None,
+                  ordem: Optional[str] = None) -> List[dict]:
+        return self._com_cache(
+            ("churn_por", dimensao, limite, ordem, filtros),
+            lambda carga: churn_por(self._filtrar(carga, filtros), dimensao, limite, ordem)
+        )
+
+    def serie(self, filtros: tuple, periodo: str = "mes") -> List[dict]:
+        return self._com_cache(
+            ("serie", periodo, filtros),
+            lambda carga: serie_temporal(self._filtrar(carga, filtros), periodo)
+        )
+
+    def registros(self, filtros: tuple, pagina: int = 1, por_pagina: int = 10) -> dict:
+        """Uma página da tabela (não passa pelo cache: só fatia as linhas filtradas)."""
+        por_pagina = max(1, min(int(por_pagina), POR_PAGINA_MAX))
+        sel = self._filtrar(self._atual(), filtros)
+        paginas = max(1, -(-len(sel) // por_pagina))
+        pagina = max(1, min(int(pagina), paginas))
+        inicio = (pagina - 1) * por_pagina
+        return {
+            "registros": _para_registros(sel.iloc[inicio:inicio + por_pagina]),
+            "total": len(sel),
+            "pagina": pagina,
+            "paginas": paginas,
+            "por_pagina": por_pagina,
+        }
+
+    def exportar_csv(self, filtros: tuple, bloco: int = 50000) -> Iterator[str]:
+        """CSV das linhas filtradas, em blocos (para resposta em streaming).
+
+        O filtro roda já na chamada: arquivo ausente / filtro inválido levantam aqui.
+        """
+        sel = self._filtrar(self._atual(), filtros)
+        colunas = [(nome, c) for nome, c in COLUNAS_REGISTRO if c != "churn"]
+
+        def gerar():
+            yield ",".join(nome for nome, _ in colunas) + "\n"
+            for i in range(0, len(sel), bloco):
+                parte = sel.iloc[i:i + bloco]
+                yield pd.DataFrame({nome: _como_texto(parte[c]) for nome, c in colunas}).to_csv(
+                    index=False, header=False)
+
+        return gerar()
+
+
+def _para_registros(df: pd.DataFrame) -> List[dict]:
+    out = pd.DataFrame({nome: df[c] for nome, c in COLUNAS_REGISTRO})
+    out["CHURN"] = out["CHURN"].astype(int)
+    for c in ("IDADE_APROX", "MESES", "TICKET_MEDIO"):
+        out[c] = out[c].astype(object).where(out[c].notna(), None)
+    categorias = [nome for nome in out.columns if isinstance(out[nome].dtype, pd.CategoricalDtype)]
+    return out.astype({nome: object for nome in categorias}).to_dict("records")
+
+
+# ======================================================
+# RELATÓRIO
+# ======================================================
+
+def main():
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description="Agregados do dashboard no terminal")
+    parser.add_argument("--arquivo", help="CSV/xlsx do dashboard (padrão: datasetdashboard.csv/.xlsx)")
+    parser.add_argument("--inicio")
+    parser.add_argument("--fim")
+    parser.add_argument("--status", choices=["ativo", "churn"])
+    parser.add_argument("--genero")
+    args = parser.parse_args()
+
+    caminhos = [args.arquivo] if args.arquivo else [
+        os.path.join(base_dir, "datasetdashboard.csv"), os.path.join(base_dir, "datasetdashboard.xlsx")
+    ]
+    dash = Dashboard(caminhos)
+    filtros = dash.normalizar_filtros(args.inicio, args.fim, args.status, args.genero)
+
+    t0 = time.perf_counter()
+    r = dash.resumo(filtros)
+    t1 = time.perf_counter()
+    dash.resumo(filtros)
+    t2 = time.perf_counter()
+
+    c = r["clientes"]
+    print(f"\n{r['registros']:,} registros | {c['total']:,} clientes | "
+          f"churn {c['taxa_churn']}% ({c['churn']:,})")
+    for chave in ("por_genero", "por_servico", "por_canal", "por_cidade"):
+        print(f"\n{chave}:")
+        for linha in r[chave]:
+            print(f"  {linha['valor'][:30]:<30} {linha['total']:>9,} {linha['taxa_churn']:>7.2f}%")
+    print(f"\nPrimeira consulta (com leitura): {t1 - t0:.2f}s | em cache: {(t2 - t1) * 1000:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
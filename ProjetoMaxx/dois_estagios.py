@@ -0,0 +1,302 @@
+"""
+PREDIÇÃO EM DOIS ESTÁGIOS (PRÉ-FILTRO + MODELO COMPLETO)
+
+Um Gradient Boosting pequeno (PREFILTRO_PARAMS: 30 árvores rasas, treinado
+pelo treino_m.py junto com o modelo principal) responde sozinho quando a
+probabilidade dele está longe dos limites de risco (30% e 60%); perto de
+um limite, a linha sobe para o modelo completo (200 árvores).
+
+"Longe" é calibrado numa parte do treino separada antes de ajustar o
+pré-filtro (FRACAO_CALIBRACAO, estratificada; no próprio treino as
+probabilidades dele seriam confiantes demais e as faixas sairiam largas),
+de cada lado de cada limite: abaixo de `baixo_ate` o modelo completo dá
+BAIXO em pelo menos (1 - tolerância) das linhas; entre `moderado_de` e
+`moderado_ate`, MODERADO; a partir de `alto_de`, ALTO. Fora dessas faixas,
+escala.
+
+O pré-filtro fica em modelos/<versao>.prefiltro.joblib (a versão do modelo
+completo para o qual foi calibrado) e a API só o usa com
+CHURN_DOIS_ESTAGIOS=1. Quando ele responde, o percentual_churn é o dele
+(mesma faixa de risco, número aproximado).
+
+Uso (na pasta ProjetoMaxx):
+    python dois_estagios.py treinar [--tolerancia 0.002]   (pré-filtro para o modelo ativo)
+    python dois_estagios.py relatorio                      (escalonamento, ganho e divergências no test)
+"""
+
+import argparse
+import os
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+from scipy.special import expit
+
+from pipeline_features import LIMITE_ALTO, LIMITE_MODERADO, niveis_risco, percentuais
+from scorer_compilado import ScorerCompilado
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+TRAIN_PATH = os.path.join(BASE_DIR, "train (2).xlsx")
+TEST_PATH = os.path.join(BASE_DIR, "test (2).xlsx")
+
+PREFILTRO_PARAMS = {
+    "n_estimators": 30,
+    "learning_rate": 0.2,
+    "max_depth": 3,
+    "random_state": 42,
+}
+
+# Fração máxima (na calibração) de linhas em que a faixa do pré-filtro difere da do modelo completo
+TOLERANCIA_DESACORDO = 0.002
+
+# Parte do treino que fica fora do ajuste do pré-filtro e só calibra os cortes
+FRACAO_CALIBRACAO = 0.25
+
+# Linhas do test medidas uma a uma (chamada de 1 linha, como o /predict)
+LINHAS_POR_LINHA = 300
+
+
+# ======================================================
+# CALIBRAÇÃO
+# ======================================================
+
+def faixas(probas: np.ndarray) -> np.ndarray:
+    """0 = BAIXO, 1 = MODERADO, 2 = ALTO (pelo percentual arredondado, como a API)."""
+    percentual = np.round(np.asarray(probas, dtype=np.float64) * 100, 2)
+    return np.where(percentual >= LIMITE_ALTO, 2, np.where(percentual >= LIMITE_MODERADO, 1, 0))
+
+
+def calibrar_cortes(proba_prefiltro: np.ndarray, proba_completo: np.ndarray,
+                    tolerancia: float = TOLERANCIA_DESACORDO) -> Dict[str, float]:
+    """Faixas da probabilidade do pré-filtro em que ele pode responder sozinho."""
+    faixa = faixas(proba_completo)
+    moderado, alto = LIMITE_MODERADO / 100, LIMITE_ALTO / 100
+
+    def quantil(mascara, q, padrao):
+        return float(np.quantile(proba_prefiltro[mascara], q)) if mascara.any() else padrao
+
+    return {
+        "baixo_ate": min(quantil(faixa >= 1, tolerancia, moderado), moderado),
+        "moderado_de": max(quantil(faixa == 0, 1 - tolerancia, moderado), moderado),
+        "moderado_ate": min(quantil(faixa == 2, tolerancia, alto), alto),
+        "alto_de": max(quantil(faixa <= 1, 1 - tolerancia, alto), alto),
+    }
+
+
+def treinar(X_train, y_train, modelo_completo, features: List[str],
+            tolerancia: float = TOLERANCIA_DESACORDO) -> dict:
+    """Treina o pré-filtro e calibra os cortes em linhas que ele não viu; retorna o artefato para salvar_prefiltro()."""
+    from sklearn.ensemble import GradientBoostingClassifier
+    from sklearn.model_selection import train_test_split
+
+    X_ajuste, X_calibracao, y_ajuste, _ = train_test_split(
+        X_train, y_train, test_size=FRACAO_CALIBRACAO, stratify=y_train,
+        random_state=PREFILTRO_PARAMS["random_state"],
+    )
+    model = GradientBoostingClassifier(**PREFILTRO_PARAMS).fit(X_ajuste, y_ajuste)
+    proba_prefiltro = model.predict_proba(X_calibracao)[:, list(model.classes_).index(1)]
+    proba_completo = modelo_completo.predict_proba(X_calibracao)[:, list(modelo_completo.classes_).index(1)]
+
+    return {
+        "model": model,
+        "features": list(features),
+        "cortes": calibrar_cortes(proba_prefiltro, proba_completo, tolerancia),
+        "tolerancia": tolerancia,
+        "fracao_calibracao": FRACAO_CALIBRACAO,
+        "params": dict(PREFILTRO_PARAMS),
+    }
+
+
+def salvar_prefiltro(artefato: dict, versao: str, pasta: Optional[str] = None) -> str:
+    import joblib
+    import registro_modelos
+
+    destino = registro_modelos.caminho_prefiltro(versao, pasta or registro_modelos.REGISTRO_DIR)
+    os.makedirs(os.path.dirname(destino), exist_ok=True)
+    joblib.dump(dict(artefato, versao_modelo=versao), destino + ".tmp")
+    os.replace(destino + ".tmp", destino)
+    return destino
+
+
+# ======================================================
+# SERVIÇO
+# ======================================================
+
+class Prefiltro:
+    """Probabilidade do modelo pequeno + máscara das linhas que ele pode responder."""
+
+    def __init__(self, model, features: List[str], cortes: Dict[str, float], versao_modelo: str):
+        self.features = list(features)
+        self.cortes = dict(cortes)
+        self.versao_modelo = versao_modelo
+        try:
+            self.scorer = ScorerCompilado.de_modelo(model, self.features)
+        except ValueError:
+            self.scorer = model
+        self.idx_churn = list(self.scorer.classes_).index(1)
+
+        # Uma linha (o /predict): com ~30 árvores rasas, percorrer listas em
+        # Python custa menos que as chamadas fixas do NumPy
+        self._arvores = None
+        s = self.scorer
+        if isinstance(s, ScorerCompilado) and not s._init_do_modelo:
+            self._arvores = (s.feature.tolist(), s.threshold.tolist(), s.esquerda.tolist(),
+                             s.direita.tolist(), s._valor_escalado.tolist(), s.raizes.tolist())
+
+    @classmethod
+    def de_artefato(cls, artefato: dict) -> "Prefiltro":
+        return cls(artefato["model"], artefato["features"], artefato["cortes"], artefato.get("versao_modelo"))
+
+    def _proba_linha(self, x: np.ndarray) -> float:
+        """Mesma conta do ScorerCompilado (float32, soma na ordem das árvores) para 1 linha."""
+        feature, threshold, esquerda, direita, valor, raizes = self._arvores
+        x = np.asarray(x, dtype=np.float32).tolist()
+        raw = self.scorer.init_raw
+        for no in raizes:
+            while esquerda[no] != no:
+                no = esquerda[no] if x[feature[no]] <= threshold[no] else direita[no]
+            raw += valor[no]
+        p1 = float(expit(raw))
+        return p1 if self.idx_churn == 1 else 1 - p1
+
+    def decidir(self, X: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """(probabilidade de churn do pré-filtro, True onde ela já basta)."""
+        c = self.cortes
+        if self._arvores is not None and X.shape[0] == 1:
+            p = self._proba_linha(X[0])
+            confiante = p < c["baixo_ate"] or c["moderado_de"] <= p < c["moderado_ate"] or p >= c["alto_de"]
+            return np.array([p]), np.array([confiante])
+
+        p = self.scorer.predict_proba(X)[:, self.idx_churn]
+        confiante = (p < c["baixo_ate"]) | ((p >= c["moderado_de"]) & (p < c["moderado_ate"])) | (p >= c["alto_de"])
+        return p, confiante
+
+
+def prever_dois_estagios(X: np.ndarray, prefiltro: Prefiltro,
+                         prever_completo: Callable[[np.ndarray], np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+    """Probabilidade de churn de cada linha e a máscara das que subiram para o modelo completo.
+
+    prever_completo(X) devolve a probabilidade de churn do modelo completo.
+    """
+    probas, confiante = prefiltro.decidir(X)
+    escalar = ~confiante
+    if escalar.any():
+        probas[escalar] = prever_completo(X[escalar])
+    return probas, escalar
+
+
+# ======================================================
+# CLI: TREINO AVULSO E RELATÓRIO NO TEST
+# ======================================================
+
+def _carregar_servido():
+    import registro_modelos
+
+    versao = registro_modelos.versao_ativa()
+    if versao:
+        return registro_modelos.carregar(registro_modelos.caminho_versao(versao))
+    return registro_modelos.carregar(os.path.join(BASE_DIR, "gradient_boosting_model (1).joblib"))
+
+
+def _matriz_excel(caminho: str, features: List[str]):
+    from cache_dados import ler_excel
+
+    df, _ = ler_excel(caminho)
+    X = df.reindex(columns=features, fill_value=0).fillna(0).to_numpy(dtype=np.float64)
+    return X, df["TARGET"].astype(int).to_numpy() if "TARGET" in df.columns else None
+
+
+def _tempo(func, repeticoes: int = 5) -> float:
+    tempos = []
+    for _ in range(repeticoes):
+        t0 = time.perf_counter()
+        func()
+        tempos.append(time.perf_counter() - t0)
+    return float(np.median(tempos))
+
+
+def relatorio(servido, prefiltro: Prefiltro, caminho_test: str = TEST_PATH) -> dict:
+    X, _ = _matriz_excel(caminho_test, servido.features)
+    scorer, idx = servido.scorer, servido.idx_churn
+
+    def prever_completo(X_modelo):
+        return scorer.predict_proba(X_modelo)[:, idx]
+
+    completo = prever_completo(X)
+    dois, escalou = prever_dois_estagios(X, prefiltro, prever_completo)
+    faixa_completo = niveis_risco(percentuais(completo))
+    faixa_dois = niveis_risco(percentuais(dois))
+    diverge = faixa_completo != faixa_dois
+
+    t_completo = _tempo(lambda: prever_completo(X))
+    t_dois = _tempo(lambda: prever_dois_estagios(X, prefiltro, prever_completo))
+
+    linhas = X[:LINHAS_POR_LINHA]
+    t_linha_completo = _tempo(lambda: [prever_completo(x[None, :]) for x in linhas]) / len(linhas)
+    t_linha_dois = _tempo(lambda: [prever_dois_estagios(x[None, :], prefiltro, prever_completo)
+                                   for x in linhas]) / len(linhas)
+
+    por_faixa = {}
+    for nivel in ("BAIXO", "MODERADO", "ALTO"):
+        m = faixa_completo == nivel
+        por_faixa[nivel] = {
+            "linhas": int(m.sum()),
+            "escalonamento": float(escalou[m].mean()) if m.any() else 0.0,
+            "divergencias": int(diverge[m].sum()),
+        }
+
+    return {
+        "linhas": len(X),
+        "escalonamento": float(escalou.mean()),
+        "divergencias": int(diverge.sum()),
+        "taxa_divergencia": float(diverge.mean()),
+        "por_faixa": por_faixa,
+        "lote_ms": {"completo": t_completo * 1e3, "dois_estagios": t_dois * 1e3},
+        "por_linha_us": {"completo": t_linha_completo * 1e6, "dois_estagios": t_linha_dois * 1e6},
+    }
+
+
+def _imprimir_relatorio(r: dict, cortes: Dict[str, float]):
+    print(f"\n📊 DOIS ESTÁGIOS NO TEST ({r['linhas']} linhas)")
+    print("   Cortes do pré-filtro: " + ", ".join(f"{k}={v:.3f}" for k, v in cortes.items()))
+    print(f"   Escalonamento para o modelo completo: {r['escalonamento']:.1%}")
+    print(f"   Faixa de risco diferente do modelo completo: {r['divergencias']} ({r['taxa_divergencia']:.2%})")
+    for nivel, f in r["por_faixa"].items():
+        print(f"      {nivel:<9} {f['linhas']:>6} linhas   escalonadas {f['escalonamento']:>6.1%}   "
+              f"divergências {f['divergencias']}")
+
+    lote, linha = r["lote_ms"], r["por_linha_us"]
+    print(f"\n   Lote:      completo {lote['completo']:8.2f} ms   dois estágios {lote['dois_estagios']:8.2f} ms   "
+          f"ganho {lote['completo'] / lote['dois_estagios']:.2f}x")
+    print(f"   Por linha: completo {linha['completo']:8.1f} µs   dois estágios {linha['dois_estagios']:8.1f} µs   "
+          f"ganho {linha['completo'] / linha['dois_estagios']:.2f}x")
+
+
+def main():
+    import joblib
+    import registro_modelos
+
+    parser = argparse.ArgumentParser(description="Pré-filtro + modelo completo")
+    parser.add_argument("comando", choices=["treinar", "relatorio"])
+    parser.add_argument("--tolerancia", type=float, default=TOLERANCIA_DESACORDO)
+    parser.add_argument("--test", default=TEST_PATH)
+    args = parser.parse_args()
+
+    servido = _carregar_servido()
+    if args.comando == "treinar":
+        X_train, y_train = _matriz_excel(TRAIN_PATH, servido.features)
+        artefato = treinar(X_train, y_train, servido.scorer, servido.features, args.tolerancia)
+        destino = salvar_prefiltro(artefato, servido.versao)
+        print(f"💾 Pré-filtro do modelo {servido.versao} salvo em {destino}")
+        prefiltro = Prefiltro.de_artefato(dict(artefato, versao_modelo=servido.versao))
+    else:
+        caminho = registro_modelos.caminho_prefiltro(servido.versao)
+        if not os.path.exists(caminho):
+            raise SystemExit(f"Sem pré-filtro para o modelo {servido.versao}: python dois_estagios.py treinar")
+        prefiltro = Prefiltro.de_artefato(joblib.load(caminho))
+
+    _imprimir_relatorio(relatorio(servido, prefiltro, args.test), prefiltro.cortes)
+
+
+if __name__ == "__main__":
+    main()
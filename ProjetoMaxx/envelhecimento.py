@@ -0,0 +1,103 @@
+"""
+ENVELHECIMENTO TEMPORAL DA BASE (DAYS_SINCE_LAST / QTD_SOL_LAST_30D)
+
+A base_clientes.csv é uma foto de 31/10/2025. Em vez de corrigir um
+cliente por requisição (/atualizar_temporal), o job abaixo leva a base
+INTEIRA até uma data de referência numa passada vetorizada:
+
+- DAYS_SINCE_LAST += dias entre a referência da linha e a nova data
+- QTD_SOL_LAST_30D = 0 quando DAYS_SINCE_LAST passa de 30 dias
+
+A data até onde cada linha já foi envelhecida fica na própria base, na
+coluna DATA_REFERENCIA (AAAAMMDD; vazia = 31/10/2025). Rodar de novo para
+a mesma data não muda nada, e o /cliente já devolve as features em dia.
+
+Uso (na pasta ProjetoMaxx; a API em execução recarrega a base sozinha):
+    python envelhecimento.py [--data AAAA-MM-DD] [--base base_clientes.csv]
+"""
+
+import argparse
+import os
+import time
+from datetime import date, datetime
+from typing import Optional, Tuple
+
+import numpy as np
+
+DATA_BASE_CSV = date(2025, 10, 31)
+COLUNA_DATA_REFERENCIA = "DATA_REFERENCIA"
+COLUNA_DIAS = "DAYS_SINCE_LAST"
+COLUNA_SOL_30D = "QTD_SOL_LAST_30D"
+JANELA_SOLICITACOES_DIAS = 30
+
+
+def data_para_numero(d: date) -> int:
+    return d.year * 10000 + d.month * 100 + d.day
+
+
+def numero_para_data(v) -> Optional[date]:
+    """AAAAMMDD -> date; vazio/inválido -> None."""
+    try:
+        v = int(v)
+        return date(v // 10000, v // 100 % 100, v % 100)
+    except (ValueError, TypeError, OverflowError):
+        return None
+
+
+def referencias_efetivas(referencias: np.ndarray) -> np.ndarray:
+    """Referência de cada linha como AAAAMMDD; vazia/inválida conta como DATA_BASE_CSV."""
+    ref = np.asarray(referencias, dtype=np.float64)
+    unicos, inverso = np.unique(ref, return_inverse=True)
+    padrao = data_para_numero(DATA_BASE_CSV)
+    validos = np.array([
+        padrao if numero_para_data(v) is None else int(v) for v in unicos.tolist()
+    ], dtype=np.float64)
+    return validos[inverso].reshape(ref.shape)
+
+
+def dias_decorridos(referencias: np.ndarray, data_alvo: date) -> np.ndarray:
+    """Dias entre a referência de cada linha e data_alvo (nunca negativo)."""
+    ref = referencias_efetivas(referencias)
+    unicos, inverso = np.unique(ref, return_inverse=True)
+    alvo = data_alvo.toordinal()
+    deltas = np.array([alvo - numero_para_data(v).toordinal() for v in unicos.tolist()], dtype=np.float64)
+    return np.maximum(deltas, 0.0)[inverso].reshape(ref.shape)
+
+
+def envelhecer(dias: np.ndarray, sol_30d: np.ndarray, referencias: np.ndarray,
+               data_alvo: date) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(DAYS_SINCE_LAST, QTD_SOL_LAST_30D, DATA_REFERENCIA) levados até data_alvo.
+
+    Mesma regra que o /atualizar_temporal aplicava cliente a cliente; DAYS_SINCE_LAST
+    vazio conta como 0 (como o /cliente devolve). A referência nunca volta no tempo.
+    """
+    dias = np.where(np.isnan(dias), 0.0, dias)
+    novos_dias = dias + dias_decorridos(referencias, data_alvo)
+    novos_sol = np.where(novos_dias > JANELA_SOLICITACOES_DIAS, 0.0, sol_30d)
+    novas_ref = np.maximum(referencias_efetivas(referencias), data_para_numero(data_alvo))
+    return novos_dias, novos_sol, novas_ref
+
+
+# ======================================================
+# JOB
+# ======================================================
+
+def main():
+    from base_clientes import BaseClientes
+
+    parser = argparse.ArgumentParser(description="Envelhece a base de clientes inteira até uma data")
+    parser.add_argument("--data", help="Data de referência AAAA-MM-DD (padrão: hoje)")
+    parser.add_argument("--base", default=os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                       "base_clientes.csv"))
+    args = parser.parse_args()
+
+    data_alvo = datetime.strptime(args.data, "%Y-%m-%d").date() if args.data else date.today()
+
+    t0 = time.perf_counter()
+    linhas = BaseClientes(args.base).envelhecer(data_alvo)
+    print(f"\n✅ {linhas:,} clientes envelhecidos até {data_alvo:%d/%m/%Y} "
+          f"em {time.perf_counter() - t0:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+EXPLICAÇÃO DAS PREDIÇÕES (CONTRIBUIÇÃO DE CADA FEATURE)
+
+Decomposição exata da saída do Gradient Boosting pelo caminho de cada
+linha nas árvores (o método do "treeinterpreter"/Saabas):
+
+- cada nó tem um valor esperado: a média dos valores das folhas abaixo
+  dele, ponderada pelas amostras de treino de cada folha
+- ao descer de um nó para o filho, a diferença entre os dois valores
+  esperados vai para a feature usada na divisão
+- base + soma das contribuições = decision_function (log-odds), exata
+
+O custo é o da própria predição: `profundidade` passos por árvore. Os
+valores esperados são calculados uma vez, na carga do modelo. Unidade:
+log-odds (positivo = aumenta o risco de churn).
+
+Latência por linha contra o predict_proba:
+    python benchmarks/bench_scorer.py
+"""
+
+from typing import List
+
+import numpy as np
+
+from scorer_compilado import ScorerCompilado
+
+# Casas decimais nas respostas da API
+CASAS = 6
+
+
+def valores_esperados(esquerda: np.ndarray, direita: np.ndarray, valor: np.ndarray,
+                      peso: np.ndarray, profundidade: int) -> np.ndarray:
+    """Valor esperado de cada nó (folhas: o próprio valor), das folhas para a raiz."""
+    internos = np.flatnonzero(esquerda != np.arange(len(esquerda)))
+    esq, dir_ = esquerda[internos], direita[internos]
+    peso_total = peso[esq] + peso[dir_]
+
+    esperado = valor.copy()
+    # Cada passada sobe um nível; `profundidade` passadas cobrem a árvore mais funda
+    for _ in range(profundidade):
+        esperado[internos] = (peso[esq] * esperado[esq] + peso[dir_] * esperado[dir_]) / peso_total
+    return esperado
+
+
+class ExplicadorArvores:
+    """Contribuições por feature a partir das arrays do scorer compilado."""
+
+    def __init__(self, scorer: ScorerCompilado):
+        if scorer.peso is None or scorer.init_raw is None:
+            raise ValueError("Explicação exige o peso dos nós e init constante (GradientBoostingClassifier)")
+        self.scorer = scorer
+        self.features: List[str] = list(scorer._features)
+
+        esperado = valores_esperados(scorer.esquerda, scorer.direita, scorer.valor,
+                                     scorer.peso, scorer.profundidade)
+        # Já multiplicado pelo learning_rate, como o _valor_escalado do scorer
+        self._esperado = scorer.learning_rate * esperado
+        self.base = float(scorer.init_raw + self._esperado[scorer.raizes].sum())
+
+    def contribuicoes(self, X) -> np.ndarray:
+        """Matriz (n_linhas, n_features) em log-odds; cada linha soma decision_function - base."""
+        s = self.scorer
+        X32 = s._matriz(X)
+        n, n_features = X32.shape
+        nos = np.broadcast_to(s.raizes, (n, len(s.raizes))).copy()
+        linhas = np.arange(n)[:, None]
+        # Índice plano (linha, feature) para somar com um bincount por nível
+        deslocamento = linhas * n_features
+
+        total = np.zeros(n * n_features, dtype=np.float64)
+        for _ in range(s.profundidade):
+            feature = s.feature[nos]
+            vai_esquerda = X32[linhas, feature] <= s.threshold[nos]
+            proximos = np.where(vai_esquerda, s.esquerda[nos], s.direita[nos])
+            # Folhas apontam para si mesmas: diferença zero, não somam nada
+            delta = self._esperado[proximos] - self._esperado[nos]
+            total += np.bincount((deslocamento + feature).ravel(), delta.ravel(), minlength=n * n_features)
+            nos = proximos
+
+        return total.reshape(n, n_features)
+
+    def explicar(self, X) -> List[dict]:
+        """Um dict por linha para as respostas da API (features por |contribuição|)."""
+        X = np.asarray(X, dtype=np.float64)
+        contribuicoes = self.contribuicoes(X)
+        saida = []
+        for x, c in zip(X, contribuicoes):
+            ordem = np.argsort(-np.abs(c), kind="stable")
+            saida.append({
+                "unidade": "log-odds",
+                "base": round(self.base, CASAS),
+                "contribuicoes": [
+                    {"feature": self.features[j], "valor": float(x[j]), "contribuicao": round(float(c[j]), CASAS)}
+                    for j in ordem
+                ],
+            })
+        return saida
@@ -72,7 +72,9 @@ salvarNoHistoricoReal: async function(event) {
             "QTD_ADMINISTRATIVO_mean": document.getElementById('QTD_ADMINISTRATIVO_mean').value || 0,
             "TAXA_CONTATO_DIA": document.getElementById('TAXA_CONTATO_DIA').value || 0,
             "RISCO_PREDITO": resultado,
-            "DATA_HORA": new Date().toISOString()
+            "DATA_HORA": new Date().toISOString(),
+            // Até onde DAYS_SINCE_LAST / QTD_SOL_LAST_30D do formulário estão envelhecidos
+            "DATA_REFERENCIA": this.referenciaClienteId === idCliente.trim() ? this.dataReferenciaAtual : null
         };
         
         console.log("Dados para salvar:", dadosParaSalvar);
@@ -527,6 +529,9 @@ salvarNoHistoricoReal: async function(event) {
 
         this.showNotification("Buscando cliente no base_clientes.csv...", "info");
         const dados = await this.buscarClientePorId(id);
+        this.dataReferenciaAtual = dados.DATA_REFERENCIA;
+        this.referenciaClienteId = id;
+        this.mostrarDataReferencia(dados.DATA_REFERENCIA);
         
         // VERIFICAÇÃO: Se DAYS_SINCE_LAST >= 365, ZERA TODOS OS CAMPOS
         const daysSinceLast = dados.DAYS_SINCE_LAST || 0;
@@ -555,6 +560,18 @@ salvarNoHistoricoReal: async function(event) {
     }
 },
 
+    // DATA_REFERENCIA (AAAA-MM-DD) = até quando DAYS_SINCE_LAST / QTD_SOL_LAST_30D estão em dia
+    formatarDataReferencia: function(dataIso) {
+        if (!dataIso) return "31/10/2025";
+        const [ano, mes, dia] = String(dataIso).split("-");
+        return `${dia}/${mes}/${ano}`;
+    },
+
+    mostrarDataReferencia: function(dataIso) {
+        const el = document.getElementById("dataReferenciaBase");
+        if (el) el.textContent = `Base atualizada até ${this.formatarDataReferencia(dataIso)}`;
+    },
+
     atualizarDadosParaHoje: async function() {
         const idCliente = document.getElementById('ID_CLIENTE').value;
         if (!idCliente) {
@@ -583,8 +600,12 @@ salvarNoHistoricoReal: async function(event) {
             }
 
             // Removendo qualquer lógica que mexa nos outros 8 campos
+
+            // Os dois campos agora estão em dia: é essa data que vai no salvar
+            this.dataReferenciaAtual = dados.DATA_REFERENCIA_NOVA;
+            this.referenciaClienteId = idCliente.trim();
             
-            this.showNotification(`Dados atualizados partindo de 31/10/2025`, "success");
+            this.showNotification(`Dados atualizados partindo de ${this.formatarDataReferencia(dados.DATA_REFERENCIA)}`, "success");
 
             setTimeout(() => {
                 if(campoDias) campoDias.classList.remove('updated-highlight');
@@ -756,10 +777,10 @@ const Dashboard = {
 
     ensureLibs: async function() {
         if (typeof XLSX === "undefined") {
-            await this.loadExternalScript("https://cdn.jsdelivr.net/npm/xlsx@0.18.5/dist/xlsx.full.min.js");
+            await this.loadExternalScript("vendor/xlsx.full.min.js");
         }
         if (typeof Chart === "undefined") {
-            await this.loadExternalScript("https://cdn.jsdelivr.net/npm/chart.js@4.4.1/dist/chart.umd.min.js");
+            await this.loadExternalScript("vendor/chart.umd.min.js");
         }
     },
 
@@ -0,0 +1,63 @@
+"""
+MODO PRODUÇÃO DA API (gunicorn, Linux/macOS)
+
+Uso (na pasta ProjetoMaxx):
+    gunicorn -c gunicorn.conf.py api:app
+
+- preload_app: o api.py (modelo, scorer compilado, base de clientes e
+  tabela de scores) é carregado UMA vez no processo mestre, antes do fork;
+  os workers herdam essas páginas de memória compartilhadas (copy-on-write).
+- gthread: cada worker atende várias conexões com threads e mantém
+  conexões keep-alive abertas (o worker "sync" fecha a conexão a cada request).
+- Encerramento gracioso: no SIGTERM os workers terminam as requisições em
+  andamento (até graceful_timeout) e compactam o log da base antes de sair.
+
+Configuração por variável de ambiente:
+    WEB_CONCURRENCY   nº de processos worker        (padrão: 2 x núcleos + 1)
+    API_THREADS       threads por worker            (padrão: 4)
+    API_BIND          endereço                      (padrão: 0.0.0.0:5000)
+    API_KEEPALIVE     segundos de keep-alive        (padrão: 5)
+    API_TIMEOUT       timeout de request travado    (padrão: 30)
+"""
+
+import gc
+import multiprocessing
+import os
+import sys
+
+bind = os.environ.get("API_BIND", "0.0.0.0:5000")
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1))
+worker_class = "gthread"
+threads = int(os.environ.get("API_THREADS", 4))
+
+preload_app = True
+
+keepalive = int(os.environ.get("API_KEEPALIVE", 5))
+timeout = int(os.environ.get("API_TIMEOUT", 30))
+graceful_timeout = 30
+
+# Recicla workers de tempos em tempos (com jitter para não reciclar todos juntos)
+max_requests = 10000
+max_requests_jitter = 1000
+
+accesslog = "-"
+errorlog = "-"
+
+
+def when_ready(server):
+    # Tudo que o preload carregou vai para a geração "permanente" do GC:
+    # o coletor não toca mais nesses objetos, e as páginas continuam compartilhadas
+    gc.freeze()
+    server.log.info("API pronta: modelo e base carregados antes do fork")
+
+
+def worker_exit(server, worker):
+    # Incorpora ao CSV as alterações que este worker anexou no log
+    # (só com o api.py: o api_inferencia.py não abre a base)
+    api = sys.modules.get("api")
+    if api is None:
+        return
+    try:
+        api.clientes.compactar()
+    except Exception as e:
+        server.log.warning(f"Falha ao compactar a base na saída do worker: {e}")
@@ -0,0 +1,331 @@
+"""
+HISTÓRICO DE ANÁLISES (SQLite)
+
+Um único lugar para o histórico salvo pelo /salvar_historico e listado
+pelo /historico, com esquema fixo (ID, data/hora, as 10 features da tela,
+resultado) em historico.db:
+
+- índices por (ID_CLIENTE, data), (data) e (nível de risco, data)
+- paginação por cursor (keyset em data_hora + id): a página N custa o
+  mesmo que a primeira, sem OFFSET
+- filtros por cliente, intervalo de datas e nível de risco
+- contagens (total e por nível) mantidas por trigger a cada inserção,
+  então o /estatisticas lê um número em vez de varrer o arquivo
+
+Os CSVs antigos (historico_analises.csv e historico.csv) são importados
+uma vez, na primeira abertura; chaves fora do esquema vão para dados_extra.
+
+Uso (na pasta ProjetoMaxx):
+    python historico.py exportar historico_exportado.csv
+"""
+
+import base64
+import csv
+import json
+import os
+import sqlite3
+import sys
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, Optional
+
+from pipeline_features import classificar_risco, normalizar_id
+
+COLUNA_ID = "ID_CLIENTE"
+COLUNA_DATA = "DATA_HORA"
+COLUNA_RISCO = "RISCO_PREDITO"
+# Desfecho real do cliente (0/1), quando o payload traz; vai para dados_extra
+COLUNA_ROTULO = "TARGET"
+
+# As 10 features que a tela envia (mesma ordem do historico_analises.csv)
+COLUNAS_FEATURES = [
+    "QTD_SOL_LAST_30D", "DAYS_SINCE_LAST", "N_UNIQUE_DATES", "QTD_REGISTROS_CLIENTE",
+    "JA_TENTOU_CANCELAR_max", "QTD_FINANCEIRO_mean", "QTD_SUPORTE_TECNICO_mean",
+    "QTD_OUTROS_mean", "QTD_ADMINISTRATIVO_mean", "TAXA_CONTATO_DIA",
+]
+NIVEIS = ("ALTO", "MODERADO", "BAIXO")
+
+LIMITE_PADRAO = 50
+LIMITE_MAXIMO = 500
+
+_ESQUEMA = f"""
+CREATE TABLE IF NOT EXISTS analises (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    id_cliente TEXT NOT NULL,
+    data_hora TEXT NOT NULL,
+    {", ".join(f'"{f}" REAL' for f in COLUNAS_FEATURES)},
+    risco_predito TEXT,
+    percentual_churn REAL,
+    nivel_risco TEXT,
+    dados_extra TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_analises_cliente ON analises (id_cliente, data_hora, id);
+CREATE INDEX IF NOT EXISTS idx_analises_data ON analises (data_hora, id);
+CREATE INDEX IF NOT EXISTS idx_analises_nivel ON analises (nivel_risco, data_hora, id);
+
+CREATE TABLE IF NOT EXISTS contagens (chave TEXT PRIMARY KEY, total INTEGER NOT NULL);
+INSERT OR IGNORE INTO contagens VALUES ('total', 0);
+
+CREATE TRIGGER IF NOT EXISTS conta_insercao AFTER INSERT ON analises BEGIN
+    UPDATE contagens SET total = total + 1 WHERE chave = 'total';
+    INSERT INTO contagens VALUES ('nivel:' || COALESCE(NEW.nivel_risco, '-'), 1)
+        ON CONFLICT (chave) DO UPDATE SET total = total + 1;
+END;
+CREATE TRIGGER IF NOT EXISTS conta_remocao AFTER DELETE ON analises BEGIN
+    UPDATE contagens SET total = total - 1 WHERE chave = 'total';
+    UPDATE contagens SET total = total - 1 WHERE chave = 'nivel:' || COALESCE(OLD.nivel_risco, '-');
+END;
+
+CREATE TABLE IF NOT EXISTS importados (arquivo TEXT PRIMARY KEY, linhas INTEGER NOT NULL);
+"""
+
+
+def _agora_iso() -> str:
+    return _formatar_data(datetime.now(timezone.utc))
+
+
+def _formatar_data(d: datetime) -> str:
+    """UTC com milissegundos e 'Z', como o toISOString() do front."""
+    return d.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.") + f"{d.microsecond // 1000:03d}Z"
+
+
+def _ler_data(valor) -> datetime:
+    d = datetime.fromisoformat(str(valor).strip().replace("Z", "+00:00"))
+    return d if d.tzinfo is not None else d.replace(tzinfo=timezone.utc)
+
+
+def normalizar_data(valor) -> str:
+    """Data/hora da análise em UTC ISO (ordenável como texto); inválida/ausente -> agora."""
+    try:
+        return _formatar_data(_ler_data(valor))
+    except ValueError:
+        return _agora_iso()
+
+
+def _para_float(v) -> Optional[float]:
+    try:
+        return float(str(v).strip().replace(",", "."))
+    except (ValueError, TypeError):
+        return None
+
+
+def _limite_data(valor: str, fim: bool) -> str:
+    """'AAAA-MM-DD' vira o começo do dia (ou o começo do dia seguinte, para 'ate')."""
+    valor = str(valor).strip()
+    try:
+        if len(valor) == 10:
+            d = datetime.strptime(valor, "%Y-%m-%d")
+            if fim:
+                d += timedelta(days=1)
+            return d.strftime("%Y-%m-%dT00:00:00.000Z")
+        return _formatar_data(_ler_data(valor))
+    except ValueError:
+        raise ValueError(f"data inválida: {valor!r} (use AAAA-MM-DD ou ISO 8601)")
+
+
+def _codificar_cursor(data_hora: str, id_linha: int) -> str:
+    return base64.urlsafe_b64encode(json.dumps([data_hora, id_linha]).encode()).decode()
+
+
+def _decodificar_cursor(cursor: str):
+    try:
+        data_hora, id_linha = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return str(data_hora), int(id_linha)
+    except (ValueError, TypeError):
+        raise ValueError("cursor inválido")
+
+
+class HistoricoAnalises:
+
+    def __init__(self, caminho: str, importar_de: Iterable[str] = ()):
+        self.caminho = caminho
+        self._local = threading.local()
+
+        with self._conexao() as con:
+            con.executescript(_ESQUEMA)
+        for arquivo in importar_de:
+            self.importar_csv(arquivo)
+
+    def _conexao(self) -> sqlite3.Connection:
+        """Uma conexão por thread (WAL: leituras não esperam a escrita de outro worker)."""
+        con = getattr(self._local, "con", None)
+        if con is None:
+            con = sqlite3.connect(self.caminho, timeout=30)
+            con.row_factory = sqlite3.Row
+            con.execute("PRAGMA journal_mode=WAL")
+            con.execute("PRAGMA synchronous=NORMAL")
+            self._local.con = con
+        return con
+
+    # --------------------------------------------------
+    # ESCRITA
+    # --------------------------------------------------
+    @staticmethod
+    def _linha(dados: Dict) -> tuple:
+        risco = dados.get(COLUNA_RISCO)
+        percentual = _para_float(str(risco).replace("%", "")) if risco not in (None, "") else None
+        extra = {k: v for k, v in dados.items()
+                 if k not in COLUNAS_FEATURES and k not in (COLUNA_ID, COLUNA_DATA, COLUNA_RISCO)}
+        return (
+            normalizar_id(dados.get(COLUNA_ID)),
+            normalizar_data(dados.get(COLUNA_DATA)),
+            *[_para_float(dados.get(f)) for f in COLUNAS_FEATURES],
+            None if risco is None else str(risco),
+            percentual,
+            None if percentual is None else classificar_risco(percentual),
+            json.dumps(extra, ensure_ascii=False) if extra else None,
+        )
+
+    _INSERT = (
+        "INSERT INTO analises (id_cliente, data_hora, "
+        + ", ".join(f'"{f}"' for f in COLUNAS_FEATURES)
+        + ", risco_predito, percentual_churn, nivel_risco, dados_extra) VALUES ("
+        + ", ".join("?" * (len(COLUNAS_FEATURES) + 6)) + ")"
+    )
+
+    def registrar(self, dados: Dict) -> int:
+        """Grava uma análise (payload do /salvar_historico); retorna o id da linha."""
+        with self._conexao() as con:
+            return con.execute(self._INSERT, self._linha(dados)).lastrowid
+
+    def importar_csv(self, arquivo: str) -> int:
+        """Importa um CSV antigo de histórico (uma vez por arquivo)."""
+        if not os.path.exists(arquivo):
+            return 0
+        nome = os.path.basename(arquivo)
+        con = self._conexao()
+
+        # IMMEDIATE: com vários workers subindo juntos, só um importa
+        con.execute("BEGIN IMMEDIATE")
+        try:
+            if con.execute("SELECT 1 FROM importados WHERE arquivo = ?", (nome,)).fetchone():
+                con.rollback()
+                return 0
+
+            with open(arquivo, encoding="utf-8-sig", newline="") as f:
+                amostra = f.readline()
+                f.seek(0)
+                delimitador = ";" if amostra.count(";") > amostra.count(",") else ","
+                linhas = [self._linha(r) for r in csv.DictReader(f, delimiter=delimitador)
+                          if r.get(COLUNA_ID) not in (None, "")]
+
+            con.executemany(self._INSERT, linhas)
+            con.execute("INSERT INTO importados VALUES (?, ?)", (nome, len(linhas)))
+            con.commit()
+        except BaseException:
+            con.rollback()
+            raise
+        print(f"Histórico: {len(linhas)} registros importados de {nome}")
+        return len(linhas)
+
+    # --------------------------------------------------
+    # CONSULTAS
+    # --------------------------------------------------
+    @staticmethod
+    def _para_dict(r: sqlite3.Row) -> Dict:
+        item = {COLUNA_ID: r["id_cliente"]}
+        for f in COLUNAS_FEATURES:
+            item[f] = r[f]
+        item[COLUNA_RISCO] = r["risco_predito"]
+        item[COLUNA_DATA] = r["data_hora"]
+        item["percentual_churn"] = r["percentual_churn"]
+        item["nivel_risco"] = r["nivel_risco"]
+        if r["dados_extra"]:
+            item.update(json.loads(r["dados_extra"]))
+        return item
+
+    def listar(self, id_cliente: Optional[str] = None, desde: Optional[str] = None,
+               ate: Optional[str] = None, nivel: Optional[str] = None,
+               limite: Optional[int] = LIMITE_PADRAO, cursor: Optional[str] = None) -> Dict:
+        """Página do histórico, mais recente primeiro.
+
+        Retorna {"historico": [...], "proximo_cursor": str|None}; passe o
+        proximo_cursor de volta para a página seguinte (mesmos filtros).
+        limite=None devolve tudo (a partir do cursor, se houver) numa página só.
+        """
+        if limite is not None:
+            limite = max(1, min(int(limite), LIMITE_MAXIMO))
+        condicoes, params = [], []
+
+        if id_cliente:
+            condicoes.append("id_cliente = ?")
+            params.append(normalizar_id(id_cliente))
+        if nivel:
+            nivel = str(nivel).strip().upper()
+            if nivel not in NIVEIS:
+                raise ValueError(f"nivel deve ser um de {', '.join(NIVEIS)}")
+            condicoes.append("nivel_risco = ?")
+            params.append(nivel)
+        if desde:
+            condicoes.append("data_hora >= ?")
+            params.append(_limite_data(desde, fim=False))
+        if ate:
+            condicoes.append("data_hora < ?" if len(str(ate).strip()) == 10 else "data_hora <= ?")
+            params.append(_limite_data(ate, fim=True))
+        if cursor:
+            data_cursor, id_cursor = _decodificar_cursor(cursor)
+            condicoes.append("(data_hora, id) < (?, ?)")
+            params += [data_cursor, id_cursor]
+
+        sql = "SELECT * FROM analises"
+        if condicoes:
+            sql += " WHERE " + " AND ".join(condicoes)
+        sql += " ORDER BY data_hora DESC, id DESC"
+        if limite is not None:
+            sql += " LIMIT ?"
+            params.append(limite + 1)
+
+        linhas = self._conexao().execute(sql, params).fetchall()
+        proximo = None
+        if limite is not None and len(linhas) > limite:
+            linhas = linhas[:limite]
+            proximo = _codificar_cursor(linhas[-1]["data_hora"], linhas[-1]["id"])
+
+        return {"historico": [self._para_dict(r) for r in linhas], "proximo_cursor": proximo}
+
+    def rotulados_desde(self, ultimo_id: int) -> Dict:
+        """Análises com TARGET e id > ultimo_id, em ordem de data (treino incremental).
+
+        Retorna {"linhas": [...], "maior_id": maior id lido (com ou sem TARGET)}.
+        """
+        con = self._conexao()
+        maior_id = con.execute("SELECT COALESCE(MAX(id), 0) FROM analises").fetchone()[0]
+        linhas = con.execute(
+            "SELECT * FROM analises WHERE id > ? AND id <= ? "
+            "AND json_extract(dados_extra, ?) IS NOT NULL ORDER BY data_hora, id",
+            (int(ultimo_id), maior_id, f"$.{COLUNA_ROTULO}"),
+        ).fetchall()
+        return {
+            "linhas": [dict(self._para_dict(r), id=r["id"]) for r in linhas],
+            "maior_id": max(int(ultimo_id), maior_id),
+        }
+
+    def contagens(self) -> Dict[str, int]:
+        """{"total": n, "ALTO": n, "MODERADO": n, "BAIXO": n} (mantidas por trigger)."""
+        linhas = self._conexao().execute("SELECT chave, total FROM contagens").fetchall()
+        valores = {r["chave"]: r["total"] for r in linhas}
+        resultado = {"total": valores.get("total", 0)}
+        for nivel in NIVEIS:
+            resultado[nivel] = valores.get(f"nivel:{nivel}", 0)
+        return resultado
+
+    def exportar_csv(self, destino: str) -> int:
+        colunas = [COLUNA_ID] + COLUNAS_FEATURES + [COLUNA_RISCO, COLUNA_DATA]
+        n = 0
+        with open(destino, "w", encoding="utf-8", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=colunas, extrasaction="ignore")
+            writer.writeheader()
+            for r in self._conexao().execute("SELECT * FROM analises ORDER BY data_hora, id"):
+                item = self._para_dict(r)
+                writer.writerow({k: int(v) if isinstance(v, float) and v.is_integer() else v
+                                 for k, v in item.items()})
+                n += 1
+        return n
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3 or sys.argv[1] != "exportar":
+        sys.exit("Uso: python historico.py exportar <arquivo.csv>")
+    pasta = os.path.dirname(os.path.abspath(__file__))
+    historico = HistoricoAnalises(os.path.join(pasta, "historico.db"))
+    print(f"{historico.exportar_csv(sys.argv[2])} registros exportados para {sys.argv[2]}")
@@ -0,0 +1,220 @@
+"""
+MÉTRICAS E PROFILING DA API
+
+- Contadores e histogramas de latência em memória, exportados no formato
+  texto do Prometheus pelo /metrics.
+- cronometrar(): mede cada etapa dos handlers (JSON, features, regras,
+  modelo, busca na base...).
+- AmostradorPerfil: profiler por amostragem, ligado só para UMA requisição
+  (header X-Profile: 1). Uma thread lê a pilha da thread da requisição a
+  cada ~1 ms e conta em quais funções o tempo está indo.
+
+As métricas são por processo: com vários workers (gunicorn) cada scrape do
+/metrics mostra o worker que atendeu.
+"""
+
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, Optional, Tuple
+
+# Em segundos (as rotas ficam entre ~0.5 ms e dezenas de ms)
+BUCKETS_PADRAO = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+AJUDA = {
+    "http_requisicao_duracao_segundos": "Latência total da requisição por rota",
+    "churn_etapa_duracao_segundos": "Latência de cada etapa dos handlers de predição e busca",
+    "churn_predicoes_total": "Predições por resultado (modelo ou regra de negócio que evitou o modelo)",
+    "http_requisicoes_total": "Requisições atendidas por rota e status",
+}
+
+
+class Histograma:
+
+    def __init__(self, buckets=BUCKETS_PADRAO):
+        self.buckets = tuple(buckets)
+        self.contagens = [0] * (len(self.buckets) + 1)  # último = +Inf
+        self.soma = 0.0
+        self.total = 0
+
+    def observar(self, valor: float):
+        self.contagens[bisect_left(self.buckets, valor)] += 1
+        self.soma += valor
+        self.total += 1
+
+
+def _formatar_labels(labels: Tuple[Tuple[str, str], ...], extra: str = "") -> str:
+    partes = [f'{k}="{str(v)}"' for k, v in labels]
+    if extra:
+        partes.append(extra)
+    return "{" + ",".join(partes) + "}" if partes else ""
+
+
+class RegistroMetricas:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._contadores: Dict[Tuple[str, tuple], float] = {}
+        self._histogramas: Dict[Tuple[str, tuple], Histograma] = {}
+
+    def contar(self, nome: str, valor: float = 1, **labels):
+        chave = (nome, tuple(sorted(labels.items())))
+        with self._lock:
+            self._contadores[chave] = self._contadores.get(chave, 0) + valor
+
+    def observar(self, nome: str, segundos: float, **labels):
+        chave = (nome, tuple(sorted(labels.items())))
+        with self._lock:
+            hist = self._histogramas.get(chave)
+            if hist is None:
+                hist = self._histogramas[chave] = Histograma()
+            hist.observar(segundos)
+
+    @contextmanager
+    def cronometrar(self, nome: str, **labels):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observar(nome, time.perf_counter() - t0, **labels)
+
+    def etapa(self, rota: str, etapa: str):
+        """Atalho para cronometrar uma etapa de um handler."""
+        return self.cronometrar("churn_etapa_duracao_segundos", rota=rota, etapa=etapa)
+
+    def exportar(self) -> str:
+        """Formato texto de exposição do Prometheus (0.0.4)."""
+        with self._lock:
+            contadores = dict(self._contadores)
+            histogramas = {k: (h.buckets, list(h.contagens), h.soma, h.total) for k, h in self._histogramas.items()}
+
+        linhas = []
+        vistos = set()
+
+        def cabecalho(nome, tipo):
+            if nome not in vistos:
+                vistos.add(nome)
+                if nome in AJUDA:
+                    linhas.append(f"# HELP {nome} {AJUDA[nome]}")
+                linhas.append(f"# TYPE {nome} {tipo}")
+
+        for (nome, labels), valor in sorted(contadores.items()):
+            cabecalho(nome, "counter")
+            linhas.append(f"{nome}{_formatar_labels(labels)} {valor:g}")
+
+        for (nome, labels), (buckets, contagens, soma, total) in sorted(histogramas.items()):
+            cabecalho(nome, "histogram")
+            acumulado = 0
+            for limite, n in zip(buckets, contagens):
+                acumulado += n
+                le = 'le="%g"' % limite
+                linhas.append(f"{nome}_bucket{_formatar_labels(labels, le)} {acumulado}")
+            le = 'le="+Inf"'
+            linhas.append(f"{nome}_bucket{_formatar_labels(labels, le)} {total}")
+            linhas.append(f"{nome}_sum{_formatar_labels(labels)} {soma:.9g}")
+            linhas.append(f"{nome}_count{_formatar_labels(labels)} {total}")
+
+        return "\n".join(linhas) + "\n"
+
+
+# Registro único do processo
+metricas = RegistroMetricas()
+
+
+# ======================================================
+# PROFILER POR AMOSTRAGEM (UMA REQUISIÇÃO)
+# ======================================================
+
+# O intervalo de troca de threads é do processo inteiro: com perfis
+# simultâneos, só o último a parar devolve o valor original
+_switch_lock = threading.Lock()
+_switch_perfis_ativos = 0
+_switch_original: Optional[float] = None
+
+
+def _reduzir_switch(intervalo_s: float):
+    global _switch_perfis_ativos, _switch_original
+    with _switch_lock:
+        if _switch_perfis_ativos == 0:
+            _switch_original = sys.getswitchinterval()
+        _switch_perfis_ativos += 1
+        sys.setswitchinterval(min(sys.getswitchinterval(), intervalo_s))
+
+
+def _restaurar_switch():
+    global _switch_perfis_ativos
+    with _switch_lock:
+        _switch_perfis_ativos -= 1
+        if _switch_perfis_ativos == 0:
+            sys.setswitchinterval(_switch_original)
+
+
+class AmostradorPerfil:
+    """Amostra a pilha de UMA thread em intervalos fixos até stop()."""
+
+    def __init__(self, thread_id: int, intervalo_s: float = 0.001):
+        self.thread_id = thread_id
+        self.intervalo_s = intervalo_s
+        self._parar = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._switch_reduzido = False
+
+        self.amostras = 0
+        self.proprio = Counter()     # função no topo da pilha
+        self.inclusivo = Counter()   # função em qualquer ponto da pilha
+        self.pilhas = Counter()      # pilha completa "a;b;c"
+
+    @staticmethod
+    def _nome(frame) -> str:
+        codigo = frame.f_code
+        arquivo = codigo.co_filename.replace("\\", "/").rsplit("/", 1)[-1]
+        return f"{codigo.co_name} ({arquivo}:{codigo.co_firstlineno})"
+
+    def _laco(self):
+        while not self._parar.is_set():
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                pilha = []
+                while frame is not None:
+                    pilha.append(self._nome(frame))
+                    frame = frame.f_back
+                pilha.reverse()
+
+                self.amostras += 1
+                self.proprio[pilha[-1]] += 1
+                self.inclusivo.update(set(pilha))
+                self.pilhas[";".join(pilha)] += 1
+            time.sleep(self.intervalo_s)
+
+    def start(self):
+        # A thread de amostragem só roda quando pega o GIL: reduz o intervalo de
+        # troca enquanto houver perfil ativo (o último stop devolve o original)
+        _reduzir_switch(self.intervalo_s / 2)
+        self._switch_reduzido = True
+        self._thread = threading.Thread(target=self._laco, name="amostrador-perfil", daemon=True)
+        self._thread.start()
+
+    def stop(self, top: int = 15) -> dict:
+        self._parar.set()
+        if self._thread is not None:
+            self._thread.join()
+        if self._switch_reduzido:
+            self._switch_reduzido = False
+            _restaurar_switch()
+
+        def tabela(contador):
+            return [
+                {"funcao": nome, "amostras": n, "pct": round(100 * n / self.amostras, 1)}
+                for nome, n in contador.most_common(top)
+            ] if self.amostras else []
+
+        return {
+            "amostras": self.amostras,
+            "intervalo_ms": self.intervalo_s * 1000,
+            "tempo_proprio": tabela(self.proprio),
+            "tempo_inclusivo": tabela(self.inclusivo),
+            "pilhas": [{"pilha": p, "amostras": n} for p, n in self.pilhas.most_common(5)],
+        }
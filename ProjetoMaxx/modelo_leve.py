@@ -0,0 +1,151 @@
+"""
+MODELO LEVE PARA INFERÊNCIA (.npz, SEM SKLEARN NEM PANDAS)
+
+Exporta as árvores do modelo (as mesmas arrays do scorer_compilado.py:
+feature, threshold, esquerda, direita, valor, raizes, peso) para um .npz comum,
+junto com features, classes, learning_rate, valor inicial e a versão do
+.joblib de origem. Carregar o .npz só precisa de NumPy (e da expit do
+scipy, para as probabilidades continuarem idênticas bit a bit às do
+model.predict_proba): nada de joblib, sklearn ou pandas na subida.
+
+É o modelo do api_inferencia.py. O .npz não acompanha o registro sozinho:
+depois de treinar/ativar outra versão, exporte de novo.
+
+Uso (na pasta ProjetoMaxx):
+    python modelo_leve.py exportar [artefato.joblib] [--saida modelo_leve.npz]
+        (sem artefato: a versão ativa do registro, senão o .joblib padrão)
+"""
+
+import argparse
+import os
+from typing import List
+
+import numpy as np
+
+from explicacao import ExplicadorArvores
+from scorer_compilado import ScorerCompilado
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MODELO_LEVE_PATH = os.path.join(BASE_DIR, "modelo_leve.npz")
+MODEL_PATH = os.path.join(BASE_DIR, "gradient_boosting_model (1).joblib")
+DATABASE_PATH = os.path.join(BASE_DIR, "base_clientes.csv")
+
+# Linhas da base usadas para conferir o .npz contra o modelo na exportação
+LINHAS_CONFERENCIA = 5000
+
+_ARRAYS = ("feature", "threshold", "esquerda", "direita", "valor", "raizes")
+_ARRAYS_EXPORTADAS = _ARRAYS + ("peso",)
+
+
+class ModeloLeve:
+    """Mesma interface do registro_modelos.ModeloServido usada nas rotas de predição."""
+
+    def __init__(self, scorer: ScorerCompilado, versao: str, caminho: str):
+        self.model = None
+        self.scorer = scorer
+        self.features: List[str] = list(scorer._features)
+        self.versao = versao
+        self.caminho = caminho
+        self.classes = list(scorer.classes_)
+        self.idx_churn = self.classes.index(1) if 1 in self.classes else 1
+        self.explicador = ExplicadorArvores(scorer) if scorer.peso is not None else None
+
+    @property
+    def compilado(self) -> bool:
+        return True
+
+
+def carregar(caminho: str = MODELO_LEVE_PATH) -> ModeloLeve:
+    """Lê o .npz (sem pickle) e monta o scorer compilado sem o modelo sklearn."""
+    with np.load(caminho, allow_pickle=False) as z:
+        arrays = {nome: np.ascontiguousarray(z[nome]) for nome in _ARRAYS}
+        scorer = ScorerCompilado(
+            **arrays,
+            profundidade=int(z["profundidade"]),
+            learning_rate=float(z["learning_rate"]),
+            classes=z["classes"],
+            features=[str(f) for f in z["features"]],
+            init_raw=float(z["init_raw"]),
+            # .npz exportado antes da explicação não tem o peso dos nós
+            peso=z["peso"] if "peso" in z.files else None,
+        )
+        versao = str(z["versao"])
+    return ModeloLeve(scorer, versao, caminho)
+
+
+# ======================================================
+# EXPORTAÇÃO (precisa do sklearn/joblib, só aqui)
+# ======================================================
+
+def _amostra_base(features: List[str], linhas: int = LINHAS_CONFERENCIA) -> np.ndarray:
+    import pandas as pd
+    import pipeline_features
+
+    if not os.path.exists(DATABASE_PATH):
+        return np.zeros((0, len(features)))
+    df = pd.read_csv(DATABASE_PATH, nrows=linhas, dtype=str, keep_default_na=False)
+    return pipeline_features.matriz_features(df, features)
+
+
+def exportar(caminho_artefato: str, destino: str = MODELO_LEVE_PATH) -> ModeloLeve:
+    """Gera o .npz do artefato e confere as probabilidades contra o modelo original."""
+    import pandas as pd
+    import registro_modelos
+
+    servido = registro_modelos.carregar(caminho_artefato, usar_compilado=True)
+    if not servido.compilado or servido.scorer.init_raw is None:
+        raise ValueError("Modelo leve suporta apenas GradientBoostingClassifier binário com init padrão")
+
+    s = servido.scorer
+    tmp = destino + ".tmp.npz"
+    np.savez(
+        tmp,
+        **{nome: getattr(s, nome) for nome in _ARRAYS_EXPORTADAS},
+        profundidade=np.int64(s.profundidade),
+        learning_rate=np.float64(s.learning_rate),
+        init_raw=np.float64(s.init_raw),
+        classes=np.asarray(s.classes_),
+        features=np.array(servido.features, dtype=str),
+        versao=np.array(servido.versao),
+    )
+
+    leve = carregar(tmp)
+    X = _amostra_base(servido.features)
+    if len(X):
+        esperado = servido.model.predict_proba(pd.DataFrame(X, columns=servido.features))
+        if not np.array_equal(leve.scorer.predict_proba(X), esperado):
+            os.remove(tmp)
+            raise ValueError("Modelo leve diverge do modelo original na amostra da base")
+
+    os.replace(tmp, destino)
+    leve.caminho = destino
+    return leve
+
+
+def _artefato_padrao() -> str:
+    import registro_modelos
+
+    versao = registro_modelos.versao_ativa()
+    if versao:
+        return registro_modelos.caminho_versao(versao)
+    return MODEL_PATH
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Modelo leve (.npz) para o modo de inferência")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    p_exp = sub.add_parser("exportar")
+    p_exp.add_argument("artefato", nargs="?")
+    p_exp.add_argument("--saida", default=MODELO_LEVE_PATH)
+    args = parser.parse_args()
+
+    artefato = args.artefato or _artefato_padrao()
+    leve = exportar(artefato, args.saida)
+    tamanho = os.path.getsize(args.saida) / 1024
+    print(f"💾 {args.saida} ({tamanho:.1f} KB) - versão {leve.versao}, "
+          f"{len(leve.scorer.raizes)} árvores, {len(leve.features)} features")
+    print(f"   origem: {os.path.basename(artefato)} (probabilidades conferidas na amostra da base)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,421 @@
+"""
+MONITOR DE DRIFT E QUALIDADE DOS DADOS DO /predict
+
+A conversão das features transforma campo ausente ou inválido em 0.0 sem
+avisar, então um campo quebrado no frontend vira "dado real". Este monitor
+acompanha os payloads que chegam (/predict, /predict_legacy e
+/predict_batch com features) e compara com o perfil de referência salvo
+pelo treino_m.py junto com o modelo (modelos/<versao>.perfil.json):
+
+- por feature: histograma nas faixas do perfil (decis do treino), taxa de
+  campo ausente (sem a chave, null ou "") e de valor coagido (texto que não
+  é número, NaN, bool...)
+- distribuição das predições (faixas de 10% de probabilidade)
+- PSI e KS (sobre os histogramas) de cada feature e das predições
+
+Memória constante: só contadores de tamanho fixo, num anel de BLOCOS
+blocos de BLOCO_S segundos (a janela, padrão 1 hora) mais o acumulado
+desde a subida. Com vários workers, cada processo tem o seu monitor.
+Linhas com todas as features zeradas (regra de cliente inativo) entram nas
+taxas de qualidade, mas não nos histogramas.
+
+Uso (na pasta ProjetoMaxx):
+    python monitor_drift.py perfil                      (perfil do modelo ativo a partir do train/test)
+    python monitor_drift.py comparar [arquivo.csv]      (drift de um CSV, ex.: base_clientes.csv)
+Na API: GET /monitor/drift
+"""
+
+import argparse
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+TRAIN_PATH = os.path.join(BASE_DIR, "train (2).xlsx")
+TEST_PATH = os.path.join(BASE_DIR, "test (2).xlsx")
+DATABASE_PATH = os.path.join(BASE_DIR, "base_clientes.csv")
+
+# Janela: BLOCOS x BLOCO_S segundos
+BLOCO_S = 300
+BLOCOS = 12
+
+# Faixas das features (quantis do treino) e das predições
+QUANTIS_FEATURES = np.linspace(0.1, 0.9, 9)
+CORTES_PREDICOES = [round(c, 1) for c in np.linspace(0.1, 0.9, 9)]
+
+# Limites usuais do PSI: < 0.1 estável, 0.1-0.25 moderado, >= 0.25 alto
+PSI_MODERADO = 0.1
+PSI_ALTO = 0.25
+# Taxa de ausentes/coagidos de uma feature acima disso gera alerta
+LIMITE_QUALIDADE = 0.01
+# Abaixo disso o PSI/KS ainda aparece, mas marcado como amostra insuficiente
+AMOSTRA_MINIMA = 200
+# Em lotes grandes, a qualidade é conferida numa amostra regular de linhas
+LIMITE_QUALIDADE_LOTE = 1000
+
+_EPS = 1e-4
+
+
+# ======================================================
+# PERFIL DE REFERÊNCIA
+# ======================================================
+
+def _matriz_cortes(cortes: Sequence[Sequence[float]]) -> np.ndarray:
+    """Cortes de cada feature numa matriz retangular (sobra preenchida com +inf)."""
+    largura = max((len(c) for c in cortes), default=0)
+    matriz = np.full((len(cortes), largura), np.inf)
+    for i, c in enumerate(cortes):
+        matriz[i, :len(c)] = c
+    return matriz
+
+
+def indices_faixas(X: np.ndarray, matriz_cortes: np.ndarray) -> np.ndarray:
+    """Faixa de cada valor: quantos cortes da sua feature ele ultrapassa (faixas (a, b])."""
+    return (X[:, :, None] > matriz_cortes[None, :, :]).sum(axis=2)
+
+
+def _proporcoes(contagens: np.ndarray) -> np.ndarray:
+    total = contagens.sum()
+    return contagens / total if total else np.zeros(len(contagens))
+
+
+def gerar_perfil(X: np.ndarray, features: List[str], probas: np.ndarray, versao: Optional[str] = None) -> dict:
+    """Perfil de referência: faixas e proporções de cada feature e das predições."""
+    X = np.asarray(X, dtype=np.float64)
+    cortes = [np.unique(np.quantile(X[:, j], QUANTIS_FEATURES)).tolist() for j in range(X.shape[1])]
+    matriz = _matriz_cortes(cortes)
+    idx = indices_faixas(X, matriz)
+
+    perfil_features = {}
+    for j, f in enumerate(features):
+        contagens = np.bincount(idx[:, j], minlength=len(cortes[j]) + 1)
+        perfil_features[f] = {"cortes": cortes[j], "proporcoes": _proporcoes(contagens).tolist()}
+
+    faixas_pred = np.searchsorted(CORTES_PREDICOES, np.asarray(probas, dtype=np.float64), side="left")
+    contagens_pred = np.bincount(faixas_pred, minlength=len(CORTES_PREDICOES) + 1)
+
+    return {
+        "versao_modelo": versao,
+        "gerado_em": datetime.now().isoformat(timespec="seconds"),
+        "linhas": int(X.shape[0]),
+        "features": perfil_features,
+        "predicoes": {"cortes": CORTES_PREDICOES, "proporcoes": _proporcoes(contagens_pred).tolist()},
+    }
+
+
+def salvar_perfil(perfil: dict, versao: str, pasta: Optional[str] = None) -> str:
+    import registro_modelos
+
+    destino = registro_modelos.caminho_perfil(versao, pasta or registro_modelos.REGISTRO_DIR)
+    os.makedirs(os.path.dirname(destino), exist_ok=True)
+    with open(destino + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(dict(perfil, versao_modelo=versao), f, indent=1)
+    os.replace(destino + ".tmp", destino)
+    return destino
+
+
+# ======================================================
+# PSI / KS
+# ======================================================
+
+def psi(referencia: np.ndarray, atual: np.ndarray) -> float:
+    """Population Stability Index entre duas distribuições nas mesmas faixas."""
+    e = np.maximum(np.asarray(referencia, dtype=np.float64), _EPS)
+    a = np.maximum(np.asarray(atual, dtype=np.float64), _EPS)
+    return float(np.sum((a - e) * np.log(a / e)))
+
+
+def ks(referencia: np.ndarray, atual: np.ndarray) -> float:
+    """Maior distância entre as distribuições acumuladas (KS sobre o histograma)."""
+    return float(np.max(np.abs(np.cumsum(referencia) - np.cumsum(atual)), initial=0.0))
+
+
+def _nivel_psi(valor: float) -> str:
+    if valor >= PSI_ALTO:
+        return "alto"
+    if valor >= PSI_MODERADO:
+        return "moderado"
+    return "estavel"
+
+
+# ======================================================
+# QUALIDADE DOS CAMPOS
+# ======================================================
+
+def _classificar(valor) -> int:
+    """0 = ok, 1 = ausente, 2 = coagido para 0.0 pela conversão."""
+    tipo = type(valor)
+    if tipo is int:
+        return 0
+    if tipo is float:
+        return 0 if valor == valor and abs(valor) != float("inf") else 2
+    if valor is None:
+        return 1
+    if tipo is str:
+        texto = valor.strip()
+        if not texto:
+            return 1
+        try:
+            numero = float(texto.replace(",", "."))
+        except ValueError:
+            return 2
+        return 0 if numero == numero and abs(numero) != float("inf") else 2
+    return 2  # bool, lista, dict...
+
+
+def contar_qualidade(dados: Sequence[dict], features: List[str]):
+    """(ausentes, coagidos) por feature e nº de linhas conferidas (amostra regular em lotes grandes)."""
+    passo = max(1, -(-len(dados) // LIMITE_QUALIDADE_LOTE))
+    ausentes = np.zeros(len(features), dtype=np.int64)
+    coagidos = np.zeros(len(features), dtype=np.int64)
+    linhas = 0
+    for registro in dados[::passo]:
+        linhas += 1
+        for j, f in enumerate(features):
+            if f not in registro:
+                ausentes[j] += 1
+                continue
+            c = _classificar(registro[f])
+            if c == 1:
+                ausentes[j] += 1
+            elif c == 2:
+                coagidos[j] += 1
+    return ausentes, coagidos, linhas
+
+
+# ======================================================
+# MONITOR (CONTADORES DE TAMANHO FIXO)
+# ======================================================
+
+class _Contadores:
+    __slots__ = ("bloco", "linhas", "zeradas", "verificadas", "ausentes", "coagidos", "faixas", "predicoes")
+
+    def __init__(self, n_features: int, largura: int, n_pred: int):
+        self.bloco = None
+        self.faixas = np.zeros((n_features, largura), dtype=np.int64)
+        self.predicoes = np.zeros(n_pred, dtype=np.int64)
+        self.ausentes = np.zeros(n_features, dtype=np.int64)
+        self.coagidos = np.zeros(n_features, dtype=np.int64)
+        self.zerar()
+
+    def zerar(self, bloco=None):
+        self.bloco = bloco
+        self.linhas = self.zeradas = self.verificadas = 0
+        for arr in (self.faixas, self.predicoes, self.ausentes, self.coagidos):
+            arr.fill(0)
+
+    def somar(self, outro: "_Contadores"):
+        self.linhas += outro.linhas
+        self.zeradas += outro.zeradas
+        self.verificadas += outro.verificadas
+        self.ausentes += outro.ausentes
+        self.coagidos += outro.coagidos
+        self.faixas += outro.faixas
+        self.predicoes += outro.predicoes
+
+
+class MonitorDrift:
+    """Contadores da janela e do acumulado; thread-safe, custo O(linhas x features) por chamada."""
+
+    def __init__(self, features: List[str], perfil: Optional[dict] = None,
+                 bloco_s: int = BLOCO_S, blocos: int = BLOCOS):
+        self.features = list(features)
+        self.bloco_s = bloco_s
+        self.n_blocos = blocos
+        self._lock = threading.Lock()
+        self.trocar_perfil(perfil)
+
+    def trocar_perfil(self, perfil: Optional[dict]):
+        """Novo perfil (troca de modelo): as faixas mudam, então os contadores recomeçam."""
+        if perfil is not None and list(perfil.get("features", {})) != self.features:
+            print("Perfil de referência com outras features: drift por feature desligado")
+            perfil = None
+
+        cortes = [perfil["features"][f]["cortes"] for f in self.features] if perfil else [[] for _ in self.features]
+        cortes_pred = perfil["predicoes"]["cortes"] if perfil else CORTES_PREDICOES
+        with self._lock:
+            self.perfil = perfil
+            self._matriz = _matriz_cortes(cortes)
+            self._cortes_pred = np.asarray(cortes_pred, dtype=np.float64)
+            dims = (len(self.features), self._matriz.shape[1] + 1, len(cortes_pred) + 1)
+            self._anel = [_Contadores(*dims) for _ in range(self.n_blocos)]
+            self._acumulado = _Contadores(*dims)
+            self._desde = datetime.now().isoformat(timespec="seconds")
+
+    def _bloco_atual(self) -> _Contadores:
+        bloco = int(time.time() // self.bloco_s)
+        c = self._anel[bloco % self.n_blocos]
+        if c.bloco != bloco:
+            c.zerar(bloco)
+        return c
+
+    def observar(self, dados: Sequence[dict], X: np.ndarray, resultados: Sequence[dict]):
+        """Um payload (ou lote) já convertido: dados brutos, matriz de features e respostas."""
+        if not len(dados):
+            return
+        ausentes, coagidos, verificadas = contar_qualidade(dados, self.features)
+
+        zeradas = np.all(X == 0.0, axis=1) if X.shape[1] else np.zeros(len(X), dtype=bool)
+        idx = indices_faixas(X[~zeradas], self._matriz)
+        probas = np.array([r["percentual_churn"] / 100 for r in resultados if r.get("usou_modelo")])
+        faixas_pred = np.searchsorted(self._cortes_pred, probas, side="left")
+        colunas = np.broadcast_to(np.arange(len(self.features)), idx.shape)
+
+        with self._lock:
+            for c in (self._bloco_atual(), self._acumulado):
+                c.linhas += len(X)
+                c.zeradas += int(zeradas.sum())
+                c.verificadas += verificadas
+                c.ausentes += ausentes
+                c.coagidos += coagidos
+                np.add.at(c.faixas, (colunas, idx), 1)
+                np.add.at(c.predicoes, faixas_pred, 1)
+
+    # --------------------------------------------------
+    # RELATÓRIO
+    # --------------------------------------------------
+    def _janela(self) -> _Contadores:
+        agora = int(time.time() // self.bloco_s)
+        total = _Contadores(len(self.features), self._matriz.shape[1] + 1, len(self._cortes_pred) + 1)
+        for c in self._anel:
+            if c.bloco is not None and agora - c.bloco < self.n_blocos:
+                total.somar(c)
+        return total
+
+    def _resumo(self, c: _Contadores) -> dict:
+        linhas_hist = c.linhas - c.zeradas
+        features = {}
+        alertas = []
+        for j, f in enumerate(self.features):
+            item = {
+                "ausentes": round(float(c.ausentes[j] / c.verificadas), 4) if c.verificadas else 0.0,
+                "coagidos": round(float(c.coagidos[j] / c.verificadas), 4) if c.verificadas else 0.0,
+            }
+            if self.perfil is not None:
+                ref = np.asarray(self.perfil["features"][f]["proporcoes"])
+                atual = _proporcoes(c.faixas[j, :len(ref)])
+                if linhas_hist:
+                    item["psi"] = round(psi(ref, atual), 4)
+                    item["ks"] = round(ks(ref, atual), 4)
+                    item["nivel"] = _nivel_psi(item["psi"])
+                    if item["nivel"] != "estavel" and linhas_hist >= AMOSTRA_MINIMA:
+                        alertas.append(f"{f}: drift {item['nivel']} (PSI {item['psi']})")
+            if item["ausentes"] > LIMITE_QUALIDADE:
+                alertas.append(f"{f}: {item['ausentes']:.1%} ausentes")
+            if item["coagidos"] > LIMITE_QUALIDADE:
+                alertas.append(f"{f}: {item['coagidos']:.1%} coagidos para 0")
+            features[f] = item
+
+        total_pred = int(c.predicoes.sum())
+        predicoes = {"total": total_pred, "proporcoes": [round(float(p), 4) for p in _proporcoes(c.predicoes)]}
+        if self.perfil is not None and total_pred:
+            ref = np.asarray(self.perfil["predicoes"]["proporcoes"])
+            atual = _proporcoes(c.predicoes)
+            predicoes.update(psi=round(psi(ref, atual), 4), ks=round(ks(ref, atual), 4))
+            predicoes["nivel"] = _nivel_psi(predicoes["psi"])
+            if predicoes["nivel"] != "estavel" and total_pred >= AMOSTRA_MINIMA:
+                alertas.append(f"predições: drift {predicoes['nivel']} (PSI {predicoes['psi']})")
+
+        return {
+            "linhas": c.linhas,
+            "linhas_zeradas": c.zeradas,
+            "amostra_insuficiente": linhas_hist < AMOSTRA_MINIMA,
+            "features": features,
+            "predicoes": predicoes,
+            "alertas": alertas,
+        }
+
+    def relatorio(self) -> dict:
+        with self._lock:
+            janela = self._resumo(self._janela())
+            acumulado = self._resumo(self._acumulado)
+        return {
+            "perfil": {
+                "versao_modelo": self.perfil.get("versao_modelo"),
+                "gerado_em": self.perfil.get("gerado_em"),
+                "linhas": self.perfil.get("linhas"),
+            } if self.perfil else None,
+            "cortes_predicoes": self._cortes_pred.tolist(),
+            "janela": dict(janela, segundos=self.bloco_s * self.n_blocos),
+            "acumulado": dict(acumulado, desde=self._desde),
+        }
+
+
+# ======================================================
+# CLI: GERAR PERFIL / COMPARAR UM CSV
+# ======================================================
+
+def _carregar_servido():
+    import registro_modelos
+
+    versao = registro_modelos.versao_ativa()
+    if versao:
+        return registro_modelos.carregar(registro_modelos.caminho_versao(versao))
+    return registro_modelos.carregar(os.path.join(BASE_DIR, "gradient_boosting_model (1).joblib"))
+
+
+def perfil_de_treino(servido) -> dict:
+    """Features do train (o que o modelo aprendeu) e predições no test (fora da amostra)."""
+    from cache_dados import ler_excel
+
+    matrizes = []
+    for caminho in (TRAIN_PATH, TEST_PATH):
+        df, _ = ler_excel(caminho)
+        matrizes.append(df.reindex(columns=servido.features, fill_value=0).fillna(0).to_numpy(dtype=np.float64))
+    X_train, X_test = matrizes
+    probas = servido.scorer.predict_proba(X_test)[:, servido.idx_churn]
+    return gerar_perfil(X_train, servido.features, probas, servido.versao)
+
+
+def comparar_csv(servido, caminho: str) -> dict:
+    """Passa um CSV inteiro pelo monitor (conversão, regras e modelo como na API)."""
+    import pandas as pd
+    import pipeline_features
+
+    if servido.perfil is None:
+        raise SystemExit(f"Sem perfil para o modelo {servido.versao}: python monitor_drift.py perfil")
+    monitor = MonitorDrift(servido.features, servido.perfil)
+    for bloco in pd.read_csv(caminho, dtype=str, keep_default_na=False, chunksize=50_000):
+        dados = bloco.to_dict("records")
+        X = pipeline_features.matriz_features(dados, servido.features)
+        zeradas, inativo, usar = pipeline_features.aplicar_regras(X, pipeline_features.dias_desde_ultimo(X, servido.features, dados))
+        probas = np.zeros(len(X))
+        if usar.any():
+            probas[usar] = servido.scorer.predict_proba(X[usar])[:, servido.idx_churn]
+        monitor.observar(dados, X, pipeline_features.resultados(zeradas, inativo, pipeline_features.percentuais(probas)))
+    return monitor.relatorio()["acumulado"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Perfil de referência e drift das features/predições")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    sub.add_parser("perfil")
+    p_cmp = sub.add_parser("comparar")
+    p_cmp.add_argument("arquivo", nargs="?", default=DATABASE_PATH)
+    args = parser.parse_args()
+
+    servido = _carregar_servido()
+    if args.comando == "perfil":
+        destino = salvar_perfil(perfil_de_treino(servido), servido.versao)
+        print(f"💾 Perfil de referência do modelo {servido.versao} salvo em {destino}")
+        return
+
+    r = comparar_csv(servido, args.arquivo)
+    print(f"\n📊 DRIFT DE {os.path.basename(args.arquivo)} ({r['linhas']} linhas, {r['linhas_zeradas']} zeradas)")
+    print(f"   {'feature':<28} {'PSI':>7} {'KS':>7}  {'ausentes':>9} {'coagidos':>9}")
+    for f, item in r["features"].items():
+        print(f"   {f:<28} {item.get('psi', 0):>7.3f} {item.get('ks', 0):>7.3f}  "
+              f"{item['ausentes']:>9.2%} {item['coagidos']:>9.2%}  {item.get('nivel', '')}")
+    p = r["predicoes"]
+    print(f"   {'predições':<28} {p.get('psi', 0):>7.3f} {p.get('ks', 0):>7.3f}  {'':>9} {'':>9}  {p.get('nivel', '')}")
+    for alerta in r["alertas"]:
+        print(f"   ⚠️  {alerta}")
+
+
+if __name__ == "__main__":
+    main()
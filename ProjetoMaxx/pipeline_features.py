@@ -0,0 +1,191 @@
+"""
+PIPELINE DE FEATURES (compartilhado por API, CLIs e treino)
+
+Tudo o que transforma dados de cliente em entrada do modelo e resultado
+de negócio fica aqui, trabalhando em arrays inteiros em vez de célula a
+célula:
+
+- conversão para float (aceita vírgula decimal; inválido/ausente/NaN/inf -> 0.0)
+- normalização do ID_CLIENTE (a mesma em base, histórico, tabela de scores e CLIs)
+- alinhamento das colunas à lista FEATURES do modelo
+- regras de negócio como máscaras: features todas zeradas e
+  DAYS_SINCE_LAST >= 366 (cliente inativo, não passa pelo modelo)
+- percentual de churn e faixa de risco (>= 60 ALTO, >= 30 MODERADO)
+
+Benchmark contra o caminho antigo (DataFrame + reindex + applymap):
+    python benchmarks/bench_features.py
+"""
+
+from typing import TYPE_CHECKING, Iterable, List, Sequence, Tuple, Union
+
+import numpy as np
+
+if TYPE_CHECKING:  # pandas só nas anotações: o modo de inferência (api_inferencia.py) não o importa
+    import pandas as pd
+
+COLUNA_DIAS = "DAYS_SINCE_LAST"
+LIMITE_DIAS_INATIVO = 366
+
+LIMITE_ALTO = 60
+LIMITE_MODERADO = 30
+
+MOTIVO_FEATURES_ZERADAS = "Cliente inativo (features zeradas por regra de negócio)"
+MOTIVO_INATIVO_1_ANO = "Cliente inativo há mais de 1 ano (regra de negócio)"
+
+_TIPOS_NUMERICOS = {int, float}
+
+
+# ======================================================
+# CONVERSÃO
+# ======================================================
+
+def _eh_serie(valores) -> bool:
+    """pd.Series sem importar o pandas (coluna com dtype que não é ndarray)."""
+    return hasattr(valores, "dtype") and hasattr(valores, "tolist") and hasattr(valores, "index")
+
+
+def normalizar_id(v) -> str:
+    """Normaliza o ID do cliente do mesmo jeito que as rotas faziam (sem sufixo '.0')."""
+    return str(v).strip().split(".")[0]
+
+
+def to_float(v) -> float:
+    """Converte um valor (inclusive com vírgula) para float; inválido vira 0.0."""
+    try:
+        return float(str(v).replace(",", "."))
+    except (ValueError, TypeError):
+        return 0.0
+
+
+def coluna_para_float(valores) -> np.ndarray:
+    """Versão em lote do to_float para uma coluna; NaN, ±inf e ausente também viram 0.0.
+
+    Colunas já numéricas (ou listas só de int/float, o caso comum do JSON)
+    são convertidas de uma vez; só colunas com texto/misturadas passam pelo
+    to_float valor a valor. bool segue o to_float ("True" não é número -> 0.0).
+    """
+    if isinstance(valores, np.ndarray) or _eh_serie(valores):
+        dtype = valores.dtype
+        if dtype != object and np.issubdtype(dtype, np.number) and dtype != bool:
+            resultado = np.asarray(valores, dtype=np.float64)
+            return np.where(np.isfinite(resultado), resultado, 0.0)
+        valores = valores.tolist()
+
+    valores = list(valores)
+    tipos = set(map(type, valores))
+    resultado = None
+    if tipos <= _TIPOS_NUMERICOS:
+        try:
+            resultado = np.array(valores, dtype=np.float64)
+        except OverflowError:
+            resultado = None
+    elif tipos == {str}:
+        # Coluna só de texto: sem a chamada de função por valor enquanto tudo for válido
+        try:
+            resultado = np.array([float(v.replace(",", ".")) for v in valores], dtype=np.float64)
+        except ValueError:
+            resultado = None
+
+    if resultado is None:
+        resultado = np.fromiter((to_float(v) for v in valores), dtype=np.float64, count=len(valores))
+
+    # Não finito vira 0.0 aqui, uma vez: o scorer compilado e o sklearn (lotes
+    # grandes) recebem a mesma matriz, seja qual for o tamanho do lote
+    return np.where(np.isfinite(resultado), resultado, 0.0)
+
+
+def matriz_features(dados: Union[dict, Sequence[dict], "pd.DataFrame"], features: List[str]) -> np.ndarray:
+    """Matriz (n, len(features)) float64 alinhada a FEATURES.
+
+    Aceita um dict (payload do /predict), uma lista de dicts ou um DataFrame.
+    Feature ausente vira coluna de zeros (como o reindex(fill_value=0)).
+    """
+    if isinstance(dados, dict):
+        dados = [dados]
+
+    if hasattr(dados, "columns"):  # DataFrame
+        n = len(dados)
+        colunas = (dados[f] if f in dados.columns else None for f in features)
+    else:
+        n = len(dados)
+        colunas = ([registro.get(f, 0) for registro in dados] for f in features)
+
+    X = np.zeros((n, len(features)), dtype=np.float64)
+    for j, coluna in enumerate(colunas):
+        if coluna is not None and n:
+            X[:, j] = coluna_para_float(coluna)
+    return X
+
+
+# ======================================================
+# REGRAS DE NEGÓCIO
+# ======================================================
+
+def dias_desde_ultimo(X: np.ndarray, features: List[str], dados=None) -> np.ndarray:
+    """DAYS_SINCE_LAST de cada linha (da matriz, ou dos dados se não for feature do modelo)."""
+    if COLUNA_DIAS in features:
+        return X[:, features.index(COLUNA_DIAS)]
+    if dados is None:
+        return np.zeros(X.shape[0], dtype=np.float64)
+    return matriz_features(dados, [COLUNA_DIAS])[:, 0]
+
+
+def aplicar_regras(X: np.ndarray, dias: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Máscaras (zeradas, inativo_1_ano, usar_modelo); as duas regras são exclusivas."""
+    if X.shape[1]:
+        zeradas = np.all(X == 0.0, axis=1)
+    else:
+        zeradas = np.zeros(X.shape[0], dtype=bool)
+    inativo_1_ano = ~zeradas & (dias >= LIMITE_DIAS_INATIVO)
+    usar_modelo = ~zeradas & ~inativo_1_ano
+    return zeradas, inativo_1_ano, usar_modelo
+
+
+# ======================================================
+# RESULTADO
+# ======================================================
+
+def percentuais(probas: Iterable[float]) -> List[float]:
+    """Probabilidade -> percentual com 2 casas (round do Python, como sempre foi na API)."""
+    return [round(float(p) * 100, 2) for p in probas]
+
+
+def classificar_risco(percentual: float) -> str:
+    if percentual >= LIMITE_ALTO:
+        return "ALTO"
+    elif percentual >= LIMITE_MODERADO:
+        return "MODERADO"
+    return "BAIXO"
+
+
+def niveis_risco(percentual: np.ndarray) -> np.ndarray:
+    percentual = np.asarray(percentual, dtype=np.float64)
+    return np.where(percentual >= LIMITE_ALTO, "ALTO",
+                    np.where(percentual >= LIMITE_MODERADO, "MODERADO", "BAIXO"))
+
+
+def resultados(zeradas: np.ndarray, inativo_1_ano: np.ndarray, percentual: Sequence[float]) -> List[dict]:
+    """Um dict por linha no formato de resposta do /predict."""
+    saida = []
+    for i in range(len(zeradas)):
+        if zeradas[i]:
+            saida.append({
+                "percentual_churn": 0.0,
+                "nivel_risco": "BAIXO",
+                "motivo": MOTIVO_FEATURES_ZERADAS,
+                "usou_modelo": False
+            })
+        elif inativo_1_ano[i]:
+            saida.append({
+                "percentual_churn": 0.0,
+                "nivel_risco": "BAIXO",
+                "motivo": MOTIVO_INATIVO_1_ANO,
+                "usou_modelo": False
+            })
+        else:
+            saida.append({
+                "percentual_churn": percentual[i],
+                "nivel_risco": classificar_risco(percentual[i]),
+                "usou_modelo": True
+            })
+    return saida
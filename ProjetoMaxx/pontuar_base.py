@@ -0,0 +1,215 @@
+"""
+PONTUAÇÃO EM MASSA DA BASE DE CLIENTES (linha de comando)
+
+Lê o base_clientes.csv (ou qualquer CSV com as mesmas colunas) em blocos
+de tamanho fixo, aplica as mesmas regras de cliente inativo da API e
+pontua cada bloco com UMA chamada vetorizada ao modelo. A memória fica
+limitada ao tamanho do bloco (x nº de processos), não ao tamanho do arquivo.
+
+Saída: CSV ou Parquet (pela extensão) com ID_CLIENTE, percentual_churn,
+nivel_risco e usou_modelo, na mesma ordem da entrada.
+
+Uso (na pasta ProjetoMaxx):
+    python pontuar_base.py [--entrada base_clientes.csv] [--saida scores_base.csv]
+                           [--bloco 50000] [--processos N]
+"""
+
+import argparse
+import os
+import sys
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+warnings.filterwarnings("ignore")
+
+import numpy as np
+import pandas as pd
+
+import registro_modelos
+from base_clientes import COLUNA_ID, LOG_SUFIXO
+from pipeline_features import (
+    COLUNA_DIAS, aplicar_regras, dias_desde_ultimo, matriz_features, niveis_risco, normalizar_id, percentuais
+)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MODEL_PATH = os.path.join(BASE_DIR, "gradient_boosting_model (1).joblib")
+DATABASE_PATH = os.path.join(BASE_DIR, "base_clientes.csv")
+
+BLOCO_PADRAO = 50_000
+
+# Modelo de cada processo worker (carregado uma vez no initializer)
+_SERVIDO: Optional[registro_modelos.ModeloServido] = None
+
+
+def carregar_modelo(caminho: Optional[str] = None) -> registro_modelos.ModeloServido:
+    """O modelo informado, senão a versão ativa do registro, senão o .joblib padrão."""
+    if caminho:
+        return registro_modelos.carregar(caminho)
+
+    ativa = registro_modelos.versao_ativa()
+    if ativa:
+        return registro_modelos.carregar(registro_modelos.caminho_versao(ativa))
+    return registro_modelos.carregar(MODEL_PATH)
+
+
+def _iniciar_worker(caminho_modelo: str):
+    global _SERVIDO
+    warnings.filterwarnings("ignore")
+    _SERVIDO = registro_modelos.carregar(caminho_modelo)
+
+
+def pontuar_bloco(bloco: pd.DataFrame, servido: Optional[registro_modelos.ModeloServido] = None) -> pd.DataFrame:
+    """Regras de negócio como máscaras + uma chamada ao modelo para as linhas restantes."""
+    servido = servido or _SERVIDO
+    features = servido.features
+    n = len(bloco)
+
+    # Mesma conversão do /predict e da tabela de scores (vírgula decimal;
+    # vazio/inválido/NaN/±inf -> 0.0); colunas já numéricas vão direto
+    X = matriz_features(bloco, features)
+
+    _, _, usar_modelo = aplicar_regras(X, dias_desde_ultimo(X, features, bloco))
+
+    proba = np.zeros(n, dtype=np.float64)
+    if usar_modelo.any():
+        entrada = pd.DataFrame(X[usar_modelo], columns=features)
+        proba[usar_modelo] = servido.scorer.predict_proba(entrada)[:, servido.idx_churn]
+
+    percentual = np.array(percentuais(proba.tolist()), dtype=np.float64)
+
+    return pd.DataFrame({
+        COLUNA_ID: [normalizar_id(v) for v in bloco[COLUNA_ID].tolist()],
+        "percentual_churn": percentual,
+        "nivel_risco": niveis_risco(percentual),
+        "usou_modelo": usar_modelo,
+    })
+
+
+class _Escritor:
+    """Grava os blocos de resultado conforme chegam (CSV ou Parquet)."""
+
+    def __init__(self, caminho: str):
+        self.caminho = caminho
+        self.parquet = caminho.lower().endswith(".parquet")
+        self._tmp = caminho + ".tmp"
+        self._writer = None
+        self._primeiro = True
+
+        if self.parquet:
+            try:
+                import pyarrow  # noqa: F401
+            except ImportError:
+                raise SystemExit("Saída Parquet precisa do pyarrow (pip install pyarrow); use .csv")
+
+    def escrever(self, df: pd.DataFrame):
+        if self.parquet:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            tabela = pa.Table.from_pandas(df, preserve_index=False)
+            if self._writer is None:
+                self._writer = pq.ParquetWriter(self._tmp, tabela.schema)
+            self._writer.write_table(tabela)
+        else:
+            df.to_csv(self._tmp, mode="w" if self._primeiro else "a", header=self._primeiro, index=False)
+        self._primeiro = False
+
+    def fechar(self):
+        if self._writer is not None:
+            self._writer.close()
+        if self._primeiro:  # entrada vazia
+            self.escrever(pd.DataFrame(columns=[COLUNA_ID, "percentual_churn", "nivel_risco", "usou_modelo"]))
+            if self._writer is not None:
+                self._writer.close()
+        os.replace(self._tmp, self.caminho)
+
+
+def _ler_blocos(caminho: str, tamanho: int, colunas_necessarias):
+    necessarias = set(colunas_necessarias)
+    # round_trip: o parser em C converte os números exatamente como o float() do Python
+    return pd.read_csv(
+        caminho, dtype={COLUNA_ID: str}, chunksize=tamanho, float_precision="round_trip",
+        usecols=lambda c: c.strip() in necessarias
+    )
+
+
+def pontuar_arquivo(entrada: str, saida: str, tamanho_bloco: int = BLOCO_PADRAO,
+                    processos: int = 1, caminho_modelo: Optional[str] = None) -> dict:
+    servido = carregar_modelo(caminho_modelo)
+    print(f"📍 Modelo {servido.versao} ({type(servido.model).__name__}), {len(servido.features)} features")
+
+    log = os.path.splitext(entrada)[0] + LOG_SUFIXO
+    if os.path.exists(log) and os.path.getsize(log) > 0:
+        print(f"   ⚠️  {os.path.basename(log)} tem alterações ainda não compactadas no CSV; "
+              f"elas não entram nesta pontuação")
+
+    blocos = _ler_blocos(entrada, tamanho_bloco, [COLUNA_ID, COLUNA_DIAS] + servido.features)
+    escritor = _Escritor(saida)
+
+    total = 0
+    no_modelo = 0
+    t0 = time.perf_counter()
+
+    def registrar(resultado: pd.DataFrame):
+        nonlocal total, no_modelo
+        escritor.escrever(resultado)
+        total += len(resultado)
+        no_modelo += int(resultado["usou_modelo"].sum())
+        decorrido = time.perf_counter() - t0
+        print(f"   ✓ {total:>10,} linhas   {total / decorrido:>10,.0f} linhas/s", flush=True)
+
+    def normalizar(bloco: pd.DataFrame) -> pd.DataFrame:
+        bloco.columns = bloco.columns.str.strip()
+        if COLUNA_ID not in bloco.columns:
+            raise SystemExit(f"Coluna {COLUNA_ID} não encontrada em {entrada}")
+        return bloco
+
+    if processos <= 1:
+        for bloco in blocos:
+            registrar(pontuar_bloco(normalizar(bloco), servido))
+    else:
+        # No máximo 2 blocos por processo em voo: memória limitada mesmo com arquivo enorme
+        em_voo = []
+        with ProcessPoolExecutor(processos, initializer=_iniciar_worker, initargs=(servido.caminho,)) as pool:
+            for bloco in blocos:
+                em_voo.append(pool.submit(pontuar_bloco, normalizar(bloco)))
+                if len(em_voo) >= 2 * processos:
+                    registrar(em_voo.pop(0).result())
+            for futuro in em_voo:
+                registrar(futuro.result())
+
+    escritor.fechar()
+    duracao = time.perf_counter() - t0
+
+    return {
+        "linhas": total,
+        "usaram_modelo": no_modelo,
+        "segundos": duracao,
+        "linhas_por_s": total / duracao if duracao else 0.0,
+        "versao_modelo": servido.versao,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pontua uma base de clientes inteira em blocos")
+    parser.add_argument("--entrada", default=DATABASE_PATH)
+    parser.add_argument("--saida", default=os.path.join(BASE_DIR, "scores_base.csv"),
+                        help="Arquivo .csv ou .parquet")
+    parser.add_argument("--bloco", type=int, default=BLOCO_PADRAO, help="Linhas por bloco")
+    parser.add_argument("--processos", type=int, default=1, help="Processos pontuando blocos em paralelo")
+    parser.add_argument("--modelo", help="Artefato .joblib (padrão: versão ativa do registro)")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.entrada):
+        sys.exit(f"Arquivo não encontrado: {args.entrada}")
+
+    r = pontuar_arquivo(args.entrada, args.saida, args.bloco, args.processos, args.modelo)
+
+    print(f"\n✅ {r['linhas']:,} clientes pontuados em {r['segundos']:.1f}s "
+          f"({r['linhas_por_s']:,.0f} linhas/s; {r['usaram_modelo']:,} passaram pelo modelo)")
+    print(f"💾 Resultado: {os.path.abspath(args.saida)}")
+
+
+if __name__ == "__main__":
+    main()
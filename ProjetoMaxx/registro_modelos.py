@@ -0,0 +1,417 @@
+"""
+REGISTRO DE MODELOS VERSIONADOS + RECARGA A QUENTE
+
+Estrutura (pasta modelos/, ao lado do api.py):
+    modelos/manifest.json          versão ativa + uma entrada por versão
+    modelos/<versao>.joblib        artefato ({"model", "features"}) de cada versão
+    modelos/<versao>.prefiltro.joblib  pré-filtro da predição em dois estágios (opcional)
+    modelos/<versao>.perfil.json   perfil de referência do monitor de drift (opcional)
+
+A versão é o sha256 abreviado do arquivo (o mesmo MODEL_VERSION da API).
+Cada entrada do manifesto guarda features, métricas de teste, parâmetros,
+hash completo e data de registro.
+
+Recarga a quente: a API carrega e VALIDA a nova versão numa thread em
+segundo plano (hash, features, predict_proba numa amostra da base) e só
+então troca a referência do modelo servido - uma atribuição só, então cada
+requisição usa do começo ao fim o modelo que pegou ao entrar. Com vários
+workers, quem recebe o pedido grava a versão ativa no manifesto e os outros
+percebem a mudança no arquivo e recarregam sozinhos.
+
+Uso (na pasta ProjetoMaxx):
+    python registro_modelos.py listar
+    python registro_modelos.py registrar "gradient_boosting_model (1).joblib" [--ativar]
+    python registro_modelos.py ativar <versao>
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import GradientBoostingClassifier
+
+from dois_estagios import Prefiltro
+from explicacao import ExplicadorArvores
+from scorer_compilado import ScorerCompilado
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+REGISTRO_DIR = os.path.join(BASE_DIR, "modelos")
+MANIFESTO = "manifest.json"
+
+# Intervalo mínimo entre dois os.stat() do manifesto (por worker)
+VERIFICAR_MANIFESTO_A_CADA_S = 1.0
+
+
+def hash_arquivo(caminho: str) -> str:
+    h = hashlib.sha256()
+    with open(caminho, "rb") as f:
+        for bloco in iter(lambda: f.read(1 << 20), b""):
+            h.update(bloco)
+    return h.hexdigest()
+
+
+# ======================================================
+# MANIFESTO
+# ======================================================
+
+def caminho_manifesto(pasta: str = REGISTRO_DIR) -> str:
+    return os.path.join(pasta, MANIFESTO)
+
+
+def ler_manifesto(pasta: str = REGISTRO_DIR) -> dict:
+    try:
+        with open(caminho_manifesto(pasta), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"ativa": None, "versoes": {}}
+
+
+def _gravar_manifesto(manifesto: dict, pasta: str = REGISTRO_DIR):
+    tmp = caminho_manifesto(pasta) + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifesto, f, indent=2, ensure_ascii=False)
+    os.replace(tmp, caminho_manifesto(pasta))
+
+
+def versao_ativa(pasta: str = REGISTRO_DIR) -> Optional[str]:
+    return ler_manifesto(pasta).get("ativa")
+
+
+def caminho_versao(versao: str, pasta: str = REGISTRO_DIR) -> str:
+    entrada = ler_manifesto(pasta)["versoes"].get(versao)
+    if entrada is None:
+        raise KeyError(f"Versão {versao} não está no registro")
+    return os.path.join(pasta, entrada["arquivo"])
+
+
+def caminho_prefiltro(versao: str, pasta: str = REGISTRO_DIR) -> str:
+    """Pré-filtro calibrado para a versão (dois_estagios.py); pode não existir."""
+    return os.path.join(pasta, f"{versao}.prefiltro.joblib")
+
+
+def caminho_perfil(versao: str, pasta: str = REGISTRO_DIR) -> str:
+    """Perfil de referência das features/predições (monitor_drift.py); pode não existir."""
+    return os.path.join(pasta, f"{versao}.perfil.json")
+
+
+def registrar(caminho_artefato: str, metricas: Optional[dict] = None, params: Optional[dict] = None,
+              ativar: bool = False, pasta: str = REGISTRO_DIR) -> str:
+    """Copia o artefato para o registro e cria sua entrada no manifesto; retorna a versão."""
+    os.makedirs(pasta, exist_ok=True)
+
+    sha = hash_arquivo(caminho_artefato)
+    versao = sha[:12]
+    arquivo = f"{versao}.joblib"
+    destino = os.path.join(pasta, arquivo)
+    if not os.path.exists(destino):
+        shutil.copyfile(caminho_artefato, destino + ".tmp")
+        os.replace(destino + ".tmp", destino)
+
+    artefato = joblib.load(destino)
+    model, features = _desempacotar(artefato)
+
+    manifesto = ler_manifesto(pasta)
+    manifesto["versoes"][versao] = {
+        "arquivo": arquivo,
+        "sha256": sha,
+        "features": features,
+        "classe_modelo": type(model).__name__,
+        "metricas": {k: _json_simples(v) for k, v in (metricas or {}).items()},
+        "params": {k: _json_simples(v) for k, v in (params or {}).items()},
+        "origem": os.path.basename(caminho_artefato),
+        "registrado_em": datetime.now().isoformat(timespec="seconds"),
+    }
+    # Só ativa quando pedido: APIs rodando trocam sozinhas para a versão ativa
+    if ativar:
+        manifesto["ativa"] = versao
+    _gravar_manifesto(manifesto, pasta)
+    return versao
+
+
+def ativar(versao: str, pasta: str = REGISTRO_DIR):
+    manifesto = ler_manifesto(pasta)
+    if versao not in manifesto["versoes"]:
+        raise KeyError(f"Versão {versao} não está no registro")
+    manifesto["ativa"] = versao
+    _gravar_manifesto(manifesto, pasta)
+
+
+def _json_simples(v):
+    """Valores numpy (ex.: métricas do sklearn) em tipos que o json aceita."""
+    if isinstance(v, np.generic):
+        return v.item()
+    return v
+
+
+# ======================================================
+# CARGA + VALIDAÇÃO
+# ======================================================
+
+def _desempacotar(artefato):
+    if isinstance(artefato, dict):
+        return artefato.get("model"), list(artefato.get("features", []))
+    return artefato, list(getattr(artefato, "feature_names_in_", []))
+
+
+class ModeloServido:
+    """Tudo que uma predição precisa de UMA versão do modelo (imutável depois de criado)."""
+
+    def __init__(self, model, features: List[str], versao: str, caminho: str, usar_compilado: bool = True,
+                 prefiltro: Optional[Prefiltro] = None, perfil: Optional[dict] = None):
+        self.model = model
+        self.features = list(features)
+        self.versao = versao
+        self.caminho = caminho
+        self.prefiltro = prefiltro
+        self.perfil = perfil
+
+        self.scorer = model
+        # As árvores do GradientBoostingClassifier comparam em float32 (chave do cache de predições)
+        self.entrada_float32 = isinstance(model, GradientBoostingClassifier)
+        # Contribuições por feature (explain=true); só para GradientBoostingClassifier
+        self.explicador = None
+        try:
+            compilado = ScorerCompilado.de_modelo(model, self.features)
+        except ValueError as e:
+            compilado = None
+            if usar_compilado:
+                print(f"Scorer compilado indisponível, usando sklearn: {e}")
+
+        if compilado is not None:
+            if usar_compilado:
+                self.scorer = compilado
+            try:
+                self.explicador = ExplicadorArvores(compilado)
+            except ValueError as e:
+                print(f"Explicação das predições indisponível: {e}")
+
+        self.classes = list(self.scorer.classes_)
+        self.idx_churn = self.classes.index(1) if 1 in self.classes else 1
+
+    @property
+    def compilado(self) -> bool:
+        return self.scorer is not self.model
+
+
+def carregar(caminho: str, usar_compilado: bool = True, sha256: Optional[str] = None,
+             pasta: str = REGISTRO_DIR) -> ModeloServido:
+    """Carrega um artefato .joblib; confere o hash se informado.
+
+    Pré-filtro e perfil de referência da versão são procurados no registro em pasta.
+    """
+    sha = hash_arquivo(caminho)
+    if sha256 is not None and sha != sha256:
+        raise ValueError(f"Hash de {os.path.basename(caminho)} não confere com o manifesto")
+
+    model, features = _desempacotar(joblib.load(caminho))
+    if model is None or not hasattr(model, "predict_proba"):
+        raise ValueError("Artefato sem modelo com predict_proba")
+    if not features:
+        raise ValueError("Artefato sem lista de features")
+
+    versao = sha[:12]
+    return ModeloServido(model, features, versao, caminho, usar_compilado,
+                         _carregar_prefiltro(versao, features, pasta), _carregar_perfil(versao, pasta))
+
+
+def _carregar_perfil(versao: str, pasta: str) -> Optional[dict]:
+    try:
+        with open(caminho_perfil(versao, pasta), encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        print(f"Perfil de referência de {versao} ignorado: {e}")
+        return None
+
+
+def _carregar_prefiltro(versao: str, features: List[str], pasta: str) -> Optional[Prefiltro]:
+    caminho = caminho_prefiltro(versao, pasta)
+    if not os.path.exists(caminho):
+        return None
+    try:
+        artefato = joblib.load(caminho)
+        if artefato.get("versao_modelo") != versao or list(artefato.get("features", [])) != list(features):
+            raise ValueError("calibrado para outra versão/outras features")
+        return Prefiltro.de_artefato(artefato)
+    except (OSError, ValueError, KeyError, AttributeError) as e:
+        print(f"Pré-filtro de {versao} ignorado: {e}")
+        return None
+
+
+def validar(servido: ModeloServido, features_esperadas: List[str], X_amostra: np.ndarray):
+    """Levanta ValueError se a versão não puder substituir a atual."""
+    if servido.features != list(features_esperadas):
+        raise ValueError(
+            "Features diferentes das servidas pela API (trocar o conjunto de features exige reiniciar): "
+            f"{servido.features}"
+        )
+    if 1 not in servido.classes:
+        raise ValueError(f"Modelo sem a classe 1 (churn): classes {servido.classes}")
+
+    if len(X_amostra):
+        X_amostra = pd.DataFrame(X_amostra, columns=servido.features)
+        proba = servido.scorer.predict_proba(X_amostra)[:, servido.idx_churn]
+        if not np.all(np.isfinite(proba)) or proba.min() < 0 or proba.max() > 1:
+            raise ValueError("predict_proba fora de [0, 1] na amostra da base")
+        if servido.compilado:
+            referencia = servido.model.predict_proba(X_amostra)[:, servido.idx_churn]
+            if not np.array_equal(proba, referencia):
+                raise ValueError("Scorer compilado diverge do modelo na amostra da base")
+
+
+def carregar_versao(versao: str, features_esperadas: List[str], X_amostra: np.ndarray,
+                    usar_compilado: bool = True, pasta: str = REGISTRO_DIR) -> ModeloServido:
+    entrada = ler_manifesto(pasta)["versoes"].get(versao)
+    if entrada is None:
+        raise KeyError(f"Versão {versao} não está no registro")
+
+    servido = carregar(os.path.join(pasta, entrada["arquivo"]), usar_compilado, entrada.get("sha256"), pasta)
+    validar(servido, features_esperadas, X_amostra)
+    return servido
+
+
+# ======================================================
+# RECARGA EM SEGUNDO PLANO
+# ======================================================
+
+class RecarregadorModelo:
+    """Carrega/valida versões numa thread e chama ao_trocar(servido, pedido_local) quando pronto.
+
+    pedido_local é True só no worker que recebeu o pedido de troca (e grava o
+    manifesto); os que seguem o manifesto recebem False.
+    """
+
+    def __init__(self, carregar_validado: Callable[[str], ModeloServido],
+                 ao_trocar: Callable[[ModeloServido, bool], None], versao_atual: Callable[[], Optional[str]],
+                 pasta: str = REGISTRO_DIR):
+        self.carregar_validado = carregar_validado
+        self.ao_trocar = ao_trocar
+        self.versao_atual = versao_atual
+        self.pasta = pasta
+
+        self._lock = threading.Lock()
+        self._carregando: Optional[str] = None
+        self._ultima_verificacao = 0.0
+        self._assinatura_manifesto = self._assinatura()
+        self.ultimo_erro: Optional[Dict] = None
+        self.ultima_troca: Optional[Dict] = None
+
+    def _assinatura(self):
+        try:
+            st = os.stat(caminho_manifesto(self.pasta))
+            return (st.st_mtime_ns, st.st_size)
+        except OSError:
+            return None
+
+    def solicitar(self, versao: str, gravar_manifesto: bool = False) -> bool:
+        """Dispara a carga da versão em segundo plano; False se já houver uma em andamento."""
+        with self._lock:
+            if self._carregando is not None:
+                return False
+            self._carregando = versao
+
+        threading.Thread(
+            target=self._carregar, args=(versao, gravar_manifesto), name="recarga-modelo", daemon=True
+        ).start()
+        return True
+
+    def _carregar(self, versao: str, gravar_manifesto: bool):
+        t0 = time.perf_counter()
+        try:
+            servido = self.carregar_validado(versao)
+            anterior = self.versao_atual()
+            self.ao_trocar(servido, gravar_manifesto)
+            if gravar_manifesto:
+                ativar(versao, self.pasta)
+            self.ultima_troca = {
+                "de": anterior,
+                "para": versao,
+                "em": datetime.now().isoformat(timespec="seconds"),
+                "duracao_ms": round((time.perf_counter() - t0) * 1000, 1),
+            }
+            self.ultimo_erro = None
+            print(f"Modelo trocado a quente: {anterior} -> {versao}")
+        except Exception as e:
+            self.ultimo_erro = {"versao": versao, "erro": str(e), "em": datetime.now().isoformat(timespec="seconds")}
+            print(f"Falha ao carregar o modelo {versao}: {e}")
+        finally:
+            with self._lock:
+                self._carregando = None
+                self._assinatura_manifesto = self._assinatura()
+
+    def verificar_manifesto(self):
+        """Chamado a cada requisição: recarrega se outro processo mudou a versão ativa."""
+        agora = time.monotonic()
+        if agora - self._ultima_verificacao < VERIFICAR_MANIFESTO_A_CADA_S:
+            return
+        self._ultima_verificacao = agora
+
+        assinatura = self._assinatura()
+        if assinatura == self._assinatura_manifesto or self._carregando is not None:
+            return
+        self._assinatura_manifesto = assinatura
+
+        ativa = versao_ativa(self.pasta)
+        if ativa and ativa != self.versao_atual():
+            self.solicitar(ativa)
+
+    def estado(self) -> dict:
+        manifesto = ler_manifesto(self.pasta)
+        return {
+            "servida": self.versao_atual(),
+            "ativa_no_registro": manifesto.get("ativa"),
+            "carregando": self._carregando,
+            "ultima_troca": self.ultima_troca,
+            "ultimo_erro": self.ultimo_erro,
+            "versoes": manifesto.get("versoes", {}),
+        }
+
+
+# ======================================================
+# MAIN (linha de comando)
+# ======================================================
+
+def main():
+    parser = argparse.ArgumentParser(description="Registro de versões do modelo de churn")
+    sub = parser.add_subparsers(dest="comando", required=True)
+
+    sub.add_parser("listar")
+
+    p_reg = sub.add_parser("registrar")
+    p_reg.add_argument("artefato")
+    p_reg.add_argument("--ativar", action="store_true")
+
+    p_atv = sub.add_parser("ativar")
+    p_atv.add_argument("versao")
+
+    args = parser.parse_args()
+
+    if args.comando == "registrar":
+        versao = registrar(args.artefato, ativar=args.ativar)
+        print(f"💾 Registrado: {versao}" + (" (ativa)" if versao_ativa() == versao else ""))
+    elif args.comando == "ativar":
+        ativar(args.versao)
+        print(f"✅ Versão ativa: {args.versao} (APIs rodando recarregam sozinhas)")
+    else:
+        manifesto = ler_manifesto()
+        if not manifesto["versoes"]:
+            print("Registro vazio")
+        for versao, e in sorted(manifesto["versoes"].items(), key=lambda kv: kv[1]["registrado_em"]):
+            marca = "*" if versao == manifesto.get("ativa") else " "
+            auc = e.get("metricas", {}).get("AUC")
+            auc = f"AUC={auc:.4f}" if isinstance(auc, (int, float)) else ""
+            print(f" {marca} {versao}  {e['registrado_em']}  {e['classe_modelo']:<28} {auc}")
+
+
+if __name__ == "__main__":
+    main()
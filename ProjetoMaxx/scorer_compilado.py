@@ -0,0 +1,167 @@
+"""
+SCORER COMPILADO DO GRADIENT BOOSTING
+
+Achata as árvores do GradientBoostingClassifier salvo pelo treino_m.py
+em arrays NumPy contíguos (feature, threshold, esquerda, direita, valor)
+e percorre as árvores direto nos arrays, sem a validação de entrada e o
+tratamento de DataFrame do sklearn a cada chamada.
+
+As probabilidades são idênticas bit a bit às do model.predict_proba:
+- a entrada é convertida para float32, como o sklearn faz
+- cada árvore soma learning_rate * valor_da_folha na MESMA ordem
+- a probabilidade sai da mesma expit (scipy) usada pela loss binomial
+
+O ganho é no custo fixo por chamada (1 linha ou lotes pequenos). Em lotes
+grandes o laço em Cython do sklearn é mais rápido que a travessia em NumPy,
+então, quando o modelo original está disponível, lotes acima de
+LIMITE_LINHAS_ARRAYS vão direto para ele (o resultado é o mesmo).
+"""
+
+import warnings
+from typing import List, Optional
+
+import numpy as np
+from scipy.special import expit
+
+TREE_LEAF = -1
+
+# Acima disso o predict_proba do sklearn (Cython) ganha da travessia em NumPy
+LIMITE_LINHAS_ARRAYS = 128
+
+
+class ScorerCompilado:
+    """Substituto do model.predict_proba para GradientBoostingClassifier binário."""
+
+    def __init__(self, feature, threshold, esquerda, direita, valor, raizes,
+                 profundidade: int, learning_rate: float, classes,
+                 features: List[str], init_raw: Optional[float], modelo=None,
+                 init_do_modelo: bool = False, peso=None):
+        self.feature = feature
+        self.threshold = threshold
+        self.esquerda = esquerda
+        self.direita = direita
+        self.valor = valor
+        self.raizes = raizes
+        # Soma dos pesos das amostras de treino em cada nó (só a explicação usa)
+        self.peso = peso
+        self.profundidade = profundidade
+        self.learning_rate = learning_rate
+        self.classes_ = classes
+        self.feature_names_in_ = np.asarray(features, dtype=object)
+        self._features = list(features)
+
+        # Init constante (DummyClassifier "prior", o padrão). Se o modelo usar
+        # outro init, o valor inicial é pedido ao próprio modelo a cada lote.
+        self.init_raw = init_raw
+        self._init_do_modelo = init_do_modelo
+
+        # Modelo sklearn original (opcional): usado para lotes grandes
+        self._modelo = modelo
+
+        # learning_rate * valor calculado uma vez: o produto é o mesmo que o
+        # sklearn calcula a cada predição, então a soma continua idêntica.
+        self._valor_escalado = learning_rate * valor
+
+    # --------------------------------------------------
+    # COMPILAÇÃO
+    # --------------------------------------------------
+    @classmethod
+    def de_modelo(cls, model, features: Optional[List[str]] = None) -> "ScorerCompilado":
+        """Compila um GradientBoostingClassifier binário já treinado."""
+        estimators = getattr(model, "estimators_", None)
+        if estimators is None or getattr(model, "n_trees_per_iteration_", 1) != 1:
+            raise ValueError("Scorer compilado suporta apenas GradientBoostingClassifier binário")
+
+        if features is None:
+            features = list(getattr(model, "feature_names_in_", []))
+
+        arvores = [est.tree_ for est in estimators[:, 0]]
+        total_nos = sum(t.node_count for t in arvores)
+
+        feature = np.zeros(total_nos, dtype=np.int64)
+        threshold = np.zeros(total_nos, dtype=np.float64)
+        esquerda = np.zeros(total_nos, dtype=np.int64)
+        direita = np.zeros(total_nos, dtype=np.int64)
+        valor = np.zeros(total_nos, dtype=np.float64)
+        peso = np.zeros(total_nos, dtype=np.float64)
+        raizes = np.zeros(len(arvores), dtype=np.int64)
+
+        offset = 0
+        for i, t in enumerate(arvores):
+            n = t.node_count
+            nos = np.arange(offset, offset + n)
+            folha = t.children_left == TREE_LEAF
+
+            raizes[i] = offset
+            feature[offset:offset + n] = np.where(folha, 0, t.feature)
+            threshold[offset:offset + n] = t.threshold
+            # Folhas apontam para si mesmas: dá para descer sempre `profundidade` passos
+            esquerda[offset:offset + n] = np.where(folha, nos, t.children_left + offset)
+            direita[offset:offset + n] = np.where(folha, nos, t.children_right + offset)
+            valor[offset:offset + n] = t.value[:, 0, 0]
+            peso[offset:offset + n] = t.weighted_n_node_samples
+            offset += n
+
+        profundidade = max(t.max_depth for t in arvores)
+
+        init_raw = None
+        if model.init_ == "zero":
+            init_raw = 0.0
+        elif type(model.init_).__name__ == "DummyClassifier":
+            n_features = model.n_features_in_
+            init_raw = float(model._raw_predict_init(np.zeros((1, n_features), dtype=np.float32))[0, 0])
+
+        return cls(
+            feature, threshold, esquerda, direita, valor, raizes,
+            profundidade, float(model.learning_rate), np.asarray(model.classes_),
+            features, init_raw, model, init_do_modelo=init_raw is None, peso=peso
+        )
+
+    # --------------------------------------------------
+    # PREDIÇÃO
+    # --------------------------------------------------
+    def _matriz(self, X) -> np.ndarray:
+        """Entrada como float32 C-contígua, na ordem das features do modelo."""
+        if hasattr(X, "columns"):
+            if len(self._features) and list(X.columns) != self._features:
+                X = X[self._features]
+            X = X.to_numpy()
+        return np.ascontiguousarray(X, dtype=np.float32)
+
+    def folhas(self, X32: np.ndarray) -> np.ndarray:
+        """Índice global da folha atingida em cada árvore: shape (n_linhas, n_arvores)."""
+        n = X32.shape[0]
+        nos = np.broadcast_to(self.raizes, (n, len(self.raizes))).copy()
+        linhas = np.arange(n)[:, None]
+
+        for _ in range(self.profundidade):
+            vai_esquerda = X32[linhas, self.feature[nos]] <= self.threshold[nos]
+            nos = np.where(vai_esquerda, self.esquerda[nos], self.direita[nos])
+
+        return nos
+
+    def decision_function(self, X) -> np.ndarray:
+        X32 = self._matriz(X)
+        n = X32.shape[0]
+
+        if self._modelo is not None and n > LIMITE_LINHAS_ARRAYS:
+            with warnings.catch_warnings():
+                # X32 já está na ordem das features, só sem os nomes
+                warnings.simplefilter("ignore", UserWarning)
+                return self._modelo.decision_function(X32)
+
+        if self._init_do_modelo:
+            inicio = self._modelo._raw_predict_init(X32).astype(np.float64)
+        else:
+            inicio = np.full((n, 1), self.init_raw, dtype=np.float64)
+
+        # Soma sequencial (accumulate), árvore por árvore, igual ao predict_stages
+        termos = np.concatenate([inicio, self._valor_escalado[self.folhas(X32)]], axis=1)
+        return np.add.accumulate(termos, axis=1)[:, -1]
+
+    def predict_proba(self, X) -> np.ndarray:
+        raw = self.decision_function(X)
+        proba = np.empty((raw.shape[0], 2), dtype=np.float64)
+        proba[:, 1] = expit(raw)
+        proba[:, 0] = 1 - proba[:, 1]
+        return proba
@@ -0,0 +1,256 @@
+"""
+TABELA DE SCORES PRÉ-CALCULADOS
+
+Pontua a base de clientes inteira numa única passada vetorizada e guarda
+o resultado por ID_CLIENTE junto com a versão do modelo que o produziu.
+
+Atualização incremental: a tabela guarda as features usadas em cada
+score; quando a base muda (ex.: salvar_historico), só as linhas cujas
+features mudaram (ou IDs novos) passam pelo modelo de novo.
+
+Job completo (na pasta ProjetoMaxx):
+    python tabela_scores.py
+"""
+
+import os
+import tempfile
+import threading
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from base_clientes import BaseClientes
+from pipeline_features import normalizar_id
+
+
+class TabelaScores:
+
+    def __init__(self, caminho: str, base: BaseClientes, features: List[str],
+                 prever_lote: Callable, versao_modelo: str):
+        """
+        prever_lote(X, dias_desde_ultimo) -> lista de dicts no formato do /predict
+        """
+        self.caminho = caminho
+        self.base = base
+        self.features = list(features)
+        self.prever_lote = prever_lote
+        self.versao_modelo = versao_modelo
+
+        self._lock = threading.Lock()
+        self._geracao_base = None
+
+        self.ids: List[str] = []
+        self.X = np.zeros((0, len(self.features)))
+        self.percentual = np.zeros(0)
+        self.nivel = np.zeros(0, dtype=object)
+        self.usou_modelo = np.zeros(0, dtype=bool)
+        self.motivo = np.zeros(0, dtype=object)
+        self.calculado_em = np.zeros(0, dtype=object)
+        self._indice: Dict[str, int] = {}
+
+    # --------------------------------------------------
+    # PERSISTÊNCIA
+    # --------------------------------------------------
+    def carregar(self) -> bool:
+        """Carrega a tabela salva, se existir e for da mesma versão do modelo."""
+        if not os.path.exists(self.caminho):
+            return False
+
+        df = pd.read_csv(self.caminho, dtype={"ID_CLIENTE": str, "motivo": str})
+        if df.empty or (df["versao_modelo"] != self.versao_modelo).any():
+            print("Tabela de scores descartada (versão do modelo diferente)")
+            return False
+
+        with self._lock:
+            self.ids = [normalizar_id(v) for v in df["ID_CLIENTE"].tolist()]
+            self.X = df.reindex(columns=self.features, fill_value=0).to_numpy(dtype=np.float64)
+            self.percentual = df["percentual_churn"].to_numpy(dtype=np.float64)
+            self.nivel = df["nivel_risco"].to_numpy(dtype=object)
+            self.usou_modelo = df["usou_modelo"].astype(bool).to_numpy()
+            self.motivo = df["motivo"].where(df["motivo"].notna(), None).to_numpy(dtype=object)
+            self.calculado_em = df["calculado_em"].to_numpy(dtype=object)
+            self._indice = self._montar_indice(self.ids)
+            self._geracao_base = None
+
+        print(f"Tabela de scores carregada: {len(self.ids)} clientes (modelo {self.versao_modelo})")
+        return True
+
+    def salvar(self):
+        with self._lock:
+            df = pd.DataFrame(self.X, columns=self.features)
+            df.insert(0, "ID_CLIENTE", self.ids)
+            df["percentual_churn"] = self.percentual
+            df["nivel_risco"] = self.nivel
+            df["usou_modelo"] = self.usou_modelo
+            df["motivo"] = self.motivo
+            df["versao_modelo"] = self.versao_modelo
+            df["calculado_em"] = self.calculado_em
+
+        # Temporário próprio deste processo: workers gravando juntos não se atropelam
+        pasta, nome = os.path.split(os.path.abspath(self.caminho))
+        fd, tmp = tempfile.mkstemp(prefix=nome + ".", suffix=".tmp", dir=pasta)
+        try:
+            with os.fdopen(fd, "w", newline="") as f:
+                df.to_csv(f, index=False)
+            os.replace(tmp, self.caminho)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        print(f"Tabela de scores salva em: {self.caminho}")
+
+    # --------------------------------------------------
+    # ATUALIZAÇÃO
+    # --------------------------------------------------
+    @staticmethod
+    def _montar_indice(ids: List[str]) -> Dict[str, int]:
+        indice: Dict[str, int] = {}
+        for i, id_cliente in enumerate(ids):
+            indice.setdefault(id_cliente, i)
+        return indice
+
+    def atualizar(self, forcar: bool = False) -> int:
+        """Sincroniza com a base; retorna quantas linhas foram repontuadas."""
+        if not forcar and self.ids and self._geracao_base == self.base.geracao_atual():
+            return 0
+
+        with self._lock:
+            # Features + DAYS_SINCE_LAST do MESMO snapshot da base
+            ids, M = self.base.matriz_completa(self.features + ["DAYS_SINCE_LAST"])
+            X, dias = M[:, :-1], M[:, -1]
+            geracao = self.base.geracao
+
+            # Posição de cada cliente na tabela anterior (-1 = novo)
+            pos_antiga = np.fromiter((self._indice.get(i, -1) for i in ids), dtype=np.int64, count=len(ids))
+            existe = pos_antiga >= 0
+
+            if forcar or not self.ids:
+                recalcular = np.ones(len(ids), dtype=bool)
+            else:
+                recalcular = ~existe
+                if existe.any():
+                    antigas = self.X[pos_antiga[existe]]
+                    recalcular[existe] = np.any(antigas != X[existe], axis=1)
+
+            percentual = np.zeros(len(ids))
+            nivel = np.empty(len(ids), dtype=object)
+            usou_modelo = np.zeros(len(ids), dtype=bool)
+            motivo = np.empty(len(ids), dtype=object)
+            calculado_em = np.empty(len(ids), dtype=object)
+
+            manter = ~recalcular
+            if manter.any():
+                origem = pos_antiga[manter]
+                percentual[manter] = self.percentual[origem]
+                nivel[manter] = self.nivel[origem]
+                usou_modelo[manter] = self.usou_modelo[origem]
+                motivo[manter] = self.motivo[origem]
+                calculado_em[manter] = self.calculado_em[origem]
+
+            idx = np.flatnonzero(recalcular)
+            if len(idx):
+                resultados = self.prever_lote(X[idx], dias[idx])
+                agora = datetime.now().isoformat(timespec="seconds")
+                for i, res in zip(idx, resultados):
+                    percentual[i] = res["percentual_churn"]
+                    nivel[i] = res["nivel_risco"]
+                    usou_modelo[i] = res["usou_modelo"]
+                    motivo[i] = res.get("motivo")
+                    calculado_em[i] = agora
+
+            self.ids = list(ids)
+            self.X = X
+            self.percentual = percentual
+            self.nivel = nivel
+            self.usou_modelo = usou_modelo
+            self.motivo = motivo
+            self.calculado_em = calculado_em
+            self._indice = self._montar_indice(self.ids)
+            self._geracao_base = geracao
+
+        if len(idx):
+            print(f"Tabela de scores: {len(idx)} de {len(ids)} clientes repontuados")
+        return len(idx)
+
+    def trocar_modelo(self, versao_modelo: str, salvar: bool = True) -> int:
+        """Novo modelo servido: repontua a base inteira (e grava a tabela, se `salvar`)."""
+        anterior, self.versao_modelo = self.versao_modelo, versao_modelo
+        try:
+            n = self.atualizar(forcar=True)
+        except Exception:
+            # atualizar() só troca as arrays no fim: a tabela continua a do modelo anterior
+            self.versao_modelo = anterior
+            raise
+        if salvar:
+            self.salvar()
+        return n
+
+    # --------------------------------------------------
+    # CONSULTAS
+    # --------------------------------------------------
+    def _registro(self, i: int) -> dict:
+        registro = {
+            "ID_CLIENTE": self.ids[i],
+            "percentual_churn": float(self.percentual[i]),
+            "nivel_risco": self.nivel[i],
+            "usou_modelo": bool(self.usou_modelo[i]),
+            "versao_modelo": self.versao_modelo,
+            "calculado_em": self.calculado_em[i],
+        }
+        if self.motivo[i] is not None:
+            registro["motivo"] = self.motivo[i]
+        return registro
+
+    def buscar(self, id_cliente) -> Optional[dict]:
+        self.atualizar()
+        with self._lock:
+            i = self._indice.get(normalizar_id(id_cliente))
+            return None if i is None else self._registro(i)
+
+    def top_risco(self, n: int = 50, nivel: Optional[str] = None) -> List[dict]:
+        """Os N clientes de maior percentual de churn (maior primeiro), sem rodar o modelo."""
+        self.atualizar()
+        with self._lock:
+            percentual = self.percentual
+            candidatos = np.arange(len(percentual))
+            if nivel:
+                candidatos = candidatos[self.nivel == nivel.upper()]
+
+            n = max(0, min(n, len(candidatos)))
+            if n == 0:
+                return []
+
+            # argpartition separa o top-N em O(N); só ele é ordenado
+            valores = percentual[candidatos]
+            top = candidatos[np.argpartition(-valores, n - 1)[:n]]
+            top = top[np.argsort(-percentual[top], kind="stable")]
+            return [self._registro(i) for i in top]
+
+
+# ======================================================
+# MAIN (job de pontuação completa)
+# ======================================================
+
+if __name__ == "__main__":
+    # Sem importar a API (o import dela já carrega a base e pontua tudo)
+    import pipeline_features
+    import pontuar_base
+
+    servido = pontuar_base.carregar_modelo()
+
+    def prever_lote(X, dias_desde_ultimo):
+        zeradas, inativo_1_ano, usar_modelo = pipeline_features.aplicar_regras(X, dias_desde_ultimo)
+        probas = np.zeros(X.shape[0], dtype=np.float64)
+        if usar_modelo.any():
+            entrada = X[usar_modelo] if servido.compilado else pd.DataFrame(X[usar_modelo], columns=servido.features)
+            probas[usar_modelo] = servido.scorer.predict_proba(entrada)[:, servido.idx_churn]
+        return pipeline_features.resultados(zeradas, inativo_1_ano, pipeline_features.percentuais(probas))
+
+    caminho = os.path.join(os.path.dirname(os.path.abspath(__file__)), "scores_clientes.csv")
+    tabela = TabelaScores(caminho, BaseClientes(pontuar_base.DATABASE_PATH), servido.features,
+                          prever_lote, servido.versao)
+    n = tabela.atualizar(forcar=True)
+    tabela.salvar()
+    print(f"✅ {n} clientes pontuados com o modelo {tabela.versao_modelo}")
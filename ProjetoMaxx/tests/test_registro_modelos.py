@@ -0,0 +1,31 @@
+"""
+Registro de modelos: artefatos da versão (perfil, pré-filtro) lidos do
+registro informado, não do modelos/ padrão.
+
+Uso (na pasta ProjetoMaxx):
+    python -m pytest -q tests
+"""
+
+import json
+import os
+import sys
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+import registro_modelos  # noqa: E402
+
+MODELO_PADRAO = os.path.join(BASE_DIR, "gradient_boosting_model (1).joblib")
+
+
+def test_carregar_versao_le_perfil_do_registro_informado(tmp_path):
+    pasta = str(tmp_path / "modelos")
+    versao = registro_modelos.registrar(MODELO_PADRAO, ativar=True, pasta=pasta)
+    perfil = {"versao_modelo": versao, "features": {}}
+    with open(registro_modelos.caminho_perfil(versao, pasta), "w", encoding="utf-8") as f:
+        json.dump(perfil, f)
+
+    servido = registro_modelos.carregar(registro_modelos.caminho_versao(versao, pasta), pasta=pasta)
+
+    assert servido.perfil == perfil
+    assert servido.prefiltro is None
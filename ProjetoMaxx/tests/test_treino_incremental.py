@@ -0,0 +1,67 @@
+"""
+Treino incremental: publicação no registro sem ativar (a não ser com ativar=True)
+e holdout estratificado.
+
+Uso (na pasta ProjetoMaxx):
+    python -m pytest -q tests
+"""
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+import registro_modelos  # noqa: E402
+import treino_incremental  # noqa: E402
+from cache_dados import ler_excel  # noqa: E402
+from historico import COLUNAS_FEATURES, HistoricoAnalises  # noqa: E402
+
+MODELO_PADRAO = os.path.join(BASE_DIR, "gradient_boosting_model (1).joblib")
+
+
+@pytest.fixture(params=["com_versao_ativa", "registro_vazio"])
+def registro(request, tmp_path, monkeypatch):
+    """Registro e histórico temporários; com versão ativa (o modelo padrão) ou vazio."""
+    monkeypatch.chdir(BASE_DIR)
+    pasta = str(tmp_path / "modelos")
+    monkeypatch.setattr(registro_modelos, "REGISTRO_DIR", pasta)
+    ativa = None
+    if request.param == "com_versao_ativa":
+        ativa = registro_modelos.registrar(MODELO_PADRAO, ativar=True, pasta=pasta)
+
+    df, _ = ler_excel(os.path.join(BASE_DIR, "train (2).xlsx"))
+    historico = HistoricoAnalises(str(tmp_path / "historico.db"))
+    for i, (_, r) in enumerate(df.iloc[:200].iterrows()):
+        dados = {f: r[f] for f in COLUNAS_FEATURES}
+        dados.update(ID_CLIENTE=str(r["ID_CLIENTE"]), DATA_HORA=f"2026-02-{1 + i % 28:02d}T10:00:00Z",
+                     TARGET=int(r["TARGET"]))
+        historico.registrar(dados)
+    return pasta, ativa, historico.caminho
+
+
+@pytest.mark.parametrize("ativar", [False, True])
+def test_rodar_so_ativa_quando_pedido(registro, ativar):
+    pasta, ativa, caminho_historico = registro
+
+    # Tolerância larga: o portão aprova e a versão nova é registrada
+    resumo = treino_incremental.rodar(arvores=2, tolerancia=1.0, ativar=ativar,
+                                      caminho_historico=caminho_historico)
+
+    assert resumo["status"] == "registrado"
+    assert resumo["versao_nova"] in registro_modelos.ler_manifesto(pasta)["versoes"]
+    esperada = resumo["versao_nova"] if ativar else ativa
+    assert registro_modelos.versao_ativa(pasta) == esperada
+
+
+def test_holdout_tem_as_duas_classes():
+    y = np.array([0] * 60 + [1] * 2)
+    treino, holdout = treino_incremental.dividir_holdout(y)
+
+    assert set(y[holdout]) == {0, 1}
+    assert set(y[treino]) == {0, 1}
+    assert len(np.intersect1d(treino, holdout)) == 0
+    assert len(treino) + len(holdout) == len(y)
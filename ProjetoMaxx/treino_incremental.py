@@ -0,0 +1,397 @@
+"""
+TREINO INCREMENTAL A PARTIR DO HISTÓRICO DE ANÁLISES
+
+O /salvar_historico grava cada análise no historico.db. Quando o payload
+traz o desfecho real do cliente (TARGET 0/1, ex.: depois do contato de
+retenção), a análise vira um exemplo rotulado; análises sem TARGET (só a
+previsão do próprio modelo) nunca viram rótulo. Cada rodada:
+
+- lê só as análises novas (id acima do último lido, em estado.json)
+- deduplica por cliente e dia (fica a última análise do dia) e ignora
+  chaves que já estão no conjunto acumulado
+- continua o boosting do modelo ativo (warm start): ARVORES_POR_RODADA
+  árvores novas, ajustadas só nas linhas novas (menos um holdout)
+- compara a AUC do modelo atual e do candidato no test (2).xlsx e no
+  holdout das linhas novas; só registra a nova versão se nenhuma das duas
+  cair mais que TOLERANCIA_AUC (holdout sem as duas classes não tem AUC:
+  o resumo marca o portão como só "test")
+- guarda as linhas novas no conjunto acumulado (modelos/incremental/, uma
+  parte .npz por rodada), que o `treino_m.py --com-historico` soma ao treino
+
+O custo de uma rodada acompanha o tamanho do delta (mais o test, fixo),
+não o do treino inteiro. Com menos de MINIMO_LINHAS novas (ou uma classe
+só), nada é consumido e as linhas esperam a próxima rodada. Passando de
+MAXIMO_ARVORES, retreine do zero com o treino_m.py.
+
+Uso (na pasta ProjetoMaxx):
+    python treino_incremental.py rodar [--ativar] [--arvores 20] [--minimo 50]
+    python treino_incremental.py estado
+"""
+
+import argparse
+import copy
+import glob
+import json
+import os
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+TEST_PATH = os.path.join(BASE_DIR, "test (2).xlsx")
+HISTORICO_DB_PATH = os.path.join(BASE_DIR, "historico.db")
+
+ARVORES_POR_RODADA = 20
+MAXIMO_ARVORES = 400
+MINIMO_LINHAS = 50
+FRACAO_HOLDOUT = 0.2
+# Queda de AUC aceita (test e holdout) para registrar o candidato
+TOLERANCIA_AUC = 0.002
+RANDOM_STATE = 42
+
+# Parâmetro que conta as iterações do boosting em cada backend do treino_m.py
+_PARAM_ITERACOES = {
+    "GradientBoostingClassifier": "n_estimators",
+    "HistGradientBoostingClassifier": "max_iter",
+}
+
+
+# ======================================================
+# CONJUNTO ACUMULADO (PARTES .npz + estado.json)
+# ======================================================
+
+def pasta_incremental() -> str:
+    import registro_modelos
+
+    return os.path.join(registro_modelos.REGISTRO_DIR, "incremental")
+
+
+def ler_estado(pasta: str) -> dict:
+    try:
+        with open(os.path.join(pasta, "estado.json"), encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {"ultimo_id": 0, "rodadas": []}
+
+
+def _gravar_estado(estado: dict, pasta: str):
+    destino = os.path.join(pasta, "estado.json")
+    with open(destino + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(estado, f, indent=1, ensure_ascii=False)
+    os.replace(destino + ".tmp", destino)
+
+
+def _partes(pasta: str) -> List[str]:
+    return sorted(glob.glob(os.path.join(pasta, "parte_*.npz")))
+
+
+def chaves_acumuladas(pasta: str) -> Set[str]:
+    """Chaves cliente|dia já no conjunto (o npz lê só a array de chaves)."""
+    chaves: Set[str] = set()
+    for parte in _partes(pasta):
+        with np.load(parte) as dados:
+            chaves.update(dados["chaves"].tolist())
+    return chaves
+
+
+def carregar_conjunto(features: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """Todas as linhas acumuladas (X nas colunas de `features`, y)."""
+    pasta = pasta_incremental()
+    blocos_X, blocos_y = [], []
+    for parte in _partes(pasta):
+        with np.load(parte) as dados:
+            colunas = dados["features"].tolist()
+            X = np.zeros((len(dados["y"]), len(features)), dtype=np.float64)
+            for j, f in enumerate(features):
+                if f in colunas:
+                    X[:, j] = dados["X"][:, colunas.index(f)]
+            blocos_X.append(X)
+            blocos_y.append(dados["y"].astype(np.int64))
+    if not blocos_y:
+        return np.zeros((0, len(features)), dtype=np.float64), np.zeros(0, dtype=np.int64)
+    return np.vstack(blocos_X), np.concatenate(blocos_y)
+
+
+def _salvar_parte(pasta: str, ultimo_id: int, X: np.ndarray, y: np.ndarray, chaves: List[str],
+                  features: List[str]) -> str:
+    os.makedirs(pasta, exist_ok=True)
+    destino = os.path.join(pasta, f"parte_{ultimo_id:010d}.npz")
+    with open(destino + ".tmp", "wb") as f:
+        np.savez(f, X=X, y=y.astype(np.int8), chaves=np.array(chaves, dtype=str),
+                 features=np.array(features, dtype=str))
+    os.replace(destino + ".tmp", destino)
+    return destino
+
+
+# ======================================================
+# DELTA DO HISTÓRICO
+# ======================================================
+
+def _rotulo(valor) -> Optional[int]:
+    try:
+        numero = float(str(valor).strip().replace(",", "."))
+    except (TypeError, ValueError):
+        return None
+    return int(numero) if numero in (0.0, 1.0) else None
+
+
+def ler_delta(historico, ultimo_id: int, features: List[str], conhecidas: Set[str]) -> dict:
+    """Linhas rotuladas novas, deduplicadas por cliente|dia (a última do dia vence)."""
+    from historico import COLUNA_ROTULO
+
+    lido = historico.rotulados_desde(ultimo_id)
+    por_chave: Dict[str, dict] = {}
+    invalidos = 0
+    for linha in lido["linhas"]:
+        if _rotulo(linha.get(COLUNA_ROTULO)) is None:
+            invalidos += 1
+            continue
+        # Em ordem de data: uma análise posterior do mesmo dia substitui a anterior
+        por_chave[f"{linha['ID_CLIENTE']}|{linha['DATA_HORA'][:10]}"] = linha
+
+    chaves = [c for c in por_chave if c not in conhecidas]
+    X = np.array([[float(por_chave[c].get(f) or 0.0) for f in features] for c in chaves],
+                 dtype=np.float64).reshape(len(chaves), len(features))
+    y = np.array([_rotulo(por_chave[c][COLUNA_ROTULO]) for c in chaves], dtype=np.int64)
+    return {
+        "X": X, "y": y, "chaves": chaves, "maior_id": lido["maior_id"],
+        "lidas": len(lido["linhas"]), "invalidas": invalidos,
+        "duplicadas": len(lido["linhas"]) - invalidos - len(por_chave),
+        "ja_conhecidas": len(por_chave) - len(chaves),
+    }
+
+
+def dividir_holdout(y: np.ndarray, fracao: float = FRACAO_HOLDOUT,
+                    random_state: int = RANDOM_STATE) -> Tuple[np.ndarray, np.ndarray]:
+    """Índices (treino, holdout), estratificado; com 2+ linhas, a classe tem ao menos uma em cada lado."""
+    rng = np.random.default_rng(random_state)
+    treino, holdout = [], []
+    for classe in np.unique(y):
+        idx = rng.permutation(np.flatnonzero(y == classe))
+        n = min(max(int(round(len(idx) * fracao)), 1), len(idx) - 1) if len(idx) >= 2 else 0
+        holdout.append(idx[:n])
+        treino.append(idx[n:])
+    return np.sort(np.concatenate(treino)), np.sort(np.concatenate(holdout))
+
+
+# ======================================================
+# WARM START + PORTÃO DE AUC
+# ======================================================
+
+def iteracoes(model) -> int:
+    if hasattr(model, "estimators_"):
+        return len(model.estimators_)
+    return int(model.n_iter_)
+
+
+def continuar_boosting(model, X, y: np.ndarray, arvores: int = ARVORES_POR_RODADA):
+    """Cópia do modelo com `arvores` iterações a mais, ajustadas só em (X, y)."""
+    nome = type(model).__name__
+    if nome not in _PARAM_ITERACOES:
+        raise ValueError(f"Warm start não suportado para {nome} (use o treino_m.py)")
+
+    candidato = copy.deepcopy(model)
+    params = {"warm_start": True, _PARAM_ITERACOES[nome]: iteracoes(model) + arvores}
+    if nome == "HistGradientBoostingClassifier":
+        # O delta é pequeno demais para separar outra validação interna
+        params["early_stopping"] = False
+    candidato.set_params(**params)
+    candidato.fit(X, y)
+    # O artefato publicado se comporta como um modelo treinado do zero num fit() futuro
+    candidato.set_params(warm_start=False)
+    return candidato
+
+
+def _auc(model, X, y: np.ndarray, idx_churn: int) -> Optional[float]:
+    from sklearn.metrics import roc_auc_score
+
+    if len(np.unique(y)) < 2:
+        return None
+    return float(roc_auc_score(y, model.predict_proba(X)[:, idx_churn]))
+
+
+def _matriz_teste(features: List[str]):
+    import pandas as pd
+    from cache_dados import ler_excel
+
+    df, _ = ler_excel(TEST_PATH)
+    X = df.reindex(columns=features, fill_value=0).fillna(0)
+    return pd.DataFrame(X.to_numpy(dtype=np.float64), columns=features), df["TARGET"].astype(int).to_numpy()
+
+
+def _comparar(atual: Optional[float], candidato: Optional[float], tolerancia: float) -> dict:
+    """AUC atual x candidato; sem AUC (uma classe só ou vazio) fica avaliado=False."""
+    avaliado = atual is not None and candidato is not None
+    return {"atual": atual, "candidato": candidato, "avaliado": avaliado,
+            "aprovado": avaliado and candidato >= atual - tolerancia}
+
+
+# ======================================================
+# RODADA
+# ======================================================
+
+def _carregar_servido():
+    import registro_modelos
+
+    pasta = registro_modelos.REGISTRO_DIR
+    versao = registro_modelos.versao_ativa(pasta)
+    if versao:
+        return registro_modelos.carregar(registro_modelos.caminho_versao(versao, pasta), pasta=pasta)
+    return registro_modelos.carregar(os.path.join(BASE_DIR, "gradient_boosting_model (1).joblib"), pasta=pasta)
+
+
+def _publicar(servido, candidato, metricas: dict, params: dict, X_test, ativar: bool, pasta: str) -> str:
+    import joblib
+    import monitor_drift
+    import registro_modelos
+
+    os.makedirs(pasta, exist_ok=True)
+    temporario = os.path.join(pasta, f"incremental_{servido.versao}.joblib")
+    joblib.dump({"model": candidato, "features": servido.features}, temporario)
+    try:
+        versao = registro_modelos.registrar(temporario, metricas=metricas, params=params, ativar=ativar,
+                                            pasta=registro_modelos.REGISTRO_DIR)
+    finally:
+        os.remove(temporario)
+
+    # As features de referência não mudam com um delta pequeno; só as predições
+    if servido.perfil is not None:
+        idx = list(candidato.classes_).index(1)
+        novas = monitor_drift.gerar_perfil(X_test.to_numpy(), servido.features,
+                                           candidato.predict_proba(X_test)[:, idx], versao)
+        monitor_drift.salvar_perfil(dict(servido.perfil, predicoes=novas["predicoes"],
+                                         gerado_em=novas["gerado_em"]), versao)
+    return versao
+
+
+def rodar(arvores: int = ARVORES_POR_RODADA, minimo: int = MINIMO_LINHAS,
+          tolerancia: float = TOLERANCIA_AUC, ativar: bool = False,
+          caminho_historico: str = HISTORICO_DB_PATH) -> dict:
+    """Uma rodada incremental; retorna o resumo (também gravado em estado.json)."""
+    import pandas as pd
+    from historico import HistoricoAnalises
+
+    t0 = time.perf_counter()
+    pasta = pasta_incremental()
+    estado = ler_estado(pasta)
+    servido = _carregar_servido()
+    features = servido.features
+
+    delta = ler_delta(HistoricoAnalises(caminho_historico), estado["ultimo_id"], features,
+                      chaves_acumuladas(pasta))
+    resumo = {
+        "data": datetime.now().isoformat(timespec="seconds"),
+        "versao_base": servido.versao,
+        "ids": [estado["ultimo_id"], delta["maior_id"]],
+        "linhas_novas": len(delta["y"]),
+        "descartadas": {k: delta[k] for k in ("invalidas", "duplicadas", "ja_conhecidas")},
+        "tempos_s": {"carga": round(time.perf_counter() - t0, 3)},
+    }
+    y = delta["y"]
+    if len(y) < minimo or len(np.unique(y)) < 2:
+        resumo["status"] = "aguardando"
+        resumo["motivo"] = f"{len(y)} linhas novas rotuladas (mínimo {minimo}, as duas classes)"
+        return resumo
+    if iteracoes(servido.model) + arvores > MAXIMO_ARVORES:
+        resumo["status"] = "aguardando"
+        resumo["motivo"] = f"modelo já tem {iteracoes(servido.model)} iterações: retreine com o treino_m.py"
+        return resumo
+
+    X = pd.DataFrame(delta["X"], columns=features)
+    i_treino, i_holdout = dividir_holdout(y)
+    if len(np.unique(y[i_treino])) < 2:
+        i_treino, i_holdout = np.arange(len(y)), np.array([], dtype=np.int64)
+
+    t1 = time.perf_counter()
+    candidato = continuar_boosting(servido.model, X.iloc[i_treino], y[i_treino], arvores)
+    resumo["tempos_s"]["treino"] = round(time.perf_counter() - t1, 3)
+
+    t1 = time.perf_counter()
+    idx = list(servido.model.classes_).index(1)
+    X_test, y_test = _matriz_teste(features)
+    auc = {
+        "test": _comparar(_auc(servido.model, X_test, y_test, idx), _auc(candidato, X_test, y_test, idx), tolerancia),
+        "holdout": _comparar(_auc(servido.model, X.iloc[i_holdout], y[i_holdout], idx),
+                             _auc(candidato, X.iloc[i_holdout], y[i_holdout], idx), tolerancia),
+    }
+    resumo["tempos_s"]["avaliacao"] = round(time.perf_counter() - t1, 3)
+    resumo["auc"] = auc
+    resumo["linhas_treino"], resumo["linhas_holdout"] = len(i_treino), len(i_holdout)
+
+    # O test é obrigatório; o holdout só entra no portão quando tem AUC
+    resumo["portao"] = "test+holdout" if auc["holdout"]["avaliado"] else "test"
+    aprovado = auc["test"]["aprovado"] and (auc["holdout"]["aprovado"] or not auc["holdout"]["avaliado"])
+    if aprovado:
+        metricas = {"AUC": auc["test"]["candidato"], "AUC_holdout_incremental": auc["holdout"]["candidato"]}
+        params = {k: v for k, v in candidato.get_params().items()
+                  if isinstance(v, (int, float, str, bool)) or v is None}
+        params.update(versao_base=servido.versao, linhas_incrementais=len(y))
+        resumo["versao_nova"] = _publicar(servido, candidato, metricas, params, X_test, ativar, pasta)
+    resumo["status"] = "registrado" if aprovado else "rejeitado"
+
+    # Aprovadas ou não, as linhas entram no conjunto (e não são relidas)
+    _salvar_parte(pasta, delta["maior_id"], delta["X"], y, delta["chaves"], features)
+    resumo["tempos_s"]["total"] = round(time.perf_counter() - t0, 3)
+    estado["ultimo_id"] = delta["maior_id"]
+    estado["rodadas"].append(resumo)
+    _gravar_estado(estado, pasta)
+    return resumo
+
+
+# ======================================================
+# CLI
+# ======================================================
+
+def _fmt(v: Optional[float]) -> str:
+    return "-" if v is None else f"{v:.4f}"
+
+
+def _imprimir_rodada(r: dict):
+    print(f"\n📍 Base {r['versao_base']}: {r['linhas_novas']} linhas novas rotuladas "
+          f"(análises {r['ids'][0] + 1}..{r['ids'][1]}; descartadas {r['descartadas']})")
+    if r["status"] == "aguardando":
+        print(f"   ⏳ Nada treinado: {r['motivo']}")
+        return
+    print(f"   ✓ Treino em {r['linhas_treino']} linhas, holdout {r['linhas_holdout']}")
+    for nome, a in r["auc"].items():
+        print(f"   AUC {nome:<8} atual {_fmt(a['atual'])}   candidato {_fmt(a['candidato'])}"
+              + ("" if a["avaliado"] else "   (sem as duas classes: fora do portão)"))
+    print(f"   Portão: {r['portao']}")
+    t = r["tempos_s"]
+    print(f"   ⏱  carga {t['carga']}s, treino {t['treino']}s, avaliação {t['avaliacao']}s, total {t['total']}s")
+    if r["status"] == "registrado":
+        print(f"💾 Registrado como versão {r['versao_nova']} "
+              f"(ativar na API: POST /admin/modelo ou python registro_modelos.py ativar {r['versao_nova']})")
+        print("   Sem pré-filtro para a nova versão: python dois_estagios.py treinar (depois de ativar)")
+    else:
+        print("   ✗ AUC caiu: nada registrado (as linhas ficam no conjunto para o treino completo)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Treino incremental a partir do historico.db")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    p_rodar = sub.add_parser("rodar")
+    p_rodar.add_argument("--arvores", type=int, default=ARVORES_POR_RODADA)
+    p_rodar.add_argument("--minimo", type=int, default=MINIMO_LINHAS)
+    p_rodar.add_argument("--tolerancia-auc", type=float, default=TOLERANCIA_AUC)
+    p_rodar.add_argument("--ativar", action="store_true", help="Ativa a nova versão se for registrada")
+    sub.add_parser("estado")
+    args = parser.parse_args()
+
+    if args.comando == "rodar":
+        _imprimir_rodada(rodar(args.arvores, args.minimo, args.tolerancia_auc, args.ativar))
+        return
+
+    pasta = pasta_incremental()
+    estado = ler_estado(pasta)
+    print(f"Última análise lida: {estado['ultimo_id']}   linhas acumuladas: {len(chaves_acumuladas(pasta))}"
+          f"   partes: {len(_partes(pasta))}")
+    for r in estado["rodadas"][-10:]:
+        print(f"   {r['data']}  {r['status']:<10} base {r['versao_base']}  {r['linhas_novas']} linhas"
+              + (f"  -> {r['versao_nova']}" if r.get("versao_nova") else ""))
+
+
+if __name__ == "__main__":
+    main()
@@ -5,21 +5,41 @@ Base:
 - train (2).xlsx
 - test (2).xlsx
 
+Uso:
+    python treino_m.py                      (parâmetros fixos de MODEL_PARAMS)
+    python treino_m.py --busca [--jobs N]   (busca de hiperparâmetros em paralelo)
+    python treino_m.py --backend hist       (HistGradientBoosting, com early stopping)
+
 Saída:
 - gradient_boosting_model (1).joblib
+- leaderboard_busca.csv (só no modo --busca)
+- modelos/<versao>.joblib + modelos/manifest.json (registro de versões; a API
+  só passa a servir a nova versão quando ela for ativada)
+- modelos/<versao>.prefiltro.joblib (pré-filtro da predição em dois estágios,
+  ver dois_estagios.py; --sem-prefiltro pula)
+- modelos/<versao>.perfil.json (perfil de referência do monitor de drift)
+
+Com --com-historico, as linhas rotuladas acumuladas pelo treino_incremental.py
+(modelos/incremental/) entram no treino junto com o train (2).xlsx.
 """
 
 import warnings
 warnings.filterwarnings("ignore")
 
+import argparse
+import itertools
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import Dict, Optional, Tuple
+from typing import Dict, List, Optional, Tuple
 
 import pandas as pd
 import numpy as np
 import joblib
 
-from sklearn.ensemble import GradientBoostingClassifier
+from sklearn.ensemble import GradientBoostingClassifier, HistGradientBoostingClassifier
 from sklearn.model_selection import cross_val_score, StratifiedKFold
 from sklearn.metrics import (
     roc_auc_score,
@@ -30,6 +50,12 @@ from sklearn.metrics import (
     accuracy_score
 )
 
+import dois_estagios
+import monitor_drift
+import treino_incremental
+from cache_dados import ler_excel
+from registro_modelos import registrar
+
 # ======================================================
 # CONFIGURAÇÕES
 # ======================================================
@@ -51,16 +77,180 @@ MODEL_PARAMS = {
     "random_state": RANDOM_STATE
 }
 
+# Backend histogram-based: agrupa cada feature em até 255 faixas antes de
+# treinar (escala bem com o nº de linhas) e para sozinho quando a perda na
+# validação interna deixa de melhorar
+HIST_MODEL_PARAMS = {
+    "max_iter": 500,
+    "learning_rate": 0.05,
+    "max_depth": 3,
+    "min_samples_leaf": 10,
+    "l2_regularization": 0.0,
+    "early_stopping": True,
+    "validation_fraction": 0.1,
+    "n_iter_no_change": 20,
+    "random_state": RANDOM_STATE
+}
+
+# "gb" = GradientBoostingClassifier (splits exatos, o modelo de sempre)
+# "hist" = HistGradientBoostingClassifier
+MODEL_BACKEND = "gb"
+BACKENDS = {
+    "gb": (GradientBoostingClassifier, MODEL_PARAMS),
+    "hist": (HistGradientBoostingClassifier, HIST_MODEL_PARAMS),
+}
+
+# Espaço da busca (--busca); o que não estiver aqui vem dos parâmetros do backend
+PARAM_GRID = {
+    "n_estimators": [100, 200, 400],
+    "learning_rate": [0.03, 0.05, 0.1],
+    "max_depth": [2, 3, 4],
+    "subsample": [0.8, 1.0],
+    "min_samples_leaf": [10, 20],
+}
+
+HIST_PARAM_GRID = {
+    "learning_rate": [0.03, 0.05, 0.1],
+    "max_depth": [2, 3, 4, None],
+    "min_samples_leaf": [10, 20, 40],
+    "l2_regularization": [0.0, 1.0],
+}
+
+PARAM_GRIDS = {"gb": PARAM_GRID, "hist": HIST_PARAM_GRID}
+
+LEADERBOARD_OUTPUT = Path("leaderboard_busca.csv")
+
+# ======================================================
+# BUSCA DE HIPERPARÂMETROS (PARALELA)
+# ======================================================
+# Cada tarefa é (candidato, fold): os workers recebem X, y e os índices dos
+# folds UMA vez (initializer) e cada tarefa só carrega o dict de parâmetros.
+
+_X_BUSCA = None
+_Y_BUSCA = None
+_FOLDS_BUSCA = None
+
+
+def construir_modelo(backend: str, params: Optional[Dict] = None):
+    if backend not in BACKENDS:
+        raise ValueError(f"Backend desconhecido: {backend} (opções: {', '.join(BACKENDS)})")
+    classe, padrao = BACKENDS[backend]
+    return classe(**(params or padrao))
+
+
+def _iniciar_worker_busca(X: np.ndarray, y: np.ndarray, folds: List[Tuple[np.ndarray, np.ndarray]]):
+    global _X_BUSCA, _Y_BUSCA, _FOLDS_BUSCA
+    warnings.filterwarnings("ignore")
+    _X_BUSCA, _Y_BUSCA, _FOLDS_BUSCA = X, y, folds
+
+
+def _avaliar_fold(args) -> Tuple[int, int, float, float]:
+    """Treina um candidato num fold; retorna (candidato, fold, AUC, segundos)."""
+    i_cand, backend, params, i_fold = args
+    treino, valid = _FOLDS_BUSCA[i_fold]
+
+    t0 = time.perf_counter()
+    modelo = construir_modelo(backend, params)
+    modelo.fit(_X_BUSCA[treino], _Y_BUSCA[treino])
+    auc = roc_auc_score(_Y_BUSCA[valid], modelo.predict_proba(_X_BUSCA[valid])[:, 1])
+    return i_cand, i_fold, auc, time.perf_counter() - t0
+
+
+def gerar_candidatos(grid: Dict, base: Dict, max_candidatos: Optional[int] = None) -> List[Dict]:
+    chaves = sorted(grid)
+    candidatos = [
+        {**base, **dict(zip(chaves, valores))}
+        for valores in itertools.product(*(grid[c] for c in chaves))
+    ]
+    if max_candidatos and len(candidatos) > max_candidatos:
+        candidatos = random.Random(RANDOM_STATE).sample(candidatos, max_candidatos)
+    return candidatos
+
+
+def busca_sucessiva(X: np.ndarray, y: np.ndarray, backend: str, candidatos: List[Dict], jobs: int,
+                    folds_iniciais: int = 2, fator: int = 3) -> pd.DataFrame:
+    """Successive halving sobre os folds do CV.
+
+    Rodada 0: todos os candidatos em `folds_iniciais` folds. A cada rodada
+    fica só o melhor 1/fator (AUC média até ali) e o nº de folds avaliados
+    é multiplicado por `fator`, até CV_FOLDS. Folds já avaliados não são
+    refeitos. Retorna o leaderboard (melhor primeiro).
+    """
+    # Mesmos folds para todos os candidatos, calculados uma vez só
+    cv = StratifiedKFold(n_splits=CV_FOLDS, shuffle=True, random_state=RANDOM_STATE)
+    folds = list(cv.split(X, y))
+
+    aucs: Dict[int, Dict[int, float]] = {i: {} for i in range(len(candidatos))}
+    tempos: Dict[int, float] = {i: 0.0 for i in range(len(candidatos))}
+    eliminado_na: Dict[int, Optional[int]] = {i: None for i in range(len(candidatos))}
+
+    vivos = list(range(len(candidatos)))
+    n_folds = min(folds_iniciais, CV_FOLDS)
+    rodada = 0
+
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_iniciar_worker_busca,
+                             initargs=(X, y, folds)) as pool:
+        while True:
+            tarefas = [
+                (i, backend, candidatos[i], f) for i in vivos for f in range(n_folds) if f not in aucs[i]
+            ]
+            t0 = time.perf_counter()
+            for i, f, auc, segundos in pool.map(_avaliar_fold, tarefas, chunksize=1):
+                aucs[i][f] = auc
+                tempos[i] += segundos
+
+            print(f"   ✓ Rodada {rodada}: {len(vivos)} candidatos x {n_folds} folds "
+                  f"({len(tarefas)} treinos em {time.perf_counter() - t0:.1f}s)")
+
+            if n_folds >= CV_FOLDS or len(vivos) == 1:
+                break
+
+            vivos.sort(key=lambda i: -np.mean(list(aucs[i].values())))
+            manter = max(1, len(vivos) // fator)
+            for i in vivos[manter:]:
+                eliminado_na[i] = rodada
+            vivos = vivos[:manter]
+            n_folds = min(n_folds * fator, CV_FOLDS)
+            rodada += 1
+
+    linhas = []
+    for i, params in enumerate(candidatos):
+        valores = list(aucs[i].values())
+        linhas.append({
+            **{k: params[k] for k in sorted(PARAM_GRIDS[backend])},
+            "auc_media": float(np.mean(valores)),
+            "auc_std": float(np.std(valores)),
+            "folds": len(valores),
+            "eliminado_na_rodada": eliminado_na[i],
+            "tempo_total_s": round(tempos[i], 3),
+            "tempo_por_fold_s": round(tempos[i] / len(valores), 3),
+            "_candidato": i,
+        })
+
+    leaderboard = pd.DataFrame(linhas)
+    leaderboard["eliminado_na_rodada"] = leaderboard["eliminado_na_rodada"].astype("Int64")
+    # Quem chegou mais longe primeiro; dentro da mesma rodada, maior AUC
+    leaderboard = leaderboard.sort_values(["folds", "auc_media"], ascending=[False, False])
+    leaderboard.insert(0, "posicao", range(1, len(leaderboard) + 1))
+    return leaderboard.reset_index(drop=True)
+
 # ======================================================
 # CLASSE DE TREINAMENTO
 # ======================================================
 
 class GradientBoostingTrainerCustom:
 
-    def __init__(self):
-        self.model: Optional[GradientBoostingClassifier] = None
+    def __init__(self, backend: str = MODEL_BACKEND, usar_cache_dados: bool = True):
+        if backend not in BACKENDS:
+            raise ValueError(f"Backend desconhecido: {backend} (opções: {', '.join(BACKENDS)})")
+
+        self.model = None
         self.feature_names: list = []
 
+        self.backend = backend
+        self.usar_cache_dados = usar_cache_dados
+        self.params: Dict = dict(BACKENDS[backend][1])
+
         self.X_train = None
         self.y_train = None
         self.X_test = None
@@ -78,11 +268,15 @@ class GradientBoostingTrainerCustom:
         if not TEST_PATH.exists():
             raise FileNotFoundError(f"Arquivo não encontrado: {TEST_PATH}")
 
-        df_train = pd.read_excel(TRAIN_PATH)
-        df_test = pd.read_excel(TEST_PATH)
+        # Excel convertido uma vez para .npz tipado (.cache_dados/), refeito se o arquivo mudar
+        t0 = time.perf_counter()
+        df_train, cache_train = ler_excel(TRAIN_PATH, usar_cache=self.usar_cache_dados)
+        df_test, cache_test = ler_excel(TEST_PATH, usar_cache=self.usar_cache_dados)
+        origem = "cache" if cache_train and cache_test else "Excel"
 
         print(f"   ✓ Train shape: {df_train.shape}")
         print(f"   ✓ Test shape:  {df_test.shape}")
+        print(f"   ✓ Lidos do {origem} em {(time.perf_counter() - t0) * 1000:.0f} ms")
 
         return df_train, df_test
 
@@ -119,11 +313,23 @@ class GradientBoostingTrainerCustom:
         print(f"📊 TARGET treino: {self.y_train.value_counts().to_dict()}")
         print(f"📊 TARGET teste:  {self.y_test.value_counts().to_dict()}")
 
+    # --------------------------------------------------
+    # HISTÓRICO ROTULADO (TREINO INCREMENTAL)
+    # --------------------------------------------------
+    def add_historico(self):
+        X, y = treino_incremental.carregar_conjunto(self.feature_names)
+        if not len(y):
+            print("📊 Histórico rotulado: nenhuma linha acumulada (python treino_incremental.py rodar)")
+            return
+        self.X_train = pd.concat([self.X_train, pd.DataFrame(X, columns=self.feature_names)], ignore_index=True)
+        self.y_train = pd.concat([self.y_train, pd.Series(y, name=self.y_train.name)], ignore_index=True)
+        print(f"📊 Histórico rotulado: +{len(y)} linhas no treino ({self.y_train.value_counts().to_dict()})")
+
     # --------------------------------------------------
     # BUILD MODEL
     # --------------------------------------------------
-    def build_model(self) -> GradientBoostingClassifier:
-        return GradientBoostingClassifier(**MODEL_PARAMS)
+    def build_model(self, params: Optional[Dict] = None):
+        return construir_modelo(self.backend, params or self.params)
 
     # --------------------------------------------------
     # TREINAMENTO + CROSS VALIDATION
@@ -131,7 +337,7 @@ class GradientBoostingTrainerCustom:
     def fit_model(self):
         print("📍 Iniciando Cross-validation...")
 
-        self.model = self.build_model()
+        self.model = self.build_model(self.params)
 
         cv = StratifiedKFold(
             n_splits=CV_FOLDS,
@@ -144,7 +350,8 @@ class GradientBoostingTrainerCustom:
             self.X_train,
             self.y_train,
             cv=cv,
-            scoring="roc_auc"
+            scoring="roc_auc",
+            n_jobs=-1
         )
 
         print(f"   ✓ CV AUC Scores: {cv_scores}")
@@ -153,6 +360,44 @@ class GradientBoostingTrainerCustom:
 
         print("\n📍 Treinando modelo final...")
         self.model.fit(self.X_train, self.y_train)
+        self._report_early_stopping()
+
+    def _report_early_stopping(self):
+        if getattr(self.model, "n_iter_", None) is not None:
+            print(f"   ✓ Early stopping: {self.model.n_iter_} iterações "
+                  f"(máximo {self.model.max_iter})")
+
+    # --------------------------------------------------
+    # BUSCA DE HIPERPARÂMETROS
+    # --------------------------------------------------
+    def search_params(self, jobs: int, max_candidatos: Optional[int] = None,
+                      fator: int = 3, folds_iniciais: int = 2) -> pd.DataFrame:
+        grid = PARAM_GRIDS[self.backend]
+        candidatos = gerar_candidatos(grid, BACKENDS[self.backend][1], max_candidatos)
+        print(f"📍 Busca de hiperparâmetros: {len(candidatos)} candidatos, "
+              f"{jobs} processos, successive halving (fator {fator})")
+
+        t0 = time.perf_counter()
+        leaderboard = busca_sucessiva(
+            self.X_train.to_numpy(dtype=np.float64), self.y_train.to_numpy(),
+            self.backend, candidatos, jobs, folds_iniciais, fator
+        )
+        print(f"   ✓ Busca concluída em {time.perf_counter() - t0:.1f}s")
+
+        melhor = leaderboard.iloc[0]
+        self.params = candidatos[int(melhor["_candidato"])]
+
+        leaderboard = leaderboard.drop(columns="_candidato")
+        leaderboard.to_csv(LEADERBOARD_OUTPUT, index=False)
+        print(f"   ✓ Leaderboard salvo em: {LEADERBOARD_OUTPUT.resolve()}")
+
+        print("\n🏆 TOP 5")
+        print(leaderboard.head(5).to_string(index=False))
+        print(f"\n   ✓ Melhor configuração (CV AUC {melhor['auc_media']:.4f} em {int(melhor['folds'])} folds):")
+        for k in sorted(grid):
+            print(f"      {k}: {self.params[k]}")
+
+        return leaderboard
 
     # --------------------------------------------------
     # AVALIAÇÃO
@@ -193,7 +438,7 @@ class GradientBoostingTrainerCustom:
     # --------------------------------------------------
     # SAVE MODEL
     # --------------------------------------------------
-    def save_model(self):
+    def save_model(self, metrics: Optional[Dict] = None):
         artifact = {
             "model": self.model,
             "features": self.feature_names
@@ -202,19 +447,72 @@ class GradientBoostingTrainerCustom:
         joblib.dump(artifact, MODEL_OUTPUT)
         print(f"\n💾 Modelo salvo em: {MODEL_OUTPUT.resolve()}")
 
+        versao = registrar(str(MODEL_OUTPUT), metricas=metrics, params=self.params)
+        print(f"💾 Registrado como versão {versao} "
+              f"(ativar na API: POST /admin/modelo ou python registro_modelos.py ativar {versao})")
+        return versao
+
+    # --------------------------------------------------
+    # PRÉ-FILTRO (DOIS ESTÁGIOS)
+    # --------------------------------------------------
+    def save_prefiltro(self, versao: str):
+        print("\n📍 Treinando pré-filtro (dois estágios)...")
+        artefato = dois_estagios.treinar(self.X_train, self.y_train, self.model, self.feature_names)
+        destino = dois_estagios.salvar_prefiltro(artefato, versao)
+        prefiltro = dois_estagios.Prefiltro.de_artefato(dict(artefato, versao_modelo=versao))
+
+        idx = list(self.model.classes_).index(1)
+        X_test = self.X_test.to_numpy(dtype=np.float64)
+        completo = self.model.predict_proba(self.X_test)[:, idx]
+        dois, escalou = dois_estagios.prever_dois_estagios(
+            X_test, prefiltro, lambda X: self.model.predict_proba(pd.DataFrame(X, columns=self.feature_names))[:, idx]
+        )
+        divergencias = int((dois_estagios.faixas(dois) != dois_estagios.faixas(completo)).sum())
+        print(f"   ✓ Escalonamento no teste: {escalou.mean():.1%}   faixa divergente: {divergencias} linhas")
+        print(f"💾 Pré-filtro salvo em: {destino} (relatório completo: python dois_estagios.py relatorio)")
+
+    # --------------------------------------------------
+    # PERFIL DE REFERÊNCIA (MONITOR DE DRIFT)
+    # --------------------------------------------------
+    def save_perfil(self, versao: str):
+        idx = list(self.model.classes_).index(1)
+        probas = self.model.predict_proba(self.X_test)[:, idx]
+        perfil = monitor_drift.gerar_perfil(
+            self.X_train.to_numpy(dtype=np.float64), self.feature_names, probas, versao
+        )
+        destino = monitor_drift.salvar_perfil(perfil, versao)
+        print(f"💾 Perfil de referência (drift) salvo em: {destino}")
+
     # --------------------------------------------------
     # PIPELINE
     # --------------------------------------------------
-    def train(self):
+    def train(self, busca: bool = False, jobs: Optional[int] = None, prefiltro: bool = True,
+              com_historico: bool = False, **opcoes_busca):
         print("=" * 80)
         print("🎯 TREINAMENTO GRADIENT BOOSTING - PIPELINE FINAL")
+        print(f"   Backend: {self.backend} ({BACKENDS[self.backend][0].__name__})")
         print("=" * 80)
 
         df_train, df_test = self.load_data()
         self.prepare_features(df_train, df_test)
-        self.fit_model()
-        self.evaluate()
-        self.save_model()
+        if com_historico:
+            self.add_historico()
+
+        if busca:
+            # O CV já foi feito dentro da busca: só treina a melhor configuração
+            self.search_params(jobs or os.cpu_count() or 1, **opcoes_busca)
+            print("\n📍 Treinando modelo final com a melhor configuração...")
+            self.model = self.build_model(self.params)
+            self.model.fit(self.X_train, self.y_train)
+            self._report_early_stopping()
+        else:
+            self.fit_model()
+
+        metrics = self.evaluate()
+        versao = self.save_model(metrics)
+        self.save_perfil(versao)
+        if prefiltro:
+            self.save_prefiltro(versao)
 
         print("\n✅ TREINAMENTO FINALIZADO COM SUCESSO")
 
@@ -223,5 +521,21 @@ class GradientBoostingTrainerCustom:
 # ======================================================
 
 if __name__ == "__main__":
-    trainer = GradientBoostingTrainerCustom()
-    trainer.train()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--backend", choices=sorted(BACKENDS), default=MODEL_BACKEND)
+    parser.add_argument("--sem-cache", action="store_true", help="Lê o Excel direto, sem .cache_dados/")
+    parser.add_argument("--busca", action="store_true", help="Busca de hiperparâmetros antes do treino final")
+    parser.add_argument("--jobs", type=int, default=None, help="Processos da busca (padrão: todos os núcleos)")
+    parser.add_argument("--max-candidatos", type=int, default=None, help="Amostra aleatória do PARAM_GRID")
+    parser.add_argument("--fator", type=int, default=3, help="Fator do successive halving")
+    parser.add_argument("--folds-iniciais", type=int, default=2)
+    parser.add_argument("--sem-prefiltro", action="store_true", help="Não treina o pré-filtro dos dois estágios")
+    parser.add_argument("--com-historico", action="store_true",
+                        help="Soma ao treino as linhas rotuladas do treino incremental")
+    args = parser.parse_args()
+
+    trainer = GradientBoostingTrainerCustom(args.backend, usar_cache_dados=not args.sem_cache)
+    trainer.train(
+        busca=args.busca, jobs=args.jobs, prefiltro=not args.sem_prefiltro, com_historico=args.com_historico,
+        max_candidatos=args.max_candidatos, fator=args.fator, folds_iniciais=args.folds_iniciais
+    )